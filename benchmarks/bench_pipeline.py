@@ -0,0 +1,277 @@
+"""
+Offline benchmarks — zoekfase, analyse en de volledige run zonder netwerk.
+
+Alle API-calls gaan naar de lokale FakeAnthropicServer uit
+tests/fake_anthropic.py, met instelbare latency, 429-injectie en
+zoekresponses van realistische grootte. Per aantal prompts worden
+doorvoer, wandkloktijd, geopende verbindingen en piekgeheugen
+(tracemalloc) gemeten voor run_all_searches, analyze_results en main.main().
+
+Gebruik:
+    python -m benchmarks.bench_pipeline
+    python -m benchmarks.bench_pipeline --sizes 21 --latency 0.2 --json bench.json
+"""
+
+import argparse
+import json
+import logging
+import os
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+from contextlib import contextmanager
+from pathlib import Path
+
+import anthropic
+import resend
+import yaml
+
+import main as scout
+from src.analyze import analyze_results
+from src.retry import RetryPolicy
+from src.search import run_all_searches
+from tests.fake_anthropic import (
+    FakeAnthropicServer,
+    make_message,
+    make_search_message,
+)
+
+ROOT = Path(__file__).resolve().parent.parent
+DEFAULT_SIZES = (21, 100, 1000)
+
+REPORT_TEXT = "# Rapport\n\n" + "\n".join(
+    f"## Categorie {i}\n\n- Inzicht {i}: een concrete aanbeveling voor de setup."
+    for i in range(60)
+)
+
+
+def make_prompts(count: int) -> list[dict]:
+    """Genereer `count` zoekprompts met unieke ids en queries."""
+    return [
+        {
+            "id": f"prompt-{i:04d}",
+            "name": f"Onderwerp {i}",
+            "query": f"Search for articles about Claude Code topic {i}.",
+        }
+        for i in range(count)
+    ]
+
+
+def responder(params: dict) -> dict:
+    """Zoekrequests (met tools) krijgen zoekresultaten, de rest een rapport."""
+    if params.get("tools"):
+        return make_search_message(params["messages"][-1]["content"])
+    return make_message(REPORT_TEXT)
+
+
+# Korte wachttijden: de nep-server vraagt om 10 ms retry-after
+RETRY = {"base_delay": 0.01, "max_delay": 0.1}
+
+
+def fake_client(server: FakeAnthropicServer) -> anthropic.Anthropic:
+    return anthropic.Anthropic(api_key="bench", base_url=server.url, max_retries=0)
+
+
+def measure(name: str, size: int, server: FakeAnthropicServer, fn) -> dict:
+    """Draai fn() en meet wandkloktijd, piekgeheugen en API-calls."""
+    calls_before = server.message_count
+    limited_before = server.rate_limited
+    connections_before = server.connections
+    tracemalloc.start()
+    start = time.perf_counter()
+    try:
+        ok = fn()
+    finally:
+        wall_time = time.perf_counter() - start
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+    calls = server.message_count - calls_before
+    return {
+        "benchmark": name,
+        "prompts": size,
+        "ok": ok,
+        "wall_time": wall_time,
+        "prompts_per_s": size / wall_time if wall_time else 0.0,
+        "api_calls": calls,
+        "rate_limited": server.rate_limited - limited_before,
+        "connections": server.connections - connections_before,
+        "peak_mb": peak / (1024 * 1024),
+    }
+
+
+def bench_search(server, prompts: list[dict], workers: int) -> list[dict]:
+    return run_all_searches(
+        client=fake_client(server),
+        model="fake-model",
+        base_instruction="base",
+        output_format="format",
+        prompts=prompts,
+        delay=0,
+        max_workers=workers,
+        retry=RetryPolicy(**RETRY),
+    )
+
+
+def bench_analyze(server, results: list[dict], workers: int) -> str:
+    return analyze_results(
+        client=fake_client(server),
+        model="fake-model",
+        search_results=results,
+        system_design=(ROOT / "reference" / "system_design.md").read_text(),
+        current_setup=(ROOT / "reference" / "current_setup.md").read_text(),
+        source_weights_text="",
+        chunk_tokens=40_000,
+        max_workers=workers,
+        retry=RetryPolicy(**RETRY),
+    )
+
+
+def write_workspace(workdir: Path, prompts: list[dict], workers: int) -> None:
+    """Zet config, prompts en referentiebestanden klaar voor main.main()."""
+    shutil.copytree(ROOT / "reference", workdir / "reference")
+    (workdir / "prompts").mkdir()
+    (workdir / "prompts" / "search_prompts.yaml").write_text(
+        yaml.safe_dump({
+            "base_instruction": "base",
+            "output_format": "format",
+            "prompts": prompts,
+        }),
+        encoding="utf-8",
+    )
+    config = {
+        "anthropic": {"api_key": "bench", "model": "fake-model"},
+        "email": {
+            "resend_api_key": "bench",
+            "from_address": "scout@example.com",
+            "to_address": "bench@example.com",
+            "subject_prefix": "[Bench]",
+        },
+        "paths": {
+            "prompts": "prompts/search_prompts.yaml",
+            "system_design": "reference/system_design.md",
+            "current_setup": "reference/current_setup.md",
+            "source_weights": "reference/source_weights.yaml",
+            "reports_dir": "reports",
+            "publications_dir": "publications",
+            "runs_dir": "runs",
+            "state_dir": "state",
+        },
+        "search": {"mode": "direct", "delay_between_calls": 0,
+                   "max_concurrent": workers},
+        "analysis": {"chunk_tokens": 40_000, "max_concurrent": workers,
+                     "stream": True},
+        "retry": RETRY,
+        "cache": {"enabled": False},
+        "dedup": {"enabled": True},
+    }
+    (workdir / "config.yaml").write_text(yaml.safe_dump(config), encoding="utf-8")
+
+
+@contextmanager
+def pointed_at(server: FakeAnthropicServer, workdir: Path):
+    """Laat main.main() in workdir draaien tegen de nep-server."""
+    old_cwd = os.getcwd()
+    old_base_url = os.environ.get("ANTHROPIC_BASE_URL")
+    old_resend_url = resend.api_url
+    os.environ["ANTHROPIC_BASE_URL"] = server.url
+    resend.api_url = server.url
+    os.chdir(workdir)
+    try:
+        yield
+    finally:
+        os.chdir(old_cwd)
+        resend.api_url = old_resend_url
+        if old_base_url is None:
+            os.environ.pop("ANTHROPIC_BASE_URL", None)
+        else:
+            os.environ["ANTHROPIC_BASE_URL"] = old_base_url
+
+
+def bench_main(server, prompts: list[dict], workers: int) -> bool:
+    with tempfile.TemporaryDirectory(prefix="scout-bench-") as tmp:
+        workdir = Path(tmp)
+        write_workspace(workdir, prompts, workers)
+        emails_before = len(server.emails)
+        with pointed_at(server, workdir):
+            scout.main([])
+        reports = list((workdir / "reports").glob("rapport-*.md"))
+        return bool(reports) and len(server.emails) == emails_before + 1
+
+
+def run_benchmarks(
+    sizes=DEFAULT_SIZES,
+    latency: float = 0.05,
+    rate_limit_every: int = 20,
+    workers: int = 8,
+) -> list[dict]:
+    """Draai alle benchmarks per aantal prompts; returns een rij per meting."""
+    rows = []
+    with FakeAnthropicServer(
+        responder, latency=latency, rate_limit_every=rate_limit_every
+    ) as server:
+        for size in sizes:
+            prompts = make_prompts(size)
+            results = []
+
+            def search():
+                results[:] = bench_search(server, prompts, workers)
+                return all(not r["raw_output"].startswith("FOUT") for r in results)
+
+            rows.append(measure("search", size, server, search))
+            rows.append(measure(
+                "analyze", size, server,
+                lambda: bench_analyze(server, results, workers).startswith("# "),
+            ))
+            rows.append(measure(
+                "main", size, server, lambda: bench_main(server, prompts, workers)
+            ))
+    return rows
+
+
+def format_table(rows: list[dict]) -> str:
+    header = (
+        f"{'benchmark':<10} {'prompts':>7} {'ok':>3} {'wall s':>8} "
+        f"{'prompts/s':>9} {'calls':>6} {'429':>4} {'conns':>5} {'peak MB':>8}"
+    )
+    lines = [header, "-" * len(header)]
+    for row in rows:
+        lines.append(
+            f"{row['benchmark']:<10} {row['prompts']:>7} "
+            f"{'ja' if row['ok'] else 'nee':>3} {row['wall_time']:>8.2f} "
+            f"{row['prompts_per_s']:>9.1f} {row['api_calls']:>6} "
+            f"{row['rate_limited']:>4} {row['connections']:>5} "
+            f"{row['peak_mb']:>8.1f}"
+        )
+    return "\n".join(lines)
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=list(DEFAULT_SIZES))
+    parser.add_argument("--latency", type=float, default=0.05,
+                        help="vertraging per API-call in seconden")
+    parser.add_argument("--rate-limit-every", type=int, default=20,
+                        help="elke n-de call krijgt een 429 (0 = nooit)")
+    parser.add_argument("--workers", type=int, default=8)
+    parser.add_argument("--json", metavar="PAD", help="schrijf de metingen als JSON")
+    args = parser.parse_args(argv)
+
+    # De scout logt per prompt en per retry; de tabel telt de 429's al. Met
+    # een handler op de root doet setup_logging() in main.main() niets meer:
+    # geen INFO-regels tussen de tabel en geen scout.log.
+    logging.basicConfig(level=logging.ERROR, stream=sys.stderr)
+    logging.getLogger().setLevel(logging.ERROR)
+
+    rows = run_benchmarks(
+        args.sizes, args.latency, args.rate_limit_every, args.workers
+    )
+    print(format_table(rows))
+    if args.json:
+        Path(args.json).write_text(json.dumps(rows, indent=2), encoding="utf-8")
+    return 0 if all(row["ok"] for row in rows) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -3,8 +3,22 @@ Analysemodule — vergelijkt zoekresultaten met referentiebestanden via Claude.
 """
 
 import logging
+from collections.abc import Callable
+from concurrent.futures import ThreadPoolExecutor
+
 import anthropic
 
+from src import metrics
+from src.cache import ResponseCache
+from src.rate_limiter import (
+    RateLimiter,
+    create_message,
+    estimate_tokens,
+    stream_message,
+    usage_summary,
+)
+from src.retry import RetryPolicy
+
 logger = logging.getLogger(__name__)
 
 ANALYSIS_SYSTEM_PROMPT = """Je bent een technisch analist die wekelijkse zoekresultaten over Claude Code
@@ -55,10 +69,60 @@ Als er geen geverifieerde URL beschikbaar is voor een bron, vermeld dan alleen h
 domein zonder URL.
 """
 
+ERROR_HEADING = "# Fout bij het genereren van het rapport"
+
+INCOMPLETE_NOTE = (
+    "> **Let op:** dit rapport is onvolledig; de deelanalyse mislukte voor: {names}"
+)
+
+CHUNK_INSTRUCTION = """Dit is deel {deel} van {totaal} van de zoekresultaten van deze
+week. Analyseer ALLEEN de categorieën hieronder. Schrijf nog geen volledig
+rapport: geef alleen de voorstellen per categorie in het voorgeschreven format
+(### [Categorienaam] met Voorstel/Bron/Type/Toelichting), gevolgd door een
+korte lijst "Bronnen om in de gaten te houden" en "Paradigma-check" voor
+deze categorieën. Sla categorieën zonder resultaten over."""
+
+MERGE_INSTRUCTION = """Hieronder staan deelanalyses van de zoekresultaten van deze week,
+elk voor een groep categorieën. Voeg ze samen tot het volledige weekrapport
+in de voorgeschreven structuur. Neem de voorstellen over, verwijder dubbelingen,
+schrijf één samenvatting over alles heen en gebruik alleen URLs die al in de
+deelanalyses staan."""
+
+
+def build_results_text(search_results: list[dict]) -> str:
+    """Zet de zoekresultaten van deze week om naar één tekstblok."""
+    results_text = ""
+    for result in search_results:
+        results_text += f"\n\n--- {result['name']} ({result['id']}) ---\n"
+        results_text += result["raw_output"]
+    return results_text
+
+
+def build_reference_context(
+    system_design: str,
+    current_setup: str,
+    source_weights_text: str,
+) -> list[str]:
+    """
+    Bouw de referentieblokken van de analyseprompt.
+
+    Returns [systeemontwerp + setup, bronnenlijst]. Het eerste blok wijzigt
+    zelden, de bronnenlijst vaker; daarom zijn het aparte cacheblokken.
+    """
+    return [
+        f"""## MIJN SYSTEEMONTWERP
+
+{system_design}
+
+## MIJN HUIDIGE SETUP
 
-def create_client(api_key: str) -> anthropic.Anthropic:
-    """Maak een Anthropic API client aan."""
-    return anthropic.Anthropic(api_key=api_key)
+{current_setup}
+""",
+        f"""## GEWOGEN BRONNENLIJST
+
+{source_weights_text}
+""",
+    ]
 
 
 def build_analysis_prompt(
@@ -66,64 +130,385 @@ def build_analysis_prompt(
     system_design: str,
     current_setup: str,
     source_weights_text: str,
+    previous_text: str = "",
 ) -> str:
-    """Bouw de analyseprompt op uit zoekresultaten en referentiebestanden."""
+    """
+    Bouw de volledige analyseprompt als één tekst.
 
-    results_text = ""
-    for result in search_results:
-        results_text += f"\n\n--- {result['name']} ({result['id']}) ---\n"
-        results_text += result["raw_output"]
+    Dezelfde inhoud als build_analysis_request, zonder opsplitsing in
+    cacheblokken. Handig voor het schatten van de promptgrootte.
+    """
+    reference = "\n".join(
+        build_reference_context(system_design, current_setup, source_weights_text)
+    )
+    return f"""{reference}
+{build_user_prompt(search_results, previous_text)}"""
+
+
+def build_user_prompt(search_results: list[dict], previous_text: str = "") -> str:
+    """
+    Het wekelijks wisselende deel van de analyseprompt.
 
-    return f"""Hieronder vind je de zoekresultaten van deze week, mijn systeemontwerp,
-mijn huidige setup, en mijn gewogen bronnenlijst.
+    previous_text (eerdere voorstellen uit het archief, zie src/archive.py)
+    komt vóór de zoekresultaten.
+    """
+    previous = f"{previous_text}\n" if previous_text else ""
+    return f"""Hieronder vind je de zoekresultaten van deze week. Mijn systeemontwerp,
+mijn huidige setup en mijn gewogen bronnenlijst staan in de systeemprompt.
 
 Genereer op basis hiervan het weekrapport.
 
-## ZOEKRESULTATEN
+{previous}## ZOEKRESULTATEN
 
-{results_text}
+{build_results_text(search_results)}
+"""
 
-## MIJN SYSTEEMONTWERP
 
-{system_design}
+def build_system_blocks(
+    system_design: str,
+    current_setup: str,
+    source_weights_text: str,
+) -> list[dict]:
+    """
+    Bouw de systeemprompt als blokken met cache_control breakpoints.
 
-## MIJN HUIDIGE SETUP
+    De vaste delen (instructies, systeemontwerp, setup, bronnenlijst) zijn
+    voor elke analysecall gelijk en worden daarom gecachet.
+    """
+    reference_blocks = build_reference_context(
+        system_design, current_setup, source_weights_text
+    )
+    system = [{"type": "text", "text": ANALYSIS_SYSTEM_PROMPT}]
+    for text in reference_blocks:
+        system.append({
+            "type": "text",
+            "text": text,
+            "cache_control": {"type": "ephemeral"},
+        })
+    return system
 
-{current_setup}
 
-## GEWOGEN BRONNENLIJST
+def build_analysis_request(
+    search_results: list[dict],
+    system_design: str,
+    current_setup: str,
+    source_weights_text: str,
+    previous_text: str = "",
+) -> dict:
+    """
+    Bouw system- en messages-parameters voor één analysecall.
 
-{source_weights_text}
-"""
+    De gecachete referentieblokken staan vooraan in de systeemprompt; de
+    zoekresultaten van deze week staan als laatste in het user-bericht.
+    """
+    return {
+        "system": build_system_blocks(
+            system_design, current_setup, source_weights_text
+        ),
+        "messages": [
+            {
+                "role": "user",
+                "content": build_user_prompt(search_results, previous_text),
+            },
+        ],
+    }
+
+
+def chunk_results(search_results: list[dict], max_tokens: int) -> list[list[dict]]:
+    """
+    Verdeel zoekresultaten in groepen van opeenvolgende categorieën.
 
+    Elke groep blijft onder max_tokens (geschat). Eén resultaat dat in zijn
+    eentje te groot is, wordt ingekort en krijgt een eigen groep.
+    """
+    chunks = []
+    current = []
+    current_tokens = 0
+    for result in search_results:
+        tokens = estimate_tokens(result["raw_output"])
+        if tokens > max_tokens:
+            result = {
+                **result,
+                "raw_output": result["raw_output"][:max_tokens * 4]
+                + "\n[ingekort]",
+            }
+            tokens = max_tokens
+        if current and current_tokens + tokens > max_tokens:
+            chunks.append(current)
+            current = []
+            current_tokens = 0
+        current.append(result)
+        current_tokens += tokens
+    if current:
+        chunks.append(current)
+    return chunks
+
+
+def _analyze_chunk(
+    client: anthropic.Anthropic,
+    model: str,
+    system: list[dict],
+    chunk: list[dict],
+    index: int,
+    total: int,
+    limiter: RateLimiter | None,
+    retry: RetryPolicy,
+) -> tuple[str, bool]:
+    """
+    Map-stap: analyseer één groep categorieën.
 
-def analyze_results(
+    Returns (tekst, gelukt); bij een fout is de tekst een melding voor de
+    merge-call.
+    """
+    names = ", ".join(result["id"] for result in chunk)
+    content = (
+        CHUNK_INSTRUCTION.format(deel=index, totaal=total)
+        + "\n\n## ZOEKRESULTATEN\n"
+        + build_results_text(chunk)
+    )
+    try:
+        with metrics.track("analyze", f"deel-{index}") as record:
+            response = retry.call(
+                lambda: create_message(
+                    client,
+                    limiter,
+                    model=model,
+                    max_tokens=4096,
+                    system=system,
+                    messages=[{"role": "user", "content": content}],
+                ),
+                f"deel-{index}",
+            )
+            text = response.content[0].text
+            record["bytes_returned"] = len(text.encode("utf-8"))
+        logger.info(
+            f"Deelanalyse {index}/{total} ({names}) klaar: {len(text)} tekens, "
+            f"{usage_summary(response.usage)}"
+        )
+        return text, True
+    except Exception as e:
+        logger.error(f"Fout bij deelanalyse {index}/{total} ({names}): {e}")
+        return f"Deelanalyse voor {names} mislukt: {e}", False
+
+
+def _create_report_message(
+    client: anthropic.Anthropic,
+    limiter: RateLimiter | None,
+    on_text: Callable[[str], None] | None,
+    retry: RetryPolicy,
+    label: str,
+    **kwargs,
+):
+    """
+    De call die het rapport schrijft: gestreamd als on_text gezet is.
+
+    Een gestreamde call wordt alleen opnieuw geprobeerd zolang er nog geen
+    tekst naar on_text is gegaan; anders zou het rapport dubbel beginnen.
+    """
+    if on_text is None:
+        return retry.call(lambda: create_message(client, limiter, **kwargs), label)
+
+    streamed = []
+
+    def write(text: str) -> None:
+        streamed.append(True)
+        on_text(text)
+
+    return retry.call(
+        lambda: stream_message(client, limiter, on_text=write, **kwargs),
+        label,
+        can_retry=lambda: not streamed,
+    )
+
+
+def analyze_results_staged(
     client: anthropic.Anthropic,
     model: str,
     search_results: list[dict],
     system_design: str,
     current_setup: str,
     source_weights_text: str,
+    limiter: RateLimiter | None = None,
+    chunk_tokens: int = 40_000,
+    max_workers: int = 4,
+    on_text: Callable[[str], None] | None = None,
+    retry: RetryPolicy | None = None,
+    previous_text: str = "",
+    failed_chunks: list[str] | None = None,
 ) -> str:
     """
-    Stuur zoekresultaten en referentiebestanden naar Claude voor analyse.
+    Analyse in twee stappen voor grote hoeveelheden zoekresultaten.
+
+    Map: groepen categorieën (elk onder chunk_tokens) worden parallel
+    geanalyseerd. Reduce: één merge-call maakt er het weekrapport van in de
+    gebruikelijke Markdown-structuur. Alle calls delen de gecachete
+    systeemprompt. Met on_text wordt de merge-call gestreamd. Eerdere
+    voorstellen (previous_text) gaan alleen mee met de merge-call.
+
+    Mislukte delen komen in failed_chunks (de prompt-ids per deel) en het
+    rapport krijgt onderaan een INCOMPLETE_NOTE.
 
     Returns het gegenereerde Markdown-rapport.
     """
-    user_prompt = build_analysis_prompt(
-        search_results, system_design, current_setup, source_weights_text
+    retry = retry or RetryPolicy()
+    system = build_system_blocks(system_design, current_setup, source_weights_text)
+    chunks = chunk_results(search_results, chunk_tokens)
+    total = len(chunks)
+    logger.info(
+        f"Gefaseerde analyse: {len(search_results)} resultaten in {total} delen"
     )
 
+    with ThreadPoolExecutor(max_workers=max(1, min(max_workers, total))) as pool:
+        futures = [
+            pool.submit(
+                _analyze_chunk,
+                client, model, system, chunk, i, total, limiter, retry,
+            )
+            for i, chunk in enumerate(chunks, 1)
+        ]
+    partials = []
+    failed = []
+    for chunk, future in zip(chunks, futures):
+        text, ok = future.result()
+        partials.append(text)
+        if not ok:
+            failed.append(", ".join(result["id"] for result in chunk))
+    if failed_chunks is not None:
+        failed_chunks.extend(failed)
+
+    merge_prompt = MERGE_INSTRUCTION
+    if previous_text:
+        merge_prompt += f"\n\n{previous_text}"
+    merge_prompt += "".join(
+        f"\n\n## DEELANALYSE {i}\n\n{text}"
+        for i, text in enumerate(partials, 1)
+    )
     try:
-        response = client.messages.create(
-            model=model,
-            max_tokens=8192,
-            system=ANALYSIS_SYSTEM_PROMPT,
-            messages=[{"role": "user", "content": user_prompt}],
+        with metrics.track("analyze", "merge") as record:
+            response = _create_report_message(
+                client,
+                limiter,
+                on_text,
+                retry,
+                "merge",
+                model=model,
+                max_tokens=8192,
+                system=system,
+                messages=[{"role": "user", "content": merge_prompt}],
+            )
+            report = response.content[0].text
+            record["bytes_returned"] = len(report.encode("utf-8"))
+        logger.info(
+            f"Rapport gegenereerd: {len(report)} tekens, "
+            f"{usage_summary(response.usage)}"
+        )
+        if failed:
+            note = "\n\n" + INCOMPLETE_NOTE.format(names="; ".join(failed)) + "\n"
+            if on_text is not None:
+                on_text(note)
+            report += note
+        return report
+    except Exception as e:
+        logger.error(f"Fout bij samenvoegen analyse: {e}")
+        return f"{ERROR_HEADING}\n\n{e}"
+
+
+def _analyze_single(
+    client: anthropic.Anthropic,
+    model: str,
+    request: dict,
+    limiter: RateLimiter | None,
+    on_text: Callable[[str], None] | None = None,
+    retry: RetryPolicy | None = None,
+) -> str:
+    """Analyse in één call."""
+    try:
+        with metrics.track("analyze", "rapport") as record:
+            response = _create_report_message(
+                client,
+                limiter,
+                on_text,
+                retry or RetryPolicy(),
+                "rapport",
+                model=model,
+                max_tokens=8192,
+                **request,
+            )
+            report = response.content[0].text
+            record["bytes_returned"] = len(report.encode("utf-8"))
+        logger.info(
+            f"Rapport gegenereerd: {len(report)} tekens, "
+            f"{usage_summary(response.usage)}"
         )
-        report = response.content[0].text
-        logger.info(f"Rapport gegenereerd: {len(report)} tekens")
         return report
     except Exception as e:
         logger.error(f"Fout bij analyse: {e}")
-        return f"# Fout bij het genereren van het rapport\n\n{e}"
+        return f"{ERROR_HEADING}\n\n{e}"
+
+
+def analyze_results(
+    client: anthropic.Anthropic,
+    model: str,
+    search_results: list[dict],
+    system_design: str,
+    current_setup: str,
+    source_weights_text: str,
+    limiter: RateLimiter | None = None,
+    chunk_tokens: int | None = None,
+    max_workers: int = 4,
+    cache: ResponseCache | None = None,
+    on_text: Callable[[str], None] | None = None,
+    retry: RetryPolicy | None = None,
+    previous_text: str = "",
+    failed_chunks: list[str] | None = None,
+) -> str:
+    """
+    Stuur zoekresultaten en referentiebestanden naar Claude voor analyse.
+
+    Als chunk_tokens gezet is en de zoekresultaten groter zijn dan dat,
+    wordt de analyse gefaseerd uitgevoerd (zie analyze_results_staged).
+    Met een cache wordt een rapport voor exact dezelfde invoer hergebruikt.
+    Met on_text wordt het rapport gestreamd en gaat elk tekstfragment naar
+    on_text zodra het binnenkomt. previous_text (eerdere voorstellen uit
+    het archief) gaat mee in het user-bericht. Mislukte delen van een
+    gefaseerde analyse komen in failed_chunks; zo'n onvolledig rapport gaat
+    niet in de cache.
+
+    Returns het gegenereerde Markdown-rapport.
+    """
+    request = build_analysis_request(
+        search_results, system_design, current_setup, source_weights_text,
+        previous_text,
+    )
+
+    key = None
+    if cache is not None:
+        key = ResponseCache.key({
+            "model": model,
+            "max_tokens": 8192,
+            "chunk_tokens": chunk_tokens,
+            **request,
+        })
+        cached = cache.get(key)
+        if cached is not None:
+            logger.info("Rapport uit cache")
+            return cached["report"]
+
+    failed = []
+    if chunk_tokens and (
+        estimate_tokens(build_results_text(search_results)) > chunk_tokens
+    ):
+        report = analyze_results_staged(
+            client, model, search_results, system_design, current_setup,
+            source_weights_text, limiter=limiter, chunk_tokens=chunk_tokens,
+            max_workers=max_workers, on_text=on_text, retry=retry,
+            previous_text=previous_text, failed_chunks=failed,
+        )
+    else:
+        report = _analyze_single(client, model, request, limiter, on_text, retry)
+    if failed_chunks is not None:
+        failed_chunks.extend(failed)
+
+    if cache is not None and not failed and not report.startswith(ERROR_HEADING):
+        cache.set(key, {"report": report})
+    return report
@@ -0,0 +1,285 @@
+"""
+Archief — doorzoekbare index van alle eerdere rapporten en zoekresultaten.
+
+Een SQLite-database met een FTS5-index over de voorstellen uit elk
+rapport-*.md en de artikelen uit elk opgeslagen zoekresultaat
+(runs/<run-id>/[onderwerp/]search/*.json). De index wordt incrementeel
+bijgewerkt: alleen bestanden die nieuw of gewijzigd zijn sinds de vorige
+update worden (opnieuw) gelezen. `python main.py query "hooks security"`
+doorzoekt het archief; de analyse gebruikt het om eerdere voorstellen mee
+te geven, zodat die niet elke week terugkomen.
+"""
+
+import json
+import logging
+import re
+import sqlite3
+import threading
+from pathlib import Path
+
+from src.dedup import MARKDOWN_LINK, article_fields, split_articles
+
+logger = logging.getLogger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS files (
+    path TEXT PRIMARY KEY,
+    mtime_ns INTEGER NOT NULL,
+    size INTEGER NOT NULL
+);
+CREATE VIRTUAL TABLE IF NOT EXISTS entries USING fts5(
+    category, title, url, body,
+    kind UNINDEXED, topic UNINDEXED, date UNINDEXED, path UNINDEXED,
+    tokenize = 'unicode61 remove_diacritics 2'
+);
+"""
+
+REPORT_DATE = re.compile(r"rapport-(\d{4}-\d{2}-\d{2})")
+PROPOSAL_HEADING = re.compile(r"^###\s+(.+)$", re.MULTILINE)
+
+
+def fts_query(text: str) -> str:
+    """
+    Maak van vrije tekst een veilige FTS5-query.
+
+    Elk woord wordt een gequote term (alle termen moeten voorkomen), zodat
+    tekens als - en : geen FTS5-syntax worden. Een * aan het eind van een
+    woord blijft een prefix-zoekopdracht.
+    """
+    terms = []
+    for word in text.split():
+        prefix = word.endswith("*")
+        word = word.rstrip("*").replace('"', '""')
+        if word:
+            terms.append(f'"{word}"' + ("*" if prefix else ""))
+    return " ".join(terms)
+
+
+def parse_report(text: str) -> list[dict]:
+    """
+    Lees de voorstellen uit een rapport.
+
+    Elk ### [Categorie]-blok wordt één voorstel met de tekst na
+    **Voorstel:** als titel en de eerste link uit **Bron:** als URL.
+    """
+    proposals = []
+    headings = list(PROPOSAL_HEADING.finditer(text))
+    for i, heading in enumerate(headings):
+        end = headings[i + 1].start() if i + 1 < len(headings) else len(text)
+        section = text[heading.end():end]
+        # Een volgende ##-sectie hoort niet meer bij het voorstel
+        section = re.split(r"^##\s", section, maxsplit=1, flags=re.MULTILINE)[0]
+        fields = {}
+        for line in section.splitlines():
+            match = re.match(r"\*\*(\w+):\*\*\s*(.*)", line.strip())
+            if match:
+                fields[match.group(1).lower()] = match.group(2).strip()
+        if "voorstel" not in fields:
+            continue
+        bron = fields.get("bron", "")
+        links = MARKDOWN_LINK.findall(bron)
+        url = links[0][1] if links else next(
+            (word for word in bron.split() if word.startswith("http")), ""
+        )
+        proposals.append({
+            "category": heading.group(1).strip().strip("[]"),
+            "title": fields["voorstel"],
+            "url": url.rstrip(".,;"),
+            "body": section.strip(),
+        })
+    return proposals
+
+
+def parse_search_result(result: dict) -> list[dict]:
+    """De artikelen uit één opgeslagen zoekresultaat."""
+    if result["raw_output"].startswith("FOUT:"):
+        return []
+    articles = []
+    for block in split_articles(result["raw_output"])[0]:
+        fields = article_fields(block)
+        articles.append({
+            "category": result.get("name", ""),
+            "title": fields.get("TITEL", ""),
+            "url": fields.get("URL", ""),
+            "body": block,
+        })
+    return articles
+
+
+class Archive:
+    """
+    FTS5-archief van rapporten en zoekresultaten.
+
+    Eén database voor alle onderwerpen; elke entry onthoudt onderwerp,
+    datum, soort ("proposal" of "article") en het bronbestand. Thread-safe:
+    onderwerpen worden parallel afgerond.
+    """
+
+    def __init__(self, path: str):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._db = sqlite3.connect(self.path, check_same_thread=False)
+        self._db.row_factory = sqlite3.Row
+        self._lock = threading.Lock()
+        with self._lock, self._db:
+            self._db.executescript(SCHEMA)
+
+    def close(self) -> None:
+        self._db.close()
+
+    # --- bijwerken ---
+
+    def _index_file(self, path: Path, kind: str, topic: str, entries) -> bool:
+        """(Her)indexeer één bestand als het nieuw of gewijzigd is."""
+        stat = path.stat()
+        key = str(path)
+        row = self._db.execute(
+            "SELECT mtime_ns, size FROM files WHERE path = ?", (key,)
+        ).fetchone()
+        if row is not None and tuple(row) == (stat.st_mtime_ns, stat.st_size):
+            return False
+        date, rows = entries(path)
+        self._db.execute("DELETE FROM entries WHERE path = ?", (key,))
+        self._db.executemany(
+            "INSERT INTO entries (category, title, url, body, kind, topic, date, path)"
+            " VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            [
+                (e["category"], e["title"], e["url"], e["body"],
+                 kind, topic, date, key)
+                for e in rows
+            ],
+        )
+        self._db.execute(
+            "INSERT OR REPLACE INTO files (path, mtime_ns, size) VALUES (?, ?, ?)",
+            (key, stat.st_mtime_ns, stat.st_size),
+        )
+        return True
+
+    def update(
+        self, topic: str, report_dirs: list[str], runs_dir: str | None = None
+    ) -> int:
+        """
+        Indexeer nieuwe en gewijzigde rapporten en zoekresultaten.
+
+        Rapporten komen uit report_dirs, zoekresultaten uit de runs van dit
+        onderwerp in runs_dir. Hetzelfde rapport in reports/ en
+        publications/ wordt één keer geïndexeerd.
+
+        Returns het aantal (opnieuw) geïndexeerde bestanden.
+        """
+        def report_entries(path: Path):
+            match = REPORT_DATE.match(path.name)
+            return (
+                match.group(1) if match else "",
+                parse_report(path.read_text(encoding="utf-8")),
+            )
+
+        def result_entries(path: Path):
+            run_id = path.parents[2 if topic else 1].name
+            result = json.loads(path.read_text(encoding="utf-8"))
+            return run_id[:10], parse_search_result(result)
+
+        added = 0
+        with self._lock, self._db:
+            names = set()
+            for report_dir in report_dirs:
+                for path in sorted(Path(report_dir).glob("rapport-*.md")):
+                    if path.name in names:
+                        continue
+                    names.add(path.name)
+                    added += self._index_file(path, "proposal", topic, report_entries)
+            if runs_dir:
+                pattern = f"*/{topic}/search/*.json" if topic else "*/search/*.json"
+                for path in sorted(Path(runs_dir).glob(pattern)):
+                    added += self._index_file(path, "article", topic, result_entries)
+        if added:
+            logger.info(f"Archief: {added} bestanden geïndexeerd")
+        return added
+
+    # --- zoeken ---
+
+    def search(
+        self,
+        query: str,
+        limit: int = 20,
+        kind: str | None = None,
+        topic: str | None = None,
+        before: str | None = None,
+        column: str | None = None,
+    ) -> list[dict]:
+        """
+        Zoek in het archief, best passende resultaten eerst (bm25).
+
+        Met kind, topic en before (datum, exclusief) wordt gefilterd; met
+        column wordt alleen in die kolom gezocht (bijv. "category").
+        """
+        match = fts_query(query)
+        if not match:
+            return []
+        if column:
+            match = f"{column} : ({match})"
+        sql = (
+            "SELECT kind, topic, date, category, title, url,"
+            " snippet(entries, 3, '[', ']', ' … ', 12) AS snippet"
+            " FROM entries WHERE entries MATCH ?"
+        )
+        params: list = [match]
+        for clause, value in (
+            (" AND kind = ?", kind),
+            (" AND topic = ?", topic),
+            (" AND date < ?", before),
+        ):
+            if value is not None:
+                sql += clause
+                params.append(value)
+        sql += " ORDER BY bm25(entries, 5.0, 10.0, 2.0, 1.0), date DESC LIMIT ?"
+        params.append(limit)
+        with self._lock:
+            return [dict(row) for row in self._db.execute(sql, params)]
+
+    def previous_proposals(
+        self,
+        categories: list[str],
+        topic: str,
+        before: str,
+        per_category: int = 3,
+        limit: int = 20,
+    ) -> list[dict]:
+        """Eerdere voorstellen in dezelfde categorieën, van vóór `before`."""
+        found = []
+        seen = set()
+        for category in categories:
+            for row in self.search(
+                category, limit=per_category, kind="proposal", topic=topic,
+                before=before, column="category",
+            ):
+                key = (row["date"], row["title"])
+                if key not in seen:
+                    seen.add(key)
+                    found.append(row)
+        found.sort(key=lambda row: row["date"], reverse=True)
+        return found[:limit]
+
+
+def format_previous(proposals: list[dict]) -> str:
+    """Zet eerdere voorstellen om naar een blok voor de analyseprompt."""
+    if not proposals:
+        return ""
+    lines = [
+        f"- {p['date']} · {p['category']}: {p['title']}"
+        + (f" ({p['url']})" if p["url"] else "")
+        for p in proposals
+    ]
+    return (
+        "## EERDER VOORGESTELD\n\n"
+        "Deze voorstellen stonden al in eerdere rapporten. Herhaal ze alleen "
+        "als er echt iets nieuws over te melden is, en verwijs dan naar het "
+        "eerdere voorstel.\n\n" + "\n".join(lines) + "\n"
+    )
+
+
+def create_archive(config: dict, path: str) -> Archive | None:
+    """Maak het archief uit de `archive` sectie van config.yaml (of None)."""
+    if not config.get("enabled", True):
+        return None
+    return Archive(config.get("path", path))
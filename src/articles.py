@@ -0,0 +1,193 @@
+"""
+Artikelen — zet zoekoutput om naar compacte, getypeerde records.
+
+De zoekfase levert tekst in het TITEL/AUTEUR/BRON/URL/DATUM/INZICHT/
+RELEVANTIE-format. ArticleParser leest die regel voor regel terwijl de tekst
+binnenkomt en levert een Article zodra een blok compleet is. Daarna gaan
+alleen artikelen met een geverifieerde URL (uit extract_sources) en een
+voldoende relevantiescore door naar de analyse.
+"""
+
+import logging
+import re
+from collections.abc import Iterator
+
+from src.dedup import normalize_url
+
+logger = logging.getLogger(__name__)
+
+FIELDS = {
+    "TITEL": "title",
+    "AUTEUR": "author",
+    "BRON": "source",
+    "URL": "url",
+    "DATUM": "date",
+    "INZICHT": "insight",
+    "RELEVANTIE": "relevance",
+}
+
+SOURCES_HEADING = "GEVERIFIEERDE BRONNEN:"
+
+
+class Article:
+    """Eén artikel uit de zoekoutput."""
+
+    __slots__ = ("title", "author", "source", "url", "date", "insight", "relevance")
+
+    def __init__(
+        self,
+        title: str = "",
+        author: str = "",
+        source: str = "",
+        url: str = "",
+        date: str = "",
+        insight: str = "",
+        relevance: int = 0,
+    ):
+        self.title = title
+        self.author = author
+        self.source = source
+        self.url = url
+        self.date = date
+        self.insight = insight
+        self.relevance = relevance
+
+    @classmethod
+    def from_fields(cls, fields: dict[str, str]) -> "Article":
+        """Maak een Article uit de velden van één blok (TITEL: ... enz.)."""
+        values = {FIELDS[key]: value for key, value in fields.items() if key in FIELDS}
+        match = re.search(r"\d+", values.pop("relevance", ""))
+        return cls(**values, relevance=int(match.group()) if match else 0)
+
+    def to_text(self) -> str:
+        """Het artikel terug in het zoekformat, zonder lege velden."""
+        lines = []
+        for key, attr in FIELDS.items():
+            value = getattr(self, attr)
+            if value:
+                lines.append(f"{key}: {value}")
+        return "\n".join(lines)
+
+    def __eq__(self, other) -> bool:
+        if not isinstance(other, Article):
+            return NotImplemented
+        return all(getattr(self, a) == getattr(other, a) for a in self.__slots__)
+
+    def __repr__(self) -> str:
+        return f"Article(title={self.title!r}, url={self.url!r})"
+
+
+class ArticleParser:
+    """
+    Incrementele parser: feed() tekstfragmenten, krijg complete artikelen.
+
+    Een artikel is compleet bij een "---"-regel, bij een nieuwe TITEL of bij
+    close(). Regels zonder veldnaam horen bij het vorige veld. Alles na
+    GEVERIFIEERDE BRONNEN wordt genegeerd.
+    """
+
+    def __init__(self):
+        self._buffer = ""
+        self._fields: dict[str, str] = {}
+        self._last_key: str | None = None
+        self._done = False
+
+    def feed(self, text: str) -> Iterator[Article]:
+        self._buffer += text
+        *lines, self._buffer = self._buffer.split("\n")
+        for line in lines:
+            yield from self._line(line)
+
+    def close(self) -> Iterator[Article]:
+        if self._buffer:
+            yield from self._line(self._buffer)
+            self._buffer = ""
+        yield from self._flush()
+
+    def _line(self, line: str) -> Iterator[Article]:
+        if self._done:
+            return
+        stripped = line.strip()
+        if stripped.startswith(SOURCES_HEADING):
+            self._done = True
+            yield from self._flush()
+            return
+        if stripped == "---":
+            yield from self._flush()
+            return
+        key, sep, value = stripped.partition(":")
+        key = key.strip()
+        if sep and key in FIELDS:
+            if key == "TITEL" and "TITEL" in self._fields:
+                yield from self._flush()
+            self._fields[key] = value.strip()
+            self._last_key = key
+        elif stripped and self._last_key:
+            self._fields[self._last_key] += " " + stripped
+
+    def _flush(self) -> Iterator[Article]:
+        fields, self._fields, self._last_key = self._fields, {}, None
+        if "TITEL" in fields or "URL" in fields:
+            yield Article.from_fields(fields)
+
+
+def parse_articles(raw_output: str) -> list[Article]:
+    """Alle artikelen uit een complete zoekoutput."""
+    parser = ArticleParser()
+    return [*parser.feed(raw_output), *parser.close()]
+
+
+def format_articles(
+    articles: list[Article], sources: dict[str, str]
+) -> tuple[str, dict[str, str]]:
+    """
+    Zet artikelen terug in het zoekformat, met hun GEVERIFIEERDE BRONNEN.
+
+    Alleen bronnen van de meegegeven artikelen blijven staan; de
+    analyseprompt citeert uitsluitend URLs uit die sectie.
+
+    Returns (zoekoutput, overgebleven bronnen).
+    """
+    urls = {normalize_url(article.url) for article in articles if article.url}
+    kept = {url: title for url, title in sources.items() if normalize_url(url) in urls}
+    text = "\n---\n".join(article.to_text() for article in articles) + "\n---"
+    if kept:
+        source_lines = [f"- [{t}]({u})" for u, t in kept.items()]
+        text += f"\n\n{SOURCES_HEADING}\n" + "\n".join(source_lines)
+    return text, kept
+
+
+def select_articles(
+    results: list[dict], min_relevance: int = 0, require_verified: bool = True
+) -> tuple[list[dict], dict[str, int]]:
+    """
+    Houd per resultaat alleen de artikelen over die de analyse waard zijn.
+
+    Een artikel blijft als de relevantiescore minstens min_relevance is en,
+    met require_verified, de URL voorkomt in de geverifieerde bronnen van
+    het resultaat. De overgebleven artikelen worden opnieuw in het
+    zoekformat gezet, met hun geverifieerde bronnen (format_articles);
+    resultaten zonder artikelen vallen weg.
+
+    Returns (resultaten, tellingen: kept, unverified, low_relevance).
+    """
+    stats = {"kept": 0, "unverified": 0, "low_relevance": 0}
+    selected = []
+    for result in results:
+        verified = {normalize_url(url) for url in result.get("sources", {})}
+        kept = []
+        for article in parse_articles(result["raw_output"]):
+            if require_verified and (
+                not article.url or normalize_url(article.url) not in verified
+            ):
+                stats["unverified"] += 1
+            elif article.relevance < min_relevance:
+                stats["low_relevance"] += 1
+            else:
+                kept.append(article)
+        stats["kept"] += len(kept)
+        if not kept:
+            continue
+        raw_output, sources = format_articles(kept, result.get("sources", {}))
+        selected.append({**result, "raw_output": raw_output, "sources": sources})
+    return selected, stats
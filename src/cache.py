@@ -0,0 +1,112 @@
+"""
+Responscache — bewaart resultaten van Claude-calls op schijf.
+
+De sleutel is een hash van het volledige request (model, prompt, tools,
+max_tokens), dus een herhaalde run met dezelfde invoer kost niets. Entries
+verlopen na een TTL en de cache blijft onder een maximale grootte door de
+minst recent gebruikte entries te verwijderen.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from pathlib import Path
+
+logger = logging.getLogger(__name__)
+
+
+class ResponseCache:
+    """Content-addressed cache met TTL en LRU-eviction op grootte."""
+
+    def __init__(
+        self,
+        directory: str,
+        ttl_seconds: float = 24 * 60 * 60,
+        max_bytes: int = 50 * 1024 * 1024,
+        clock=time.time,
+    ):
+        self.directory = Path(directory)
+        self.ttl_seconds = ttl_seconds
+        self.max_bytes = max_bytes
+        self._clock = clock
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(request: dict) -> str:
+        """Stabiele hash van een request-dict."""
+        payload = json.dumps(request, sort_keys=True, ensure_ascii=False)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def _path(self, key: str) -> Path:
+        return self.directory / key[:2] / f"{key}.json"
+
+    def get(self, key: str) -> dict | None:
+        """Geef de opgeslagen waarde, of None bij een miss of verlopen entry."""
+        path = self._path(key)
+        try:
+            entry = json.loads(path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return None
+        if self._clock() - entry.get("created", 0) > self.ttl_seconds:
+            path.unlink(missing_ok=True)
+            return None
+        # mtime is de laatste toegang, voor LRU-eviction
+        now = self._clock()
+        try:
+            os.utime(path, (now, now))
+        except OSError:
+            pass
+        return entry["value"]
+
+    def set(self, key: str, value: dict) -> None:
+        """Sla een waarde atomair op en ruim daarna zo nodig op."""
+        path = self._path(key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_name(
+            f"{path.name}.{os.getpid()}.{threading.get_ident()}.tmp"
+        )
+        entry = {"created": self._clock(), "value": value}
+        tmp.write_text(json.dumps(entry, ensure_ascii=False), encoding="utf-8")
+        os.replace(tmp, path)
+        now = self._clock()
+        os.utime(path, (now, now))
+        self.evict()
+
+    def evict(self) -> None:
+        """Verwijder de minst recent gebruikte entries tot onder max_bytes."""
+        with self._lock:
+            entries = []
+            for path in self.directory.glob("*/*.json"):
+                try:
+                    stat = path.stat()
+                except OSError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, path))
+
+            entries.sort()
+            total = sum(size for _, size, _ in entries)
+            for _, size, path in entries:
+                if total <= self.max_bytes:
+                    break
+                path.unlink(missing_ok=True)
+                total -= size
+                logger.debug(f"Cache-entry verwijderd: {path.name}")
+
+    def clear(self) -> None:
+        """Verwijder alle entries."""
+        for path in self.directory.glob("*/*.json"):
+            path.unlink(missing_ok=True)
+
+
+def create_response_cache(config: dict | None) -> ResponseCache | None:
+    """Maak een cache uit de `cache` sectie van config.yaml, indien aanwezig."""
+    if not config or not config.get("enabled", True):
+        return None
+    return ResponseCache(
+        directory=config.get("dir", "cache"),
+        ttl_seconds=config.get("ttl_hours", 24) * 60 * 60,
+        max_bytes=int(config.get("max_size_mb", 50) * 1024 * 1024),
+    )
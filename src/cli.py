@@ -0,0 +1,397 @@
+"""
+Command-line interface — `python main.py <command>`.
+
+Commands:
+    run      volledige run: zoeken, analyseren, opslaan en versturen
+    search   alleen de zoekfase, in een nieuwe run
+    analyze  analyse en rapport van een run, zonder e-mail
+    send     verstuur wachtende e-mails, of het rapport van een run
+    resume   hervat een run: alleen ontbrekende of mislukte stappen
+    stats    prestatieoverzicht en stappen van een run
+    query    doorzoek het archief van eerdere rapporten en zoekresultaten
+    trends   hitrate per prompt, nieuwe domeinen en relevantie over de weken
+    plan     planning van de zoekprompts voor de volgende run (dry run)
+    check    controleer config.yaml en de prompt- en referentiebestanden
+
+Zonder command draait `run` (zoals de cronjob doet). Deze module importeert
+alleen de standaardbibliotheek; elk command laadt zelf de modules die het
+nodig heeft, zodat `--help`, `check`, `stats`, `query`, `trends` en `plan`
+de Anthropic- en Resend-SDK's niet laden. Dat scheelt seconden in een koude container.
+"""
+
+import argparse
+import logging
+import sys
+
+logger = logging.getLogger("scout")
+
+
+def setup_logging() -> None:
+    """Log naar stdout en scout.log."""
+    logging.basicConfig(
+        level=logging.INFO,
+        format="%(asctime)s [%(levelname)s] %(name)s: %(message)s",
+        handlers=[
+            logging.StreamHandler(sys.stdout),
+            logging.FileHandler("scout.log"),
+        ],
+    )
+
+
+def build_parser() -> argparse.ArgumentParser:
+    """Parser met de subcommands."""
+    parser = argparse.ArgumentParser(
+        prog="main.py",
+        description="Claude Code Scout",
+        epilog="Zonder command wordt 'run' uitgevoerd.",
+    )
+    parser.add_argument(
+        "--config", default="config.yaml", help="pad naar config.yaml"
+    )
+    parser.add_argument(
+        "--no-cache",
+        action="store_true",
+        help="negeer de responscache en doe alle Claude-calls opnieuw",
+    )
+    parser.add_argument(
+        "--resume",
+        metavar="RUN_ID",
+        help="hetzelfde als het command 'resume RUN_ID'",
+    )
+
+    # Ook na het command te geven; SUPPRESS laat de waarde van hierboven staan
+    cache = argparse.ArgumentParser(add_help=False)
+    cache.add_argument(
+        "--no-cache",
+        action="store_true",
+        default=argparse.SUPPRESS,
+        help="negeer de responscache en doe alle Claude-calls opnieuw",
+    )
+
+    commands = parser.add_subparsers(dest="command", metavar="COMMAND")
+    run = commands.add_parser(
+        "run", parents=[cache], help="volledige run (standaard)"
+    )
+    run.add_argument(
+        "--dry-run",
+        action="store_true",
+        help="toon alleen de planning van de zoekprompts (zoals 'plan')",
+    )
+    commands.add_parser(
+        "search", parents=[cache], help="alleen de zoekfase, in een nieuwe run"
+    )
+    analyze = commands.add_parser(
+        "analyze",
+        parents=[cache],
+        help="analyse en rapport van een run, zonder e-mail",
+    )
+    analyze.add_argument("run_id", metavar="RUN_ID")
+    send = commands.add_parser(
+        "send", help="verstuur wachtende e-mails, of het rapport van een run"
+    )
+    send.add_argument("run_id", metavar="RUN_ID", nargs="?")
+    resume = commands.add_parser(
+        "resume", parents=[cache], help="hervat een run"
+    )
+    resume.add_argument("run_id", metavar="RUN_ID")
+    stats = commands.add_parser(
+        "stats", help="prestatieoverzicht van een run (standaard de nieuwste)"
+    )
+    stats.add_argument("run_id", metavar="RUN_ID", nargs="?")
+    query = commands.add_parser(
+        "query", help="doorzoek het archief van eerdere rapporten en zoekresultaten"
+    )
+    query.add_argument("terms", metavar="ZOEKTERMEN", help='bijv. "hooks security"')
+    query.add_argument("--limit", type=int, default=20, help="maximaal aantal")
+    query.add_argument(
+        "--kind",
+        choices=("proposal", "article"),
+        help="alleen voorstellen uit rapporten of artikelen uit zoekresultaten",
+    )
+    query.add_argument("--topic", help="alleen dit onderwerp")
+    trends = commands.add_parser(
+        "trends", help="hitrate per prompt, nieuwe domeinen en relevantie per week"
+    )
+    trends.add_argument(
+        "--weeks", type=int, default=8, help="aantal weken in de overzichten"
+    )
+    commands.add_parser(
+        "plan", help="planning van de zoekprompts voor de volgende run (dry run)"
+    )
+    commands.add_parser(
+        "check", help="controleer config.yaml en de prompt- en referentiebestanden"
+    )
+    return parser
+
+
+def _load(args: argparse.Namespace) -> tuple[dict, list[dict]]:
+    from src.config import load_config, load_topics
+
+    config = load_config(args.config)
+    return config, load_topics(config)
+
+
+def cmd_run(args: argparse.Namespace) -> int:
+    if getattr(args, "dry_run", False):
+        return cmd_plan(args)
+    from src.pipeline import execute_run
+
+    config, topics = _load(args)
+    execute_run(config, topics, resume_id=args.run_id, no_cache=args.no_cache)
+    return 0
+
+
+def cmd_search(args: argparse.Namespace) -> int:
+    from src.pipeline import execute_run
+
+    config, topics = _load(args)
+    run_id = execute_run(
+        config, topics, no_cache=args.no_cache, finish=False, send=False
+    )
+    logger.info(f"Zoekresultaten in run {run_id}; verder met: analyze {run_id}")
+    return 0
+
+
+def cmd_analyze(args: argparse.Namespace) -> int:
+    from src.pipeline import execute_run
+
+    config, topics = _load(args)
+    execute_run(
+        config, topics, resume_id=args.run_id, no_cache=args.no_cache,
+        search=False, send=False,
+    )
+    return 0
+
+
+def cmd_send(args: argparse.Namespace) -> int:
+    from src.config import state_path
+    from src.outbox import (
+        create_outbox_worker,
+        mark_email_sent,
+        queue_report,
+        stop_worker,
+    )
+    from src.render import create_renderer
+    from src.run_store import open_runs
+    from src.transport import create_transport
+
+    config, topics = _load(args)
+    runs_dir = config["paths"].get("runs_dir", "runs")
+    runs = {}
+    if args.run_id:
+        try:
+            runs = open_runs(runs_dir, topics, args.run_id)
+        except FileNotFoundError as e:
+            logger.error(str(e))
+            return 1
+    worker = create_outbox_worker(
+        config, on_sent=lambda entry: mark_email_sent(runs_dir, runs, entry)
+    )
+    renderer = None
+    if config.get("report", {}).get("html", True):
+        renderer = create_renderer(state_path(config, "render"))
+    for topic in topics:
+        run = runs.get(topic["name"])
+        if run is None or run.stage_done("email"):
+            continue
+        if run.manifest["stages"]["email"]["status"] == "skipped":
+            logger.info(f"Run {run.label} had geen nieuwe resultaten")
+            continue
+        if not run.stage_done("save"):
+            logger.warning(f"Run {run.label} heeft nog geen opgeslagen rapport")
+            continue
+        report = run.load_report()
+        rendered = renderer.render(report) if renderer is not None else None
+        queue_report(
+            worker, config["email"], topic, run, report, rendered,
+            notice=not run.stage_done("analyze"),
+        )
+    with create_transport(None, config.get("http")) as transport:
+        transport.install_resend()
+        worker.start()
+        left = stop_worker(worker, config["email"].get("send_timeout", 120))
+    return 1 if left else 0
+
+
+def cmd_stats(args: argparse.Namespace) -> int:
+    from pathlib import Path
+
+    from src.metrics import Metrics
+    from src.run_store import RunStore, latest_run_id
+
+    config, topics = _load(args)
+    runs_dir = config["paths"].get("runs_dir", "runs")
+    run_id = args.run_id or latest_run_id(runs_dir)
+    if run_id is None:
+        print(f"Geen runs in {runs_dir}")
+        return 1
+
+    print(f"Run {run_id}")
+    for topic in topics:
+        try:
+            run = RunStore.resume(runs_dir, run_id, topic["name"])
+        except FileNotFoundError:
+            continue
+        stages = ", ".join(
+            f"{stage} {info['status']}"
+            for stage, info in run.manifest["stages"].items()
+        )
+        print(f"  {topic['name'] or 'rapport'}: {stages}")
+
+    metrics = Metrics()
+    metrics_path = Path(runs_dir) / run_id / "metrics.json"
+    if not metrics.load_json(str(metrics_path)):
+        print(f"Geen metrics gevonden: {metrics_path}")
+        return 1
+    print(metrics.summary_table())
+    return 0
+
+
+def cmd_query(args: argparse.Namespace) -> int:
+    import time
+
+    from src.archive import create_archive
+    from src.config import state_path
+
+    config, topics = _load(args)
+    archive = create_archive(
+        config.get("archive", {}), state_path(config, "archive.db")
+    )
+    if archive is None:
+        print("Het archief staat uit (archive.enabled)")
+        return 1
+    start = time.perf_counter()
+    runs_dir = config["paths"].get("runs_dir", "runs")
+    try:
+        for topic in topics:
+            report_dirs = [topic["reports_dir"]]
+            if topic.get("publications_dir"):
+                report_dirs.append(topic["publications_dir"])
+            archive.update(topic["name"], report_dirs, runs_dir)
+        rows = archive.search(
+            args.terms, limit=args.limit, kind=args.kind, topic=args.topic
+        )
+    finally:
+        archive.close()
+    elapsed = (time.perf_counter() - start) * 1000
+
+    kinds = {"proposal": "voorstel", "article": "artikel"}
+    for row in rows:
+        topic = f"[{row['topic']}] " if row["topic"] else ""
+        print(f"{row['date']}  {kinds[row['kind']]:<8}  {topic}"
+              f"{row['category']}: {row['title']}")
+        if row["url"]:
+            print(f"    {row['url']}")
+        print(f"    {row['snippet']}")
+    print(f"{len(rows)} resultaten in {elapsed:.0f} ms")
+    return 0
+
+
+def cmd_trends(args: argparse.Namespace) -> int:
+    from pathlib import Path
+
+    from src.config import state_path
+    from src.history import ArticleHistory
+
+    config, topics = _load(args)
+    for topic in topics:
+        path = state_path(config, "history", topic["name"])
+        if topic["name"]:
+            print(f"== {topic['name']} ==")
+        history = ArticleHistory(path) if Path(path).is_dir() else None
+        if history is None or not len(history):
+            print(f"Geen historie in {path}")
+            continue
+        hit_rate = history.hit_rate()
+        trend = history.relevance_trend()
+        weeks = sorted({w for prompt in trend.values() for w in prompt})
+        weeks = weeks[-args.weeks:]
+        print(f"{len(history)} rijen, {len(history.strings['runs'].values) - 1} "
+              f"runs ({path})\n")
+        print(f"{'prompt':<28} {'runs':>5} {'hits':>5} {'hitrate':>8} "
+              f"{'artikelen':>9}  relevantie per week")
+        # Laagste hitrate eerst: kandidaten om te herschrijven of te schrappen
+        for prompt, stats in sorted(hit_rate.items(), key=lambda i: i[1]["rate"]):
+            relevance = " ".join(
+                f"{trend[prompt][w]:.1f}" if w in trend.get(prompt, {}) else "  -"
+                for w in weeks
+            )
+            print(f"{prompt:<28} {stats['runs']:>5} {stats['hits']:>5} "
+                  f"{stats['rate']:>8.0%} {stats['articles']:>9}  {relevance}")
+        print("\nNieuwe domeinen per week:")
+        for week, count in list(history.new_domains_per_week().items())[-args.weeks:]:
+            print(f"  {week}  {count}")
+    return 0
+
+
+def cmd_plan(args: argparse.Namespace) -> int:
+    from datetime import date
+
+    from src.config import load_prompts, state_path
+    from src.scheduler import create_scheduler, format_plan
+    from src.watermarks import Watermarks
+
+    config, topics = _load(args)
+    scheduler = create_scheduler(
+        config.get("scheduler", {}), state_path(config, "prompt_stats.json")
+    )
+    if scheduler is None:
+        print("De scheduler staat uit (scheduler.enabled): alle prompts draaien")
+        return 0
+    today = date.today()
+    prompts = {}
+    for topic in topics:
+        topic_prompts = load_prompts(topic["prompts"])["prompts"]
+        # Zoals run_pipeline: wat vandaag al gezocht is valt er eerst af
+        if config["search"].get("incremental", True):
+            marks = Watermarks(
+                state_path(config, "watermarks.json", topic["name"]),
+                default_days=config["search"].get("window_days", 7),
+            )
+            topic_prompts, _ = marks.apply(topic_prompts, today)
+        prompts[topic["name"]] = topic_prompts
+    plan = scheduler.plan(prompts, today)
+    print(format_plan(plan, scheduler.budget_left(today)))
+    return 0
+
+
+def cmd_check(args: argparse.Namespace) -> int:
+    from src.config import load_config, validate_config
+
+    problems = validate_config(load_config(args.config))
+    for problem in problems:
+        print(f"FOUT: {problem}")
+    if problems:
+        return 1
+    print(f"{args.config} is in orde")
+    return 0
+
+
+COMMANDS = {
+    "run": cmd_run,
+    "search": cmd_search,
+    "analyze": cmd_analyze,
+    "send": cmd_send,
+    "resume": cmd_run,
+    "stats": cmd_stats,
+    "query": cmd_query,
+    "trends": cmd_trends,
+    "plan": cmd_plan,
+    "check": cmd_check,
+}
+
+
+def main(argv: list[str] | None = None) -> int:
+    args = build_parser().parse_args(argv)
+    if args.command is None:
+        args.command = "resume" if args.resume else "run"
+    if args.command in ("run", "resume") and getattr(args, "run_id", None) is None:
+        args.run_id = args.resume
+    setup_logging()
+
+    if args.command in ("run", "resume"):
+        logger.info("=== Claude Code Scout gestart ===")
+        code = COMMANDS[args.command](args)
+        logger.info("=== Claude Code Scout afgerond ===")
+        return code
+    return COMMANDS[args.command](args)
@@ -0,0 +1,164 @@
+"""
+Configuratie — config.yaml, zoekprompts en onderwerpen laden en controleren.
+
+Deze module laadt alleen yaml, zodat `python main.py check` en `--help` snel
+blijven: de Anthropic- en Resend-SDK's komen pas binnen bij een command dat
+ze nodig heeft.
+"""
+
+import logging
+import re
+import sys
+from collections import Counter
+from pathlib import Path
+
+import yaml
+
+logger = logging.getLogger("scout")
+
+REQUIRED_KEYS = {
+    "anthropic": ("api_key", "model"),
+    "email": ("resend_api_key", "from_address", "to_address", "subject_prefix"),
+    "paths": ("reports_dir",),
+    "search": (),
+}
+
+
+def load_config(path: str = "config.yaml") -> dict:
+    """Laad configuratie uit YAML."""
+    config_path = Path(path)
+    if not config_path.exists():
+        logger.error(
+            f"Config niet gevonden: {path}. "
+            "Kopieer config.example.yaml naar config.yaml en vul je gegevens in."
+        )
+        sys.exit(1)
+    with open(config_path) as f:
+        return yaml.safe_load(f)
+
+
+def load_prompts(path: str) -> dict:
+    """Laad zoekprompts uit YAML."""
+    with open(path) as f:
+        return yaml.safe_load(f)
+
+
+def load_text_file(path: str) -> str:
+    """Laad een tekstbestand."""
+    with open(path) as f:
+        return f.read()
+
+
+def load_topics(config: dict) -> list[dict]:
+    """
+    De onderwerpen van deze run.
+
+    Zonder `topics` in config.yaml is er één naamloos onderwerp uit `paths`
+    en `email`, zoals voorheen. Elk onderwerp in `topics` heeft een eigen
+    promptset, referentiebestanden, rapportmap en ontvanger; ontbrekende
+    velden vallen terug op `paths` en `email`, rapporten en publicaties
+    komen in een submap met de naam van het onderwerp.
+    """
+    paths = config["paths"]
+    email = config["email"]
+    default = {
+        "name": "",
+        "prompts": paths.get("prompts"),
+        "system_design": paths.get("system_design"),
+        "current_setup": paths.get("current_setup"),
+        "source_weights": paths.get("source_weights"),
+        "reports_dir": paths["reports_dir"],
+        "publications_dir": paths.get("publications_dir"),
+        "to_address": email["to_address"],
+        "subject_prefix": email["subject_prefix"],
+    }
+    if not config.get("topics"):
+        return [default]
+
+    topics = []
+    for entry in config["topics"]:
+        name = str(entry.get("name", ""))
+        if not re.fullmatch(r"[a-z0-9][a-z0-9_-]*", name):
+            logger.error(
+                f"Ongeldige onderwerpnaam '{name}': gebruik kleine letters, "
+                "cijfers, - en _"
+            )
+            sys.exit(1)
+        if any(topic["name"] == name for topic in topics):
+            logger.error(f"Onderwerp '{name}' staat dubbel in config.yaml")
+            sys.exit(1)
+        topic = {
+            **default,
+            "reports_dir": str(Path(paths["reports_dir"]) / name),
+            "publications_dir": (
+                str(Path(paths["publications_dir"]) / name)
+                if paths.get("publications_dir") else None
+            ),
+            **entry,
+            "name": name,
+        }
+        missing = [
+            key for key, value in topic.items()
+            if value is None and key != "publications_dir"
+        ]
+        if missing:
+            logger.error(f"Onderwerp '{name}' mist: {', '.join(missing)}")
+            sys.exit(1)
+        topics.append(topic)
+    return topics
+
+
+def validate_config(config: dict) -> list[str]:
+    """
+    Controleer config.yaml en de bestanden van elk onderwerp.
+
+    Returns een lijst met problemen; leeg als alles klopt.
+    """
+    problems = []
+    for section, keys in REQUIRED_KEYS.items():
+        if not isinstance(config.get(section), dict):
+            problems.append(f"sectie '{section}' ontbreekt")
+            continue
+        for key in keys:
+            if not config[section].get(key):
+                problems.append(f"{section}.{key} ontbreekt")
+    if problems:
+        return problems
+
+    for topic in load_topics(config):
+        prefix = f"{topic['name']}: " if topic["name"] else ""
+        for key in ("system_design", "current_setup", "source_weights"):
+            if not topic[key] or not Path(topic[key]).is_file():
+                problems.append(f"{prefix}{key} niet gevonden: {topic[key]}")
+        try:
+            prompts = load_prompts(topic["prompts"]) or {}
+        except (OSError, TypeError):
+            problems.append(f"{prefix}prompts niet gevonden: {topic['prompts']}")
+            continue
+        except yaml.YAMLError as e:
+            problems.append(f"{prefix}{topic['prompts']} is geen geldige YAML: {e}")
+            continue
+        ids = [prompt.get("id") for prompt in prompts.get("prompts") or []]
+        if not ids:
+            problems.append(f"{prefix}geen prompts in {topic['prompts']}")
+        if None in ids:
+            problems.append(f"{prefix}prompt zonder id in {topic['prompts']}")
+        duplicates = sorted(
+            i for i, n in Counter(ids).items() if i is not None and n > 1
+        )
+        if duplicates:
+            problems.append(f"{prefix}dubbele prompt-ids: {', '.join(duplicates)}")
+    return problems
+
+
+def state_path(config: dict, name: str, topic: str = "") -> str:
+    """
+    Pad van een bestand in de state-map (indexen en historie tussen runs).
+
+    Met een onderwerp krijgt de bestandsnaam de naam van het onderwerp erbij,
+    bijv. seen_index-mcp.json.
+    """
+    if topic:
+        path = Path(name)
+        name = f"{path.stem}-{topic}{path.suffix}"
+    return str(Path(config["paths"].get("state_dir", "state")) / name)
@@ -0,0 +1,247 @@
+"""
+Deduplicatie over weken heen — voorkomt dat oude artikelen terugkomen.
+
+Houdt een index bij van genormaliseerde URLs en titel-fingerprints uit
+eerdere rapporten en zoekresultaten. Artikelen die al eerder gezien zijn,
+worden uit de zoekresultaten gehaald voordat die naar de analyse gaan.
+"""
+
+import json
+import logging
+import os
+import re
+import unicodedata
+from pathlib import Path
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+logger = logging.getLogger(__name__)
+
+TRACKING_PARAMS = {"fbclid", "gclid", "ref", "ref_src", "mc_cid", "mc_eid"}
+
+STOPWORDS = {
+    "the", "and", "for", "with", "how", "why", "what", "your", "you", "are",
+    "from", "into", "about", "this", "that", "een", "het", "van", "voor",
+    "met", "hoe", "wat", "waarom", "naar", "over", "der", "die", "dat",
+}
+
+MARKDOWN_LINK = re.compile(r"\[([^\]]+)\]\((https?://[^)\s]+)\)")
+BARE_URL = re.compile(r"https?://[^\s)\]>\"']+")
+
+
+def normalize_url(url: str) -> str:
+    """
+    Normaliseer een URL voor vergelijking.
+
+    Kleine letters voor schema en host, zonder www., fragment, tracking-
+    parameters en afsluitende slash; queryparameters gesorteerd.
+    """
+    try:
+        parts = urlsplit(url.strip())
+    except ValueError:
+        return url.strip().lower()
+    host = parts.netloc.lower()
+    if host.startswith("www."):
+        host = host[4:]
+    query = sorted(
+        (key, value)
+        for key, value in parse_qsl(parts.query, keep_blank_values=True)
+        if not key.lower().startswith("utm_")
+        and key.lower() not in TRACKING_PARAMS
+    )
+    path = parts.path.rstrip("/")
+    return urlunsplit(("https", host, path, urlencode(query), ""))
+
+
+def title_fingerprint(title: str) -> str:
+    """
+    Fingerprint van een titel die kleine verschillen negeert.
+
+    Accenten, hoofdletters, leestekens, stopwoorden en woordvolgorde tellen
+    niet mee; "Claude Code Hooks: a Guide" en "A guide to Claude Code hooks"
+    krijgen dezelfde fingerprint. Titels met minder dan drie betekenisvolle
+    woorden zijn te algemeen en krijgen een lege fingerprint.
+    """
+    text = unicodedata.normalize("NFKD", title.casefold())
+    text = "".join(c for c in text if not unicodedata.combining(c))
+    words = {
+        w for w in re.findall(r"[a-z0-9]+", text)
+        if len(w) > 2 and w not in STOPWORDS
+    }
+    if len(words) < 3:
+        return ""
+    return " ".join(sorted(words))
+
+
+class SeenIndex:
+    """
+    Persistente index van eerder geziene URLs en titels.
+
+    Elke entry onthoudt waar hij vandaan komt (rapportnaam of run-id), zodat
+    de resultaten van de huidige run zichzelf niet wegfilteren bij --resume.
+    """
+
+    def __init__(self, path: str):
+        self.path = Path(path)
+        self.urls: dict[str, str] = {}
+        self.titles: dict[str, str] = {}
+        self.indexed_files: set[str] = set()
+        if self.path.exists():
+            data = json.loads(self.path.read_text(encoding="utf-8"))
+            self.urls = data.get("urls", {})
+            self.titles = data.get("titles", {})
+            self.indexed_files = set(data.get("indexed_files", []))
+
+    def save(self) -> None:
+        """Sla de index atomair op."""
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.with_name(f"{self.path.name}.tmp")
+        tmp.write_text(
+            json.dumps({
+                "urls": self.urls,
+                "titles": self.titles,
+                "indexed_files": sorted(self.indexed_files),
+            }, ensure_ascii=False),
+            encoding="utf-8",
+        )
+        os.replace(tmp, self.path)
+
+    def add(self, url: str | None, title: str | None, origin: str) -> None:
+        if url:
+            self.urls.setdefault(normalize_url(url), origin)
+        if title:
+            fingerprint = title_fingerprint(title)
+            if fingerprint:
+                self.titles.setdefault(fingerprint, origin)
+
+    def seen(
+        self, url: str | None, title: str | None, exclude_origin: str = ""
+    ) -> bool:
+        """True als URL of titel al eerder (buiten exclude_origin) gezien is."""
+        if url:
+            origin = self.urls.get(normalize_url(url))
+            if origin and origin != exclude_origin:
+                return True
+        if title:
+            fingerprint = title_fingerprint(title)
+            origin = self.titles.get(fingerprint) if fingerprint else None
+            if origin and origin != exclude_origin:
+                return True
+        return False
+
+    def add_report_file(self, path: Path) -> None:
+        """Voeg alle links uit een rapport toe."""
+        text = path.read_text(encoding="utf-8")
+        linked = set()
+        for title, url in MARKDOWN_LINK.findall(text):
+            self.add(url, title, path.name)
+            linked.add(url)
+        for url in BARE_URL.findall(text):
+            if url not in linked:
+                self.add(url, None, path.name)
+        self.indexed_files.add(path.name)
+
+    def update_from_reports(
+        self, report_dirs: list[str], skip: set[str] | frozenset = frozenset()
+    ) -> int:
+        """
+        Indexeer rapport-*.md bestanden die nog niet in de index staan.
+
+        Bestandsnamen in skip (het rapport van de huidige run, bij een
+        resume) blijven buiten de index, anders filtert de run zijn eigen
+        artikelen weg.
+
+        Returns het aantal nieuw geïndexeerde rapporten.
+        """
+        added = 0
+        for report_dir in report_dirs:
+            for path in sorted(Path(report_dir).glob("rapport-*.md")):
+                if path.name not in self.indexed_files and path.name not in skip:
+                    self.add_report_file(path)
+                    added += 1
+        return added
+
+    def add_search_results(self, results: list[dict], origin: str) -> None:
+        """Voeg de artikelen en bronnen van zoekresultaten toe."""
+        for result in results:
+            for block in split_articles(result["raw_output"])[0]:
+                fields = article_fields(block)
+                self.add(fields.get("URL"), fields.get("TITEL"), origin)
+            for url, title in result.get("sources", {}).items():
+                self.add(url, title, origin)
+
+
+def split_articles(raw_output: str) -> tuple[list[str], str]:
+    """
+    Splits ruwe zoekoutput in artikelblokken en de bronnensectie.
+
+    Returns (blokken in het TITEL/URL/...-format, GEVERIFIEERDE BRONNEN-tekst).
+    """
+    body, _, sources = raw_output.partition("GEVERIFIEERDE BRONNEN:")
+    blocks = [
+        block.strip()
+        for block in re.split(r"^\s*---\s*$", body, flags=re.MULTILINE)
+        if "TITEL:" in block or "URL:" in block
+    ]
+    return blocks, sources
+
+
+def article_fields(block: str) -> dict[str, str]:
+    """Lees de velden (TITEL, URL, ...) uit één artikelblok."""
+    fields = {}
+    for line in block.splitlines():
+        key, sep, value = line.partition(":")
+        if sep and key.strip().isupper():
+            fields[key.strip()] = value.strip()
+    return fields
+
+
+def filter_seen(
+    results: list[dict], index: SeenIndex, run_id: str = ""
+) -> tuple[list[dict], int]:
+    """
+    Haal eerder geziene artikelen uit de zoekresultaten.
+
+    Artikelblokken en bronregels waarvan de URL of titel al in de index staat
+    verdwijnen; een resultaat zonder overgebleven artikelen wordt
+    "GEEN RESULTATEN".
+
+    Returns (gefilterde resultaten, aantal verwijderde artikelen).
+    """
+    filtered = []
+    removed = 0
+    for result in results:
+        blocks, sources_text = split_articles(result["raw_output"])
+        if not blocks:
+            filtered.append(result)
+            continue
+
+        kept = []
+        for block in blocks:
+            fields = article_fields(block)
+            if index.seen(fields.get("URL"), fields.get("TITEL"), run_id):
+                removed += 1
+            else:
+                kept.append(block)
+
+        if "sources" in result:
+            all_sources = result["sources"]
+        else:
+            all_sources = {
+                url: title for title, url in MARKDOWN_LINK.findall(sources_text)
+            }
+        sources = {
+            url: title
+            for url, title in all_sources.items()
+            if not index.seen(url, None, run_id)
+        }
+        if not kept:
+            raw_output = "GEEN RESULTATEN"
+        else:
+            raw_output = "\n---\n".join(kept) + "\n---"
+            if sources:
+                source_lines = [f"- [{t}]({u})" for u, t in sources.items()]
+                raw_output += (
+                    "\n\nGEVERIFIEERDE BRONNEN:\n" + "\n".join(source_lines)
+                )
+        filtered.append({**result, "raw_output": raw_output, "sources": sources})
+    return filtered, removed
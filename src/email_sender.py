@@ -7,8 +7,66 @@ from datetime import datetime
 
 import resend
 
+from src import metrics
+
 logger = logging.getLogger(__name__)
 
+# Resend accepteert maximaal 100 e-mails per batch-call
+MAX_BATCH = 100
+
+
+def build_message(
+    from_address: str,
+    to_address: str | list[str],
+    subject_prefix: str,
+    report_markdown: str,
+    rendered: dict | None = None,
+) -> dict:
+    """
+    Stel de e-mail met het rapport op.
+
+    Met rendered (uit ReportRenderer.render) krijgt de e-mail een HTML-deel
+    en een platte-tekstalternatief; anders alleen de Markdown als tekst.
+    """
+    date_str = datetime.now().strftime("%Y-%m-%d")
+    recipients = [to_address] if isinstance(to_address, str) else list(to_address)
+    message = {
+        "from": from_address,
+        "to": recipients,
+        "subject": f"{subject_prefix} Weekrapport {date_str}",
+        "text": rendered["text"] if rendered else report_markdown,
+    }
+    if rendered:
+        message["html"] = rendered["html"]
+    return message
+
+
+def send_messages(
+    api_key: str, messages: list[dict], idempotency_key: str | None = None
+) -> list[str]:
+    """
+    Verstuur een of meer e-mails in één API-call (batch bij meer dan één).
+
+    Met een idempotency key levert een herhaalde call na een time-out geen
+    dubbele e-mails op. Gooit de fout van Resend door.
+
+    Returns de e-mail-ids van Resend.
+    """
+    if len(messages) > MAX_BATCH:
+        raise ValueError(f"maximaal {MAX_BATCH} e-mails per batch")
+    resend.api_key = api_key
+    options = {"idempotency_key": idempotency_key} if idempotency_key else None
+    label = "resend" if len(messages) == 1 else "resend-batch"
+    with metrics.track("email", label) as record:
+        if len(messages) == 1:
+            response = resend.Emails.send(messages[0], options)
+            ids = [response["id"]]
+        else:
+            response = resend.Batch.send(messages, options)
+            ids = [entry["id"] for entry in response["data"]]
+        record["bytes_returned"] = len(str(response).encode("utf-8"))
+    return ids
+
 
 def send_report(
     api_key: str,
@@ -22,17 +80,9 @@ def send_report(
 
     Returns True als het versturen gelukt is.
     """
-    resend.api_key = api_key
-    date_str = datetime.now().strftime("%Y-%m-%d")
-    subject = f"{subject_prefix} Weekrapport {date_str}"
-
+    message = build_message(from_address, to_address, subject_prefix, report_markdown)
     try:
-        resend.Emails.send({
-            "from": from_address,
-            "to": [to_address],
-            "subject": subject,
-            "text": report_markdown,
-        })
+        send_messages(api_key, [message])
         logger.info(f"Rapport verstuurd naar {to_address}")
         return True
     except Exception as e:
@@ -0,0 +1,258 @@
+"""
+Artikelhistorie — compacte kolomopslag van alle gevonden artikelen.
+
+Elk artikel uit de zoekfase wordt één rij: run, prompt, domein, URL, datum,
+relevantie en of de URL geverifieerd was. De kolommen staan elk in een eigen
+binair bestand (array-module, vaste breedte) en teksten worden geïnterned:
+prompt-ids, domeinen, URLs en run-ids staan één keer in een tekstbestand en
+de kolommen bevatten alleen hun nummer. Nieuwe rijen worden achteraan
+toegevoegd, zodat een run maar een paar honderd bytes schrijft en jaren aan
+runs in een paar MB passen.
+
+Een prompt die in een run niets opleverde krijgt één rij zonder URL
+(relevantie -1), zodat de hitrate per prompt klopt. De aggregaties (hitrate,
+nieuwe domeinen per week, relevantietrend) lopen in één pass over de kolommen.
+"""
+
+import logging
+from array import array
+from collections import Counter, defaultdict
+from datetime import date
+from pathlib import Path
+from urllib.parse import urlsplit
+
+from src.articles import parse_articles
+from src.dedup import normalize_url
+
+logger = logging.getLogger(__name__)
+
+# Kolomnaam → array-typecode
+COLUMNS = {
+    "run": "I",
+    "prompt": "I",
+    "domain": "I",
+    "url": "I",
+    "date": "I",        # date.toordinal()
+    "relevance": "b",   # -1 = prompt zonder artikelen
+    "verified": "b",
+}
+
+# Kolommen met geïnternde teksten en hun tabel
+STRING_COLUMNS = {
+    "run": "runs",
+    "prompt": "prompts",
+    "domain": "domains",
+    "url": "urls",
+}
+
+
+class StringTable:
+    """
+    Teksten met een vast nummer, bewaard als één regel per tekst.
+
+    Nummer 0 is de lege tekst en staat niet in het bestand.
+    """
+
+    def __init__(self, path: Path):
+        self.path = path
+        self.values = [""]
+        if path.exists():
+            self.values += path.read_text(encoding="utf-8").splitlines()
+        self.index = {value: i for i, value in enumerate(self.values)}
+        self._saved = len(self.values)
+
+    def intern(self, value: str) -> int:
+        # Een regeleinde in de tekst zou de nummering verschuiven
+        value = " ".join(value.split())
+        number = self.index.get(value)
+        if number is None:
+            number = self.index[value] = len(self.values)
+            self.values.append(value)
+        return number
+
+    def save(self) -> None:
+        """Schrijf nieuwe teksten achteraan bij."""
+        if self._saved == len(self.values):
+            return
+        with open(self.path, "a", encoding="utf-8") as f:
+            f.write("".join(f"{value}\n" for value in self.values[self._saved:]))
+        self._saved = len(self.values)
+
+
+def week_label(ordinal: int) -> str:
+    """ISO-week van een datum-ordinal, bijv. 2026-W10."""
+    year, week, _ = date.fromordinal(ordinal).isocalendar()
+    return f"{year}-W{week:02d}"
+
+
+class ArticleHistory:
+    """
+    Kolomopslag van artikelen in één map (per onderwerp).
+
+    Teksten worden eerst bewaard, daarna de kolommen; na een onderbroken
+    save worden de kolommen bij het laden ingekort tot de kortste, zodat
+    er nooit een halve rij overblijft.
+    """
+
+    def __init__(self, directory: str):
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.strings = {
+            table: StringTable(self.directory / f"{table}.txt")
+            for table in STRING_COLUMNS.values()
+        }
+        self.columns: dict[str, array] = {}
+        for name, typecode in COLUMNS.items():
+            column = array(typecode)
+            path = self.directory / f"{name}.bin"
+            if path.exists():
+                data = path.read_bytes()
+                column.frombytes(data[:len(data) - len(data) % column.itemsize])
+            self.columns[name] = column
+        rows = min(len(column) for column in self.columns.values())
+        for column in self.columns.values():
+            del column[rows:]
+        self._saved = rows
+
+    def __len__(self) -> int:
+        return len(self.columns["run"])
+
+    def _text(self, column: str, number: int) -> str:
+        return self.strings[STRING_COLUMNS[column]].values[number]
+
+    def save(self) -> None:
+        """Schrijf nieuwe teksten en rijen achteraan bij."""
+        if self._saved == len(self):
+            return
+        for table in self.strings.values():
+            table.save()
+        for name, column in self.columns.items():
+            with open(self.directory / f"{name}.bin", "ab") as f:
+                column[self._saved:].tofile(f)
+        logger.info(f"Historie: {len(self) - self._saved} artikelen toegevoegd")
+        self._saved = len(self)
+
+    # --- toevoegen ---
+
+    def append(
+        self,
+        run_id: str,
+        prompt_id: str,
+        day: date,
+        url: str = "",
+        relevance: int = -1,
+        verified: bool = False,
+    ) -> None:
+        """Voeg één rij toe (nog niet bewaard, zie save)."""
+        url = normalize_url(url) if url else ""
+        values = {
+            "run": self.strings["runs"].intern(run_id),
+            "prompt": self.strings["prompts"].intern(prompt_id),
+            "domain": self.strings["domains"].intern(urlsplit(url).netloc),
+            "url": self.strings["urls"].intern(url),
+            "date": day.toordinal(),
+            "relevance": max(-1, min(relevance, 127)),
+            "verified": int(verified),
+        }
+        for name, column in self.columns.items():
+            column.append(values[name])
+
+    def add_results(self, run_id: str, day: date, results: list[dict]) -> int:
+        """
+        Voeg de artikelen van zoekresultaten toe.
+
+        Mislukte zoekcalls tellen niet mee; prompts die in deze run al in de
+        historie staan (bij een hervatte run) worden overgeslagen.
+
+        Returns het aantal toegevoegde rijen.
+        """
+        run = self.strings["runs"].index.get(run_id)
+        done = set()
+        if run is not None:
+            done = {
+                prompt
+                for r, prompt in zip(self.columns["run"], self.columns["prompt"])
+                if r == run
+            }
+        before = len(self)
+        for result in results:
+            if result["raw_output"].startswith("FOUT:"):
+                continue
+            if self.strings["prompts"].index.get(result["id"], -1) in done:
+                continue
+            verified = {normalize_url(url) for url in result.get("sources", {})}
+            articles = [a for a in parse_articles(result["raw_output"]) if a.url]
+            if not articles:
+                self.append(run_id, result["id"], day)
+            for article in articles:
+                self.append(
+                    run_id, result["id"], day, article.url, article.relevance,
+                    normalize_url(article.url) in verified,
+                )
+        return len(self) - before
+
+    # --- aggregaties ---
+
+    def hit_rate(self, min_relevance: int = 1) -> dict[str, dict]:
+        """
+        Per prompt: in hoeveel runs leverde hij minstens één artikel op?
+
+        Returns {prompt-id: {"runs", "hits", "articles", "rate"}}.
+        """
+        runs = set()
+        hits = set()
+        articles = Counter()
+        for run, prompt, relevance in zip(
+            self.columns["run"], self.columns["prompt"], self.columns["relevance"]
+        ):
+            runs.add((prompt, run))
+            if relevance >= min_relevance:
+                hits.add((prompt, run))
+                articles[prompt] += 1
+        run_counts = Counter(prompt for prompt, _ in runs)
+        hit_counts = Counter(prompt for prompt, _ in hits)
+        return {
+            self._text("prompt", prompt): {
+                "runs": count,
+                "hits": hit_counts[prompt],
+                "articles": articles[prompt],
+                "rate": hit_counts[prompt] / count,
+            }
+            for prompt, count in sorted(run_counts.items())
+        }
+
+    def new_domains_per_week(self) -> dict[str, int]:
+        """Aantal domeinen dat per ISO-week voor het eerst voorkwam."""
+        first_seen = {}
+        for domain, day in zip(self.columns["domain"], self.columns["date"]):
+            if domain and day < first_seen.get(domain, day + 1):
+                first_seen[domain] = day
+        per_week = Counter(week_label(day) for day in first_seen.values())
+        return dict(sorted(per_week.items()))
+
+    def relevance_trend(self) -> dict[str, dict[str, float]]:
+        """Gemiddelde relevantie per prompt per ISO-week (alleen artikelen)."""
+        weeks = {}
+        totals = defaultdict(lambda: [0, 0])
+        for prompt, day, relevance in zip(
+            self.columns["prompt"], self.columns["date"], self.columns["relevance"]
+        ):
+            if relevance < 0:
+                continue
+            week = weeks.get(day)
+            if week is None:
+                week = weeks[day] = week_label(day)
+            total = totals[(prompt, week)]
+            total[0] += relevance
+            total[1] += 1
+        trend = defaultdict(dict)
+        for (prompt, week), (total, count) in sorted(totals.items()):
+            trend[self._text("prompt", prompt)][week] = total / count
+        return dict(trend)
+
+
+def create_history(config: dict, path: str) -> ArticleHistory | None:
+    """Maak de historie uit de `history` sectie van config.yaml (of None)."""
+    if not config.get("enabled", True):
+        return None
+    return ArticleHistory(path)
@@ -0,0 +1,191 @@
+"""
+Metrics — telemetrie per API-call en een prestatieoverzicht per run.
+
+Elke Claude- of Resend-call wordt gemeten binnen `track(stage, label)`:
+wandkloktijd, retries, tijd in backoff en rate-limit wachttijd, tokens
+(inclusief cache), web searches en teruggegeven bytes. create_message en
+stream_message vullen tokens en wachttijd automatisch aan voor de call die
+in de huidige thread loopt.
+"""
+
+import json
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+
+logger = logging.getLogger(__name__)
+
+COUNTERS = (
+    "retries",
+    "backoff_time",
+    "throttle_time",
+    "input_tokens",
+    "output_tokens",
+    "cache_read_input_tokens",
+    "cache_creation_input_tokens",
+    "web_searches",
+    "bytes_returned",
+)
+
+_local = threading.local()
+
+
+def percentile(values: list[float], pct: float) -> float:
+    """Percentiel volgens nearest-rank; 0.0 voor een lege lijst."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(1, -(-len(ordered) * pct // 100))  # ceil
+    return ordered[int(rank) - 1]
+
+
+class Metrics:
+    """Verzamelt call-records van één run (thread-safe)."""
+
+    def __init__(self):
+        self.calls: list[dict] = []
+        self._lock = threading.Lock()
+
+    def reset(self) -> None:
+        with self._lock:
+            self.calls = []
+
+    @contextmanager
+    def track(self, stage: str, label: str):
+        """
+        Meet één call. Yield het record, zodat de aanroeper retries,
+        backoff en bytes kan bijhouden.
+        """
+        record = {"stage": stage, "label": label, "wall_time": 0.0, "error": None}
+        record.update({counter: 0 for counter in COUNTERS})
+        previous = getattr(_local, "record", None)
+        _local.record = record
+        start = time.perf_counter()
+        try:
+            yield record
+        except Exception as e:
+            record["error"] = str(e)
+            raise
+        finally:
+            record["wall_time"] = time.perf_counter() - start
+            _local.record = previous
+            with self._lock:
+                self.calls.append(record)
+
+    def summary(self) -> dict:
+        """Aggregaten per stap en per label (prompt-id)."""
+        return {
+            "stages": self._aggregate("stage"),
+            "labels": self._aggregate("label", with_stage=True),
+        }
+
+    def _aggregate(self, key: str, with_stage: bool = False) -> dict:
+        groups: dict[str, list[dict]] = {}
+        for call in self.calls:
+            name = f"{call['stage']}/{call[key]}" if with_stage else call[key]
+            groups.setdefault(name, []).append(call)
+        summary = {}
+        for name, calls in groups.items():
+            times = [c["wall_time"] for c in calls]
+            summary[name] = {
+                "calls": len(calls),
+                "errors": sum(1 for c in calls if c["error"]),
+                "p50": percentile(times, 50),
+                "p95": percentile(times, 95),
+                "total_time": sum(times),
+                **{counter: sum(c[counter] for c in calls) for counter in COUNTERS},
+            }
+        return summary
+
+    def write_json(self, path: str) -> None:
+        """Schrijf alle calls en de samenvatting naar een JSON-bestand."""
+        target = Path(path)
+        target.parent.mkdir(parents=True, exist_ok=True)
+        tmp = target.with_name(f"{target.name}.tmp")
+        with self._lock:
+            data = {"calls": list(self.calls), "summary": self.summary()}
+        tmp.write_text(json.dumps(data, indent=2, ensure_ascii=False), encoding="utf-8")
+        os.replace(tmp, target)
+
+    def load_json(self, path: str) -> bool:
+        """
+        Lees de calls uit een eerder geschreven metrics.json.
+
+        Returns False als het bestand er niet (leesbaar) is.
+        """
+        try:
+            data = json.loads(Path(path).read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return False
+        with self._lock:
+            self.calls = list(data.get("calls", []))
+        return True
+
+    def summary_table(self) -> str:
+        """Leesbare tabel met latency en kosten per stap en per prompt."""
+        summary = self.summary()
+        header = (
+            f"{'naam':<32} {'calls':>5} {'p50 s':>7} {'p95 s':>7} "
+            f"{'input':>8} {'output':>7} {'cache r':>8} {'cache w':>8} "
+            f"{'search':>6} {'retry':>5} {'wacht s':>7}"
+        )
+        lines = [header, "-" * len(header)]
+        for section in ("stages", "labels"):
+            for name, row in sorted(summary[section].items()):
+                lines.append(
+                    f"{name[:32]:<32} {row['calls']:>5} {row['p50']:>7.1f} "
+                    f"{row['p95']:>7.1f} {row['input_tokens']:>8} "
+                    f"{row['output_tokens']:>7} "
+                    f"{row['cache_read_input_tokens']:>8} "
+                    f"{row['cache_creation_input_tokens']:>8} "
+                    f"{row['web_searches']:>6} {row['retries']:>5} "
+                    f"{row['backoff_time'] + row['throttle_time']:>7.1f}"
+                )
+            lines.append("")
+        return "\n".join(lines).rstrip()
+
+
+def current_record() -> dict | None:
+    """Het record van de call die in deze thread gemeten wordt, of None."""
+    return getattr(_local, "record", None)
+
+
+def add(counter: str, amount: float) -> None:
+    """Tel amount op bij een teller van de lopende call (indien aanwezig)."""
+    record = current_record()
+    if record is not None:
+        record[counter] += amount
+
+
+def usage_counts(usage) -> dict[str, int]:
+    """Tokens en web searches uit een API usage-object."""
+    counts = {}
+    for counter in (
+        "input_tokens",
+        "output_tokens",
+        "cache_read_input_tokens",
+        "cache_creation_input_tokens",
+    ):
+        value = getattr(usage, counter, 0) or 0
+        counts[counter] = value if isinstance(value, int) else 0
+    server_tool_use = getattr(usage, "server_tool_use", None)
+    searches = getattr(server_tool_use, "web_search_requests", 0) or 0
+    counts["web_searches"] = searches if isinstance(searches, int) else 0
+    return counts
+
+
+def add_usage(usage) -> None:
+    """Neem tokens en web searches uit een API usage-object over."""
+    record = current_record()
+    if record is None or usage is None:
+        return
+    for counter, value in usage_counts(usage).items():
+        record[counter] += value
+
+
+# Standaard collector voor de hele run, net als een module-level logger
+METRICS = Metrics()
+track = METRICS.track
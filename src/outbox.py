@@ -0,0 +1,307 @@
+"""
+Outbox — e-mails gaan eerst naar schijf en worden op de achtergrond verstuurd.
+
+Elk rapport wordt als JSON in de outbox gezet voordat er iets verstuurd
+wordt. Een worker-thread verstuurt wachtende berichten in batches (één
+Resend-call voor meerdere e-mails), met retries en backoff. Wat aan het eind
+van een run nog niet verstuurd is blijft staan en wordt aan het begin van de
+volgende run opnieuw geprobeerd; er gaat dus geen rapport verloren.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import random
+import threading
+import time
+from collections.abc import Callable
+from datetime import datetime
+from pathlib import Path
+
+from src.email_sender import MAX_BATCH, build_message, send_messages
+from src.run_store import RunStore
+
+logger = logging.getLogger(__name__)
+
+
+class Outbox:
+    """Map met wachtende (en verstuurde) e-mails, één JSON-bestand per bericht."""
+
+    def __init__(self, directory: str):
+        self.directory = Path(directory)
+        self.sent_dir = self.directory / "sent"
+        self._lock = threading.Lock()
+
+    def _path(self, message_id: str) -> Path:
+        return self.directory / f"{message_id}.json"
+
+    def _write(self, path: Path, entry: dict) -> None:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_name(f"{path.name}.tmp")
+        data = json.dumps(entry, indent=2, ensure_ascii=False)
+        tmp.write_text(data, encoding="utf-8")
+        os.replace(tmp, path)
+
+    def enqueue(self, message_id: str, message: dict, **meta) -> bool:
+        """
+        Zet een bericht in de outbox.
+
+        Een bericht met hetzelfde id dat nog wacht wordt vervangen; een al
+        verstuurd bericht wordt niet opnieuw in de rij gezet.
+
+        Returns False als het bericht al verstuurd was.
+        """
+        with self._lock:
+            if (self.sent_dir / f"{message_id}.json").exists():
+                logger.info(f"E-mail {message_id} was al verstuurd")
+                return False
+            self._write(self._path(message_id), {
+                "id": message_id,
+                "created": datetime.now().isoformat(timespec="seconds"),
+                "message": message,
+                "attempts": 0,
+                "last_error": None,
+                **meta,
+            })
+        return True
+
+    def pending(self) -> list[dict]:
+        """Wachtende berichten, oudste eerst."""
+        entries = []
+        for path in sorted(self.directory.glob("*.json")):
+            try:
+                entries.append(json.loads(path.read_text(encoding="utf-8")))
+            except (OSError, ValueError):
+                logger.warning(f"Onleesbaar bericht in outbox: {path}")
+        return sorted(entries, key=lambda entry: entry["created"])
+
+    def mark_sent(self, entry: dict, email_id: str) -> None:
+        """Verplaats een bericht naar sent/ met het e-mail-id van Resend."""
+        with self._lock:
+            self._write(self.sent_dir / f"{entry['id']}.json", {
+                **entry,
+                "email_id": email_id,
+                "sent": datetime.now().isoformat(timespec="seconds"),
+            })
+            self._path(entry["id"]).unlink(missing_ok=True)
+
+    def mark_failed(self, entry: dict, error: Exception) -> None:
+        """Tel een mislukte poging bij het bericht op."""
+        with self._lock:
+            path = self._path(entry["id"])
+            if path.exists():
+                entry["attempts"] += 1
+                entry["last_error"] = str(error)
+                self._write(path, entry)
+
+    def send_pending(self, api_key: str) -> tuple[list[dict], Exception | None]:
+        """
+        Verstuur alle wachtende berichten, tot MAX_BATCH per API-call.
+
+        Returns (verstuurde berichten, fout van de eerste mislukte batch).
+        """
+        pending = self.pending()
+        sent = []
+        for start in range(0, len(pending), MAX_BATCH):
+            batch = pending[start:start + MAX_BATCH]
+            # Een hash i.p.v. afkappen: ook bij een lang gedeeld prefix krijgt
+            # elke set berichten een eigen key (Resend staat max. 256 tekens toe)
+            key = hashlib.sha256(
+                "\n".join(entry["id"] for entry in batch).encode("utf-8")
+            ).hexdigest()
+            try:
+                ids = send_messages(
+                    api_key,
+                    [entry["message"] for entry in batch],
+                    idempotency_key=key,
+                )
+            except Exception as e:
+                for entry in batch:
+                    self.mark_failed(entry, e)
+                return sent, e
+            for entry, email_id in zip(batch, ids):
+                self.mark_sent(entry, email_id)
+                sent.append({**entry, "email_id": email_id})
+        return sent, None
+
+
+class OutboxWorker:
+    """
+    Achtergrondthread die de outbox leegmaakt.
+
+    Bij start verstuurt hij wat er van eerdere runs nog wacht; daarna elk
+    bericht dat via submit() binnenkomt. Mislukt een batch, dan volgt een
+    retry na exponentiële backoff met jitter, tot max_retries keer per run.
+    on_sent(entry) wordt aangeroepen voor elk verstuurd bericht.
+    """
+
+    def __init__(
+        self,
+        outbox: Outbox,
+        api_key: str,
+        on_sent: Callable[[dict], None] | None = None,
+        max_retries: int = 5,
+        base_delay: float = 2,
+        max_delay: float = 60,
+        sleep: Callable[[float], None] = time.sleep,
+    ):
+        self.outbox = outbox
+        self.api_key = api_key
+        self.on_sent = on_sent
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self._sleep = sleep
+        self._wake = threading.Event()
+        self._stopping = threading.Event()
+        self._thread = threading.Thread(
+            target=self._loop, name="outbox", daemon=True
+        )
+
+    def start(self) -> None:
+        self._wake.set()
+        self._thread.start()
+
+    def submit(self, message_id: str, message: dict, **meta) -> bool:
+        """Zet een bericht in de outbox en wek de worker."""
+        queued = self.outbox.enqueue(message_id, message, **meta)
+        self._wake.set()
+        return queued
+
+    def stop(self, timeout: float | None = None) -> list[dict]:
+        """
+        Verstuur wat nog wacht en stop de worker (wacht maximaal timeout s).
+
+        Returns de berichten die daarna nog in de outbox staan.
+        """
+        self._stopping.set()
+        self._wake.set()
+        self._thread.join(timeout)
+        return self.outbox.pending()
+
+    def _loop(self) -> None:
+        failures = 0
+        while True:
+            self._wake.wait()
+            self._wake.clear()
+            sent, error = self.outbox.send_pending(self.api_key)
+            for entry in sent:
+                recipients = ", ".join(entry["message"]["to"])
+                logger.info(f"E-mail {entry['id']} verstuurd naar {recipients}")
+                if self.on_sent is not None:
+                    self.on_sent(entry)
+            if error is None:
+                failures = 0
+                if self._stopping.is_set():
+                    # Tijdens het versturen kan er nog iets bijgekomen zijn
+                    if not self.outbox.pending():
+                        return
+                    self._wake.set()
+                continue
+
+            failures += 1
+            if failures > self.max_retries:
+                logger.error(
+                    f"E-mail versturen blijft mislukken ({error}); berichten "
+                    "blijven in de outbox voor de volgende run"
+                )
+                if self._stopping.is_set():
+                    return
+                failures = 0
+                continue
+            delay = min(
+                self.max_delay,
+                self.base_delay * 2 ** (failures - 1) * random.uniform(1, 1.5),
+            )
+            logger.warning(
+                f"E-mail versturen mislukt ({error}), retry {failures}/"
+                f"{self.max_retries} na {delay:.1f}s"
+            )
+            self._sleep(delay)
+            self._wake.set()
+
+
+def create_outbox_worker(
+    config: dict, on_sent: Callable[[dict], None] | None = None
+) -> OutboxWorker:
+    """Worker voor de outbox uit `paths.outbox_dir` met de Resend-key."""
+    return OutboxWorker(
+        Outbox(config["paths"].get("outbox_dir", "outbox")),
+        config["email"]["resend_api_key"],
+        on_sent=on_sent,
+    )
+
+
+def stop_worker(worker: OutboxWorker, timeout: float) -> list[dict]:
+    """Stop de worker en meld wat tot de volgende run in de outbox blijft."""
+    left = worker.stop(timeout=timeout)
+    for entry in left:
+        logger.warning(
+            f"E-mail {entry['id']} nog niet verstuurd "
+            f"({entry['last_error'] or 'time-out'}); volgende run opnieuw"
+        )
+    return left
+
+
+def queue_report(
+    worker: OutboxWorker,
+    email_cfg: dict,
+    topic: dict,
+    run: RunStore,
+    report: str,
+    rendered: dict | None = None,
+    notice: bool = False,
+) -> bool:
+    """
+    Zet het rapport van een onderwerp in de outbox en markeer de stap.
+
+    Met notice is het een melding over een mislukte of onvolledige analyse:
+    die krijgt een eigen bericht-id en zet de e-mailstap niet op done, zodat
+    het rapport na een geslaagde resume alsnog verstuurd wordt.
+
+    Returns False als het rapport van deze run al verstuurd was.
+    """
+    message = build_message(
+        from_address=email_cfg["from_address"],
+        to_address=topic["to_address"],
+        subject_prefix=topic["subject_prefix"],
+        report_markdown=report,
+        rendered=rendered,
+    )
+    message_id = f"{run.run_id}-{topic['name'] or 'rapport'}"
+    queued = worker.submit(
+        f"{message_id}-notice" if notice else message_id,
+        message,
+        run_id=run.run_id,
+        topic=topic["name"],
+        notice=notice,
+    )
+    # Niet opnieuw in de rij: dan staat hij al in sent/
+    run.mark_stage("email", "queued" if queued else sent_status(notice))
+    return queued
+
+
+def sent_status(notice: bool) -> str:
+    """Status van de e-mailstap na versturen; een melding telt niet als done."""
+    return "notice-sent" if notice else "done"
+
+
+def mark_email_sent(
+    runs_dir: str, runs: dict[str, RunStore], entry: dict
+) -> None:
+    """Zet de e-mailstap van de run van een verstuurd outbox-bericht op done."""
+    run_id = entry.get("run_id")
+    if not run_id:
+        return
+    topic = entry.get("topic", "")
+    run = runs.get(topic)
+    if run is None or run.run_id != run_id:
+        try:
+            run = RunStore.resume(runs_dir, run_id, topic)
+        except FileNotFoundError:
+            return
+    run.mark_stage(
+        "email", sent_status(entry.get("notice", False)),
+        email_id=entry.get("email_id"),
+    )
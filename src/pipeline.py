@@ -0,0 +1,642 @@
+"""
+Pipeline — zoeken, analyseren, opslaan en versturen voor één run.
+
+De zoekprompts van alle onderwerpen gaan door één scheduler met één client,
+limiter en retrybudget; daarna krijgt elk onderwerp een eigen analyse,
+rapport en e-mail via de outbox. De commands in src/cli.py importeren deze
+module pas als ze hem nodig hebben, omdat hij de Anthropic- en Resend-SDK's
+laadt.
+"""
+
+import logging
+import os
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime
+from pathlib import Path
+
+from src.search import run_topic_batch_searches, run_topic_searches
+from src.analyze import ERROR_HEADING, analyze_results
+from src.archive import Archive, create_archive, format_previous
+from src.articles import select_articles
+from src.cache import create_response_cache
+from src.config import load_prompts, load_text_file, state_path
+from src.dedup import BARE_URL, SeenIndex, filter_seen, normalize_url
+from src.history import ArticleHistory, create_history
+from src.metrics import METRICS
+from src.outbox import (
+    OutboxWorker,
+    create_outbox_worker,
+    mark_email_sent,
+    queue_report,
+    stop_worker,
+)
+from src.ranking import format_appendix, rank_articles
+from src.rate_limiter import create_rate_limiter
+from src.render import ReportRenderer, create_renderer
+from src.retry import create_retry_policy
+from src.run_store import RunStore, is_failed_result, open_runs
+from src.scheduler import (
+    PromptStats,
+    create_scheduler,
+    format_plan,
+    planned_prompts,
+)
+from src.source_manager import SourceWeights, extract_domain
+from src.transport import Transport, create_transport
+from src.watermarks import Watermarks
+
+logger = logging.getLogger("scout")
+
+# Onderwerpen kunnen één bronnenlijst delen en worden parallel afgerond
+_WEIGHTS_LOCK = threading.Lock()
+
+
+class TopicLogger(logging.LoggerAdapter):
+    """Zet de naam van het onderwerp voor elke logregel."""
+
+    def process(self, msg, kwargs):
+        return f"[{self.extra['topic']}] {msg}", kwargs
+
+
+def report_filename(suffix: str = ".md") -> str:
+    """Bestandsnaam van het rapport van vandaag."""
+    return f"rapport-{datetime.now().strftime('%Y-%m-%d')}{suffix}"
+
+
+class PartialReport:
+    """
+    Rapport dat tijdens het streamen al naar schijf gaat.
+
+    De tekst komt in een .partial-bestand naast het uiteindelijke rapport,
+    zodat je een lopende run kunt volgen (tail -f) en bij een crash de
+    gedeeltelijke output overhoudt.
+    """
+
+    def __init__(self, reports_dir: str):
+        reports_path = Path(reports_dir)
+        reports_path.mkdir(parents=True, exist_ok=True)
+        self.path = reports_path / f"{report_filename()}.partial"
+        self._file = open(self.path, "w", encoding="utf-8")
+
+    def write(self, text: str) -> None:
+        self._file.write(text)
+        self._file.flush()
+
+    def close(self) -> None:
+        self._file.close()
+
+
+def save_report(
+    reports_dir: str,
+    report: str,
+    partial: Path | None = None,
+    suffix: str = ".md",
+) -> Path:
+    """
+    Sla het rapport atomair op met datum in de bestandsnaam.
+
+    Als partial het volledige gestreamde rapport bevat, wordt dat bestand
+    hernoemd; anders wordt het rapport via een tijdelijk bestand geschreven.
+    Met suffix=".html" wordt de HTML-versie opgeslagen.
+    """
+    reports_path = Path(reports_dir)
+    reports_path.mkdir(parents=True, exist_ok=True)
+    report_file = reports_path / report_filename(suffix)
+    if partial is not None and partial.exists() and (
+        partial.stat().st_size == len(report.encode("utf-8"))
+    ):
+        os.replace(partial, report_file)
+    else:
+        tmp = report_file.with_name(f"{report_file.name}.tmp")
+        tmp.write_text(report, encoding="utf-8")
+        os.replace(tmp, report_file)
+        if partial is not None:
+            partial.unlink(missing_ok=True)
+    logger.info(f"Rapport opgeslagen: {report_file}")
+    return report_file
+
+
+def learned_weights_path(config: dict, path: str) -> str:
+    """Pad van de geleerde brongewichten bij een bronnenlijst, in de state-map."""
+    return state_path(config, f"{Path(path).stem}-learned.yaml")
+
+
+def learn_source_weights(
+    config: dict,
+    path: str,
+    learned_path: str,
+    run: RunStore,
+    search_results: list[dict],
+    report: str,
+) -> None:
+    """
+    Leer brongewichten uit de geverifieerde bronnen en citaties van een run.
+
+    Alle domeinen uit de geverifieerde bronnen tellen als gezien; domeinen
+    waarvan het rapport een geverifieerde URL citeert krijgen gewicht erbij.
+    De bronnenlijst in path blijft ongewijzigd: het geleerde deel wordt in
+    één keer geladen, bijgewerkt (inclusief decay) en atomair weggeschreven
+    naar learned_path in de state-map.
+    """
+    verified = {
+        normalize_url(url): extract_domain(normalize_url(url))
+        for result in search_results
+        for url in result.get("sources", {})
+    }
+    cited = {
+        verified[url]
+        for url in map(normalize_url, BARE_URL.findall(report))
+        if url in verified
+    }
+    with _WEIGHTS_LOCK:
+        weights = SourceWeights.load(path, learned_path)
+        if weights.learn(
+            verified.values(),
+            cited,
+            date.fromisoformat(run.manifest["created"][:10]),
+            cite_step=config.get("cite_step", 0.5),
+            half_life_days=config.get("half_life_days", 91),
+            run_id=run.label,
+        ):
+            weights.save_learned(learned_path)
+
+
+def _search_topics(
+    config: dict,
+    topics: list[dict],
+    prompt_sets: dict[str, dict],
+    runs: dict[str, RunStore],
+    client,
+    limiter,
+    retry,
+    cache,
+) -> None:
+    """Stap 1: zoek voor alle onderwerpen en bewaar elk resultaat direct."""
+    search_model = config["anthropic"].get("search_model", config["anthropic"]["model"])
+    pending = {}
+    for topic in topics:
+        name = topic["name"]
+        prompts = prompt_sets[name]["prompts"]
+        pending[name] = runs[name].pending_prompts(prompts)
+        if len(pending[name]) < len(prompts):
+            prefix = f"{name}: " if name else ""
+            logger.info(
+                f"{prefix}{len(prompts) - len(pending[name])} prompts al klaar "
+                f"in deze run, {len(pending[name])} te gaan"
+            )
+
+    if config["search"].get("mode", "direct") == "batch":
+        # Eén batch voor alle onderwerpen; die lopen bij Anthropic tegelijk
+        if any(pending.values()):
+            batch_results = run_topic_batch_searches(
+                client=client,
+                model=search_model,
+                topics={
+                    name: {**prompt_sets[name], "prompts": prompts}
+                    for name, prompts in pending.items()
+                    if prompts
+                },
+                poll_interval=config["search"].get("batch_poll_interval", 60),
+                cache=cache,
+                retry=retry,
+            )
+            for name, results in batch_results.items():
+                for result in results:
+                    runs[name].save_result(result)
+    elif any(pending.values()):
+        run_topic_searches(
+            client=client,
+            model=search_model,
+            topics={
+                name: {**prompt_sets[name], "prompts": prompts}
+                for name, prompts in pending.items()
+                if prompts
+            },
+            delay=config["search"].get("delay_between_calls", 5),
+            max_workers=config["search"].get("max_concurrent", 1),
+            limiter=limiter,
+            cache=cache,
+            on_result=lambda name, result: runs[name].save_result(result),
+            retry=retry,
+        )
+
+
+def finish_topic(
+    config: dict,
+    topic: dict,
+    prompts: list[dict],
+    run: RunStore,
+    client,
+    limiter,
+    retry,
+    cache,
+    watermarks: Watermarks | None = None,
+    outbox: OutboxWorker | None = None,
+    renderer: ReportRenderer | None = None,
+    archive: Archive | None = None,
+    history: ArticleHistory | None = None,
+    prompt_stats: PromptStats | None = None,
+) -> None:
+    """
+    Dedupliceer, analyseer en bewaar het rapport van één onderwerp.
+
+    Het rapport gaat daarna de outbox in; de OutboxWorker verstuurt het op
+    de achtergrond. Zonder outbox wordt er niets verstuurd. Met een renderer
+    krijgen e-mail en publicatie één gedeelde HTML-render. Met een archief
+    gaan eerdere voorstellen in dezelfde categorieën mee naar de analyse en
+    komen het rapport en de zoekresultaten daarna in het archief. Met een
+    historie worden alle gevonden artikelen als rij bewaard, en met
+    prompt_stats de opbrengst en kosten per prompt voor de scheduler.
+    """
+    log = TopicLogger(logger, {"topic": topic["name"]}) if topic["name"] else logger
+    system_design = load_text_file(topic["system_design"])
+    current_setup = load_text_file(topic["current_setup"])
+    learned_path = learned_weights_path(config, topic["source_weights"])
+    source_weights = SourceWeights.load(topic["source_weights"], learned_path)
+    source_weights_text = source_weights.text()
+
+    stored = run.load_results()
+    search_results = [stored[p["id"]] for p in prompts if p["id"] in stored]
+    failed = [r["id"] for r in search_results if is_failed_result(r)]
+    run.mark_stage("search", "failed" if failed else "done", failed_prompts=failed)
+    if history is not None:
+        history.add_results(
+            run.run_id, date.fromisoformat(run.manifest["created"][:10]),
+            search_results,
+        )
+        history.save()
+    if prompt_stats is not None:
+        prompt_stats.record(
+            topic["name"], prompts, search_results, METRICS.calls, run.run_id,
+            date.fromisoformat(run.manifest["created"][:10]),
+            min_relevance=config.get("report", {}).get("min_relevance_score", 0),
+            prices=config.get("scheduler", {}).get("prices"),
+        )
+        prompt_stats.save()
+
+    results_with_content = [
+        r for r in search_results
+        if "GEEN RESULTATEN" not in r["raw_output"]
+        and not r["raw_output"].startswith("FOUT:")
+    ]
+    log.info(
+        f"Zoekfase klaar: {len(results_with_content)}/{len(search_results)} "
+        "prompts leverden resultaten op"
+    )
+
+    # Artikelen uit eerdere weken eruit halen
+    report_dirs = [topic["reports_dir"]]
+    if topic.get("publications_dir"):
+        report_dirs.append(topic["publications_dir"])
+    seen_index = None
+    if config.get("dedup", {}).get("enabled", True):
+        seen_index = SeenIndex(state_path(config, "seen_index.json", topic["name"]))
+        # Een eerder (mislukt of onvolledig) rapport van deze run telt niet mee
+        own_reports = {report_filename()}
+        if run.manifest["stages"]["save"].get("report_path"):
+            own_reports.add(Path(run.manifest["stages"]["save"]["report_path"]).name)
+        seen_index.update_from_reports(report_dirs, skip=own_reports)
+        results_with_content, removed = filter_seen(
+            results_with_content, seen_index, run.run_id
+        )
+        results_with_content = [
+            r for r in results_with_content
+            if "GEEN RESULTATEN" not in r["raw_output"]
+        ]
+        log.info(
+            f"Deduplicatie: {removed} eerder geziene artikelen verwijderd, "
+            f"{len(results_with_content)} prompts over"
+        )
+
+    # Alleen geverifieerde, relevante artikelen gaan naar de analyse
+    report_cfg = config.get("report", {})
+    min_relevance = report_cfg.get("min_relevance_score", 0)
+    results_with_content, stats = select_articles(
+        results_with_content,
+        min_relevance=min_relevance,
+        require_verified=report_cfg.get("require_verified_urls", True),
+    )
+    log.info(
+        f"Selectie: {stats['kept']} artikelen naar de analyse, "
+        f"{stats['unverified']} zonder geverifieerde URL en "
+        f"{stats['low_relevance']} met relevantie onder {min_relevance} weggelaten"
+    )
+
+    if not results_with_content:
+        log.warning("Geen resultaten gevonden. Rapport wordt niet gegenereerd.")
+        # Niets nieuws is ook een uitkomst: het venster is afgedekt, anders
+        # zoekt de volgende run hetzelfde venster opnieuw
+        for stage in ("analyze", "save", "email"):
+            run.mark_stage(stage, "skipped", reason="geen nieuwe resultaten")
+        if watermarks is not None:
+            watermarks.advance(
+                search_results, date.fromisoformat(run.manifest["created"][:10])
+            )
+            watermarks.save()
+        return
+
+    # Waardevolste artikelen binnen het tokenbudget; de rest in een bijlage
+    analysis_cfg = config.get("analysis", {})
+    dropped = []
+    if analysis_cfg.get("token_budget"):
+        results_with_content, dropped = rank_articles(
+            results_with_content, source_weights, analysis_cfg["token_budget"]
+        )
+
+    # Stap 2: analyse via Claude
+    partial = None
+    runs_dir = config["paths"].get("runs_dir", "runs")
+    if run.stage_done("analyze"):
+        log.info("Stap 2: analyse al klaar in deze run")
+        report = run.load_report()
+    else:
+        previous_text = ""
+        if archive is not None:
+            archive.update(topic["name"], report_dirs, runs_dir)
+            proposals = archive.previous_proposals(
+                sorted({r["name"] for r in results_with_content}),
+                topic["name"],
+                before=run.manifest["created"][:10],
+                limit=config.get("archive", {}).get("previous_limit", 20),
+            )
+            previous_text = format_previous(proposals)
+            log.info(f"Archief: {len(proposals)} eerdere voorstellen naar de analyse")
+        log.info("Stap 2: analysefase via Claude")
+        if run.manifest["stages"]["email"]["status"] != "pending":
+            # Er ging alleen een melding uit; het nieuwe rapport moet nog mee
+            run.mark_stage("email", "pending")
+        if analysis_cfg.get("stream", True):
+            partial = PartialReport(topic["reports_dir"])
+            log.info(f"Rapport wordt gestreamd naar {partial.path}")
+        failed_chunks = []
+        try:
+            report = analyze_results(
+                client=client,
+                model=config["anthropic"]["model"],
+                search_results=results_with_content,
+                system_design=system_design,
+                current_setup=current_setup,
+                source_weights_text=source_weights_text,
+                limiter=limiter,
+                chunk_tokens=analysis_cfg.get("chunk_tokens"),
+                max_workers=analysis_cfg.get("max_concurrent", 4),
+                cache=cache,
+                on_text=partial.write if partial else None,
+                retry=retry,
+                previous_text=previous_text,
+                failed_chunks=failed_chunks,
+            )
+        finally:
+            if partial:
+                partial.close()
+        if report.startswith(ERROR_HEADING):
+            run.save_report(report)
+            run.mark_stage("analyze", "failed")
+        else:
+            report += format_appendix(dropped)
+            run.save_report(report)
+            if failed_chunks:
+                # Onvolledig: een resume doet de analyse opnieuw
+                run.mark_stage("analyze", "degraded", failed_chunks=failed_chunks)
+            else:
+                run.mark_stage("analyze", "done")
+
+    # Een mislukte analyse wordt wel bewaard en gemaild (als melding), maar
+    # niet gepubliceerd; alleen een volledige analyse dekt de week af
+    analysis_failed = report.startswith(ERROR_HEADING)
+    covered = run.stage_done("analyze")
+
+    # Stap 3: rapport opslaan
+    report_path = save_report(
+        topic["reports_dir"], report, partial.path if partial else None
+    )
+
+    rendered = renderer.render(report) if renderer is not None else None
+
+    # Stap 3b: publicatie-kopie opslaan in git repo
+    pub_dir = topic.get("publications_dir")
+    if pub_dir and not analysis_failed:
+        pub_path = save_report(pub_dir, report)
+        log.info(f"Publicatie opgeslagen: {pub_path}")
+        if rendered:
+            save_report(pub_dir, rendered["html"], suffix=".html")
+    run.mark_stage("save", "done", report_path=str(report_path))
+
+    # Stap 3c: brongewichten leren van deze run
+    learning_cfg = config.get("learning", {})
+    if learning_cfg.get("enabled", True) and not analysis_failed:
+        learn_source_weights(
+            learning_cfg, topic["source_weights"], learned_path, run,
+            search_results, report,
+        )
+
+    if seen_index is not None and covered:
+        # Alleen artikelen uit een echt rapport gelden als gezien
+        seen_index.add_search_results(search_results, run.run_id)
+        seen_index.update_from_reports(report_dirs)
+        seen_index.save()
+    if watermarks is not None and covered:
+        # Pas na een geslaagd rapport geldt het venster als afgedekt
+        watermarks.advance(
+            search_results, date.fromisoformat(run.manifest["created"][:10])
+        )
+        watermarks.save()
+    if archive is not None:
+        archive.update(topic["name"], report_dirs, runs_dir)
+
+    # Stap 4: e-mail in de outbox zetten
+    if run.stage_done("email"):
+        log.info("Stap 3: rapport was al verstuurd in deze run")
+        return
+    if outbox is None:
+        log.info(
+            f"E-mail overgeslagen; versturen met: python main.py send {run.run_id}"
+        )
+        return
+
+    queue_report(
+        outbox, config["email"], topic, run, report, rendered, notice=not covered
+    )
+    log.info(f"Stap 3: rapport in de outbox gezet (staat ook in {report_path})")
+
+
+def run_pipeline(
+    config: dict,
+    topics: list[dict],
+    runs: dict[str, RunStore],
+    transport: Transport,
+    no_cache: bool = False,
+    outbox: OutboxWorker | None = None,
+    search: bool = True,
+    finish: bool = True,
+) -> None:
+    """
+    Doorloop zoeken, analyseren, opslaan en versturen voor één run.
+
+    De zoekprompts van alle onderwerpen gaan door één scheduler met één
+    client, limiter en retrybudget; daarna krijgt elk onderwerp parallel
+    een eigen analyse en rapport, dat via de outbox per e-mail gaat.
+    Met search of finish op False wordt alleen de andere helft gedaan. Alle
+    Claude-calls lopen over de gedeelde pool van transport, met per stap een
+    eigen time-out.
+    """
+    prompt_sets = {topic["name"]: load_prompts(topic["prompts"]) for topic in topics}
+
+    # Alleen zoeken in het venster sinds de vorige geslaagde run
+    search_sets = dict(prompt_sets)
+    watermarks = {}
+    if config["search"].get("incremental", True):
+        today = date.today()
+        for topic in topics:
+            name = topic["name"]
+            marks = Watermarks(
+                state_path(config, "watermarks.json", name),
+                default_days=config["search"].get("window_days", 7),
+            )
+            prompts, skipped = marks.apply(prompt_sets[name]["prompts"], today)
+            if skipped:
+                prefix = f"{name}: " if name else ""
+                logger.info(
+                    f"{prefix}{len(skipped)} prompts overgeslagen, vandaag al "
+                    f"gezocht: {', '.join(skipped)}"
+                )
+            search_sets[name] = {**prompt_sets[name], "prompts": prompts}
+            watermarks[name] = marks
+
+    # Opbrengst tegen kosten: minder vaak of kleiner zoeken waar weinig uitkomt
+    scheduler = create_scheduler(
+        config.get("scheduler", {}), state_path(config, "prompt_stats.json")
+    )
+    if scheduler is not None and search:
+        today = date.today()
+        plan = scheduler.plan(
+            {name: s["prompts"] for name, s in search_sets.items()}, today
+        )
+        logger.info(f"Planning:\n{format_plan(plan, scheduler.budget_left(today))}")
+        for topic in topics:
+            name = topic["name"]
+            planned = {p["id"]: p for p in planned_prompts(plan, name)}
+            search_sets[name] = {**search_sets[name], "prompts": list(planned.values())}
+            # Voor de kostenmeting: met welke instellingen is er gezocht
+            prompt_sets[name] = {**prompt_sets[name], "prompts": [
+                {**p, **{k: planned[p["id"]][k] for k in ("max_uses", "max_tokens")}}
+                if p["id"] in planned else p
+                for p in prompt_sets[name]["prompts"]
+            ]}
+
+    batch = config["search"].get("mode", "direct") == "batch"
+    search_client = transport.anthropic("batch" if batch else "search")
+    analyze_client = transport.anthropic("analyze")
+    limiter = create_rate_limiter(config.get("rate_limit"))
+    retry = create_retry_policy(config.get("retry"))
+    cache = None if no_cache else create_response_cache(config.get("cache"))
+
+    # Stap 1: zoeken via Claude met web search
+    if search:
+        logger.info("Stap 1: zoekfase via Claude")
+        _search_topics(
+            config, topics, search_sets, runs, search_client, limiter, retry, cache
+        )
+    if not finish:
+        return
+
+    renderer = None
+    if config.get("report", {}).get("html", True):
+        renderer = create_renderer(state_path(config, "render"))
+    archive = create_archive(
+        config.get("archive", {}), state_path(config, "archive.db")
+    )
+    histories = {
+        topic["name"]: create_history(
+            config.get("history", {}), state_path(config, "history", topic["name"])
+        )
+        for topic in topics
+    }
+
+    def _finish(topic: dict) -> None:
+        finish_topic(
+            config, topic, prompt_sets[topic["name"]]["prompts"],
+            runs[topic["name"]], analyze_client, limiter, retry, cache,
+            watermarks.get(topic["name"]),
+            outbox,
+            renderer,
+            archive,
+            histories[topic["name"]],
+            scheduler.stats if scheduler is not None else None,
+        )
+
+    try:
+        if len(topics) == 1:
+            _finish(topics[0])
+            return
+        with ThreadPoolExecutor(max_workers=len(topics)) as pool:
+            futures = [pool.submit(_finish, topic) for topic in topics]
+        for future in futures:
+            future.result()
+    finally:
+        if archive is not None:
+            archive.close()
+
+
+def execute_run(
+    config: dict,
+    topics: list[dict],
+    resume_id: str | None = None,
+    no_cache: bool = False,
+    search: bool = True,
+    finish: bool = True,
+    send: bool = True,
+) -> str:
+    """
+    Eén run van begin tot eind, met outbox en metrics eromheen.
+
+    Zonder resume_id begint een nieuwe run. De outbox-worker verstuurt eerst
+    wat van eerdere runs nog wacht; metrics gaan ook bij een crash naar
+    runs/<run-id>/metrics.json, bij een hervatte run aangevuld.
+
+    Returns het run-id.
+    """
+    runs_dir = config["paths"].get("runs_dir", "runs")
+    try:
+        runs = open_runs(runs_dir, topics, resume_id)
+    except FileNotFoundError as e:
+        logger.error(str(e))
+        sys.exit(1)
+    run_id = next(iter(runs.values())).run_id
+    run_path = Path(runs_dir) / run_id
+    metrics_path = run_path / "metrics.json"
+    if resume_id:
+        logger.info(f"Run {run_id} wordt hervat")
+    else:
+        logger.info(f"Run {run_id} gestart in {run_path}")
+    if topics[0]["name"]:
+        logger.info(f"Onderwerpen: {', '.join(t['name'] for t in topics)}")
+
+    transport = create_transport(config["anthropic"]["api_key"], config.get("http"))
+    transport.install_resend()
+    worker = None
+    if send:
+        worker = create_outbox_worker(
+            config, on_sent=lambda entry: mark_email_sent(runs_dir, runs, entry)
+        )
+
+    METRICS.reset()
+    if resume_id:
+        METRICS.load_json(str(metrics_path))
+    if worker is not None:
+        worker.start()
+    try:
+        run_pipeline(
+            config, topics, runs, transport, no_cache, worker,
+            search=search, finish=finish,
+        )
+    finally:
+        if worker is not None:
+            stop_worker(worker, config["email"].get("send_timeout", 120))
+        transport.close()
+        # Metrics ook bij een crash wegschrijven
+        METRICS.write_json(str(metrics_path))
+        logger.info(f"Prestatieoverzicht ({metrics_path}):\n{METRICS.summary_table()}")
+    return run_id
@@ -0,0 +1,104 @@
+"""
+Rangschikking — beperkt de analyse-invoer tot een tokenbudget.
+
+Elk artikel krijgt een score: relevantie (RELEVANTIE) maal het gewicht van
+het brondomein uit de bronnenlijst. De artikelen met de hoogste score gaan
+naar de analyse zolang ze binnen het budget passen; de rest komt in een
+bijlage onder het rapport, zodat er niets stilletjes verdwijnt.
+"""
+
+import logging
+
+from src.articles import SOURCES_HEADING, Article, format_articles, parse_articles
+from src.dedup import normalize_url
+from src.rate_limiter import estimate_tokens
+from src.source_manager import SourceWeights, extract_domain
+
+logger = logging.getLogger(__name__)
+
+APPENDIX_HEADING = "## Bijlage: niet geanalyseerd"
+
+
+def article_score(article: Article, weights: SourceWeights) -> float:
+    """Relevantie maal brongewicht."""
+    return article.relevance * weights.get_weight(extract_domain(article.url))
+
+
+def rank_articles(
+    results: list[dict], weights: SourceWeights, token_budget: int
+) -> tuple[list[dict], list[tuple[Article, float]]]:
+    """
+    Pak de waardevolste artikelen in tot token_budget (lokaal geschat).
+
+    Artikelen worden op score van hoog naar laag bekeken; wat niet meer
+    past wordt overgeslagen, een kleiner artikel verderop kan nog wel. De
+    resultaten behouden hun volgorde en die van hun artikelen.
+
+    Returns (resultaten binnen het budget, weggelaten (artikel, score)).
+    """
+    candidates = []
+    for r_index, result in enumerate(results):
+        # Kop die build_results_text per resultaat toevoegt, plus de kop van
+        # de bronnensectie
+        header = estimate_tokens(
+            f"\n\n--- {result['name']} ({result['id']}) ---\n"
+            f"\n\n{SOURCES_HEADING}\n"
+        )
+        sources = {
+            normalize_url(url): f"- [{title}]({url})\n"
+            for url, title in result.get("sources", {}).items()
+        }
+        for a_index, article in enumerate(parse_articles(result["raw_output"])):
+            source_line = sources.get(normalize_url(article.url), "")
+            candidates.append((
+                article_score(article, weights),
+                r_index,
+                a_index,
+                article,
+                estimate_tokens(article.to_text() + "\n---\n" + source_line),
+                header,
+            ))
+
+    # Hoogste score eerst; bij gelijke score de oorspronkelijke volgorde
+    candidates.sort(key=lambda c: (-c[0], c[1], c[2]))
+    used = 0
+    kept: dict[int, list[tuple[int, Article]]] = {}
+    dropped = []
+    for score, r_index, a_index, article, tokens, header in candidates:
+        cost = tokens + (0 if r_index in kept else header)
+        if used + cost <= token_budget:
+            kept.setdefault(r_index, []).append((a_index, article))
+            used += cost
+        else:
+            dropped.append((article, score))
+
+    ranked = []
+    for r_index, result in enumerate(results):
+        if r_index not in kept:
+            continue
+        positions = sorted(kept[r_index], key=lambda entry: entry[0])
+        raw_output, sources = format_articles(
+            [article for _, article in positions], result.get("sources", {})
+        )
+        ranked.append({**result, "raw_output": raw_output, "sources": sources})
+    logger.info(
+        f"Rangschikking: {len(candidates) - len(dropped)} artikelen "
+        f"(~{used} tokens) binnen budget {token_budget}, {len(dropped)} weggelaten"
+    )
+    return ranked, dropped
+
+
+def format_appendix(dropped: list[tuple[Article, float]]) -> str:
+    """Markdown-bijlage met de artikelen die buiten het budget vielen."""
+    if not dropped:
+        return ""
+    lines = [
+        f"\n\n{APPENDIX_HEADING}\n",
+        "Deze artikelen vielen buiten het tokenbudget van de analyse "
+        "(score = relevantie × brongewicht):\n",
+    ]
+    for article, score in dropped:
+        title = article.title or article.url
+        link = f"[{title}]({article.url})" if article.url else title
+        lines.append(f"- {link} — score {score:.1f}")
+    return "\n".join(lines) + "\n"
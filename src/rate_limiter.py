@@ -0,0 +1,301 @@
+"""
+Rate limiter — client-side token buckets voor de Anthropic API.
+
+Houdt requests, input-tokens en output-tokens per minuut bij, zodat de
+scout zo snel draait als het account toestaat zonder blind te wachten.
+De limieten worden bijgesteld op basis van de rate-limit headers die de
+API bij elke response (en bij een 429) meestuurt.
+"""
+
+import logging
+import threading
+import time
+from collections.abc import Callable
+
+import anthropic
+
+from src import metrics
+
+logger = logging.getLogger(__name__)
+
+HEADER_PREFIX = "anthropic-ratelimit-"
+BUCKET_HEADERS = {
+    "requests": "requests",
+    "input_tokens": "input-tokens",
+    "output_tokens": "output-tokens",
+}
+
+
+class TokenBucket:
+    """Token bucket die per minuut volloopt tot zijn capaciteit."""
+
+    def __init__(self, per_minute: float, now: float):
+        self.capacity = float(per_minute)
+        self.tokens = float(per_minute)
+        self.updated = now
+
+    def refill(self, now: float) -> None:
+        elapsed = max(0.0, now - self.updated)
+        self.tokens = min(self.capacity, self.tokens + elapsed * self.capacity / 60)
+        self.updated = now
+
+    def wait_time(self, amount: float) -> float:
+        """Seconden tot er `amount` tokens beschikbaar zijn (na refill)."""
+        # Een aanvraag groter dan de bucket mag door zodra die vol is
+        amount = min(amount, self.capacity)
+        if self.tokens >= amount or self.capacity <= 0:
+            return 0.0
+        return (amount - self.tokens) * 60 / self.capacity
+
+    def consume(self, amount: float) -> None:
+        self.tokens -= amount
+
+
+class RateLimiter:
+    """
+    Gedeelde limiter voor alle messages.create calls.
+
+    Thread-safe, zodat de parallelle zoekfase en de analysefase dezelfde
+    budgetten delen.
+    """
+
+    def __init__(
+        self,
+        requests_per_minute: float = 50,
+        input_tokens_per_minute: float = 30_000,
+        output_tokens_per_minute: float = 8_000,
+        clock=time.monotonic,
+        sleep=time.sleep,
+    ):
+        self._clock = clock
+        self._sleep = sleep
+        self._lock = threading.Lock()
+        now = clock()
+        self.buckets = {
+            "requests": TokenBucket(requests_per_minute, now),
+            "input_tokens": TokenBucket(input_tokens_per_minute, now),
+            "output_tokens": TokenBucket(output_tokens_per_minute, now),
+        }
+        self.blocked_until = 0.0
+
+    def _wait_time(self, amounts: dict[str, float], now: float) -> float:
+        wait = max(0.0, self.blocked_until - now)
+        for name, amount in amounts.items():
+            bucket = self.buckets[name]
+            bucket.refill(now)
+            wait = max(wait, bucket.wait_time(amount))
+        return wait
+
+    def acquire(self, input_tokens: int, output_tokens: int) -> float:
+        """
+        Blokkeer tot er ruimte is voor één request met de geschatte tokens.
+
+        Returns het aantal seconden dat gewacht is.
+        """
+        amounts = {
+            "requests": 1,
+            "input_tokens": input_tokens,
+            "output_tokens": output_tokens,
+        }
+        waited = 0.0
+        while True:
+            with self._lock:
+                now = self._clock()
+                wait = self._wait_time(amounts, now)
+                if wait <= 0:
+                    for name, amount in amounts.items():
+                        self.buckets[name].consume(amount)
+                    return waited
+            logger.debug(f"Rate limiter wacht {wait:.1f}s")
+            self._sleep(wait)
+            waited += wait
+
+    def record_usage(
+        self, estimated_input: int, estimated_output: int, usage
+    ) -> None:
+        """Corrigeer de buckets met het werkelijke tokengebruik."""
+        if usage is None:
+            return
+        actual_input = (
+            (getattr(usage, "input_tokens", 0) or 0)
+            + (getattr(usage, "cache_creation_input_tokens", 0) or 0)
+        )
+        actual_output = getattr(usage, "output_tokens", 0) or 0
+        if not isinstance(actual_input, int) or not isinstance(actual_output, int):
+            return
+        with self._lock:
+            self.buckets["input_tokens"].consume(actual_input - estimated_input)
+            self.buckets["output_tokens"].consume(actual_output - estimated_output)
+
+    def update_from_headers(self, headers) -> None:
+        """
+        Stel de buckets bij op basis van de rate-limit headers.
+
+        `anthropic-ratelimit-*-limit` zet de capaciteit, `*-remaining` begrenst
+        wat er nog in de bucket zit en `retry-after` blokkeert alle calls.
+        """
+        if not headers:
+            return
+        with self._lock:
+            now = self._clock()
+            for name, header in BUCKET_HEADERS.items():
+                bucket = self.buckets[name]
+                bucket.refill(now)
+                limit = _header_number(headers, f"{HEADER_PREFIX}{header}-limit")
+                if limit is not None and limit > 0:
+                    bucket.capacity = limit
+                    bucket.tokens = min(bucket.tokens, limit)
+                remaining = _header_number(
+                    headers, f"{HEADER_PREFIX}{header}-remaining"
+                )
+                if remaining is not None:
+                    bucket.tokens = min(bucket.tokens, remaining)
+            retry_after = _header_number(headers, "retry-after")
+            if retry_after is not None and retry_after > 0:
+                self.blocked_until = max(self.blocked_until, now + retry_after)
+                logger.warning(f"Server vraagt {retry_after:.0f}s te wachten")
+
+
+def _header_number(headers, name: str) -> float | None:
+    value = headers.get(name)
+    if value is None:
+        return None
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def estimate_tokens(text: str) -> int:
+    """Ruwe schatting van het aantal tokens (±4 tekens per token)."""
+    return len(text) // 4 + 1
+
+
+def usage_summary(usage) -> str:
+    """Korte logregel met input-, output- en cachetokens van een response."""
+    if usage is None:
+        return "geen usage"
+    return (
+        f"input {getattr(usage, 'input_tokens', 0) or 0}, "
+        f"output {getattr(usage, 'output_tokens', 0) or 0}, "
+        f"cache gelezen {getattr(usage, 'cache_read_input_tokens', 0) or 0}, "
+        f"cache aangemaakt {getattr(usage, 'cache_creation_input_tokens', 0) or 0}"
+    )
+
+
+def _request_text(kwargs: dict) -> str:
+    """Alle tekst die als input meegaat in een messages.create call."""
+    parts = []
+    system = kwargs.get("system")
+    if isinstance(system, str):
+        parts.append(system)
+    elif isinstance(system, list):
+        parts.extend(block.get("text", "") for block in system)
+    for message in kwargs.get("messages", []):
+        content = message.get("content", "")
+        if isinstance(content, str):
+            parts.append(content)
+        else:
+            parts.extend(block.get("text", "") for block in content)
+    return "\n".join(parts)
+
+
+def create_rate_limiter(config: dict | None) -> RateLimiter | None:
+    """Maak een limiter uit de `rate_limit` sectie van config.yaml, indien aanwezig."""
+    if not config:
+        return None
+    return RateLimiter(
+        requests_per_minute=config.get("requests_per_minute", 50),
+        input_tokens_per_minute=config.get("input_tokens_per_minute", 30_000),
+        output_tokens_per_minute=config.get("output_tokens_per_minute", 8_000),
+    )
+
+
+def create_message(
+    client: anthropic.Anthropic, limiter: RateLimiter | None = None, **kwargs
+):
+    """
+    Roep client.messages.create aan via de rate limiter.
+
+    Zonder limiter is dit een gewone messages.create call. Tokens en
+    wachttijd gaan naar de metrics van de lopende call.
+    """
+    if limiter is None:
+        response = client.messages.create(**kwargs)
+        metrics.add_usage(response.usage)
+        return response
+
+    estimated_input = estimate_tokens(_request_text(kwargs))
+    estimated_output = kwargs.get("max_tokens", 0)
+    metrics.add("throttle_time", limiter.acquire(estimated_input, estimated_output))
+    try:
+        raw = client.messages.with_raw_response.create(**kwargs)
+    except anthropic.APIStatusError as e:
+        limiter.update_from_headers(e.response.headers)
+        raise
+    limiter.update_from_headers(raw.headers)
+    response = raw.parse()
+    limiter.record_usage(estimated_input, estimated_output, response.usage)
+    metrics.add_usage(response.usage)
+    return response
+
+
+def stream_message(
+    client: anthropic.Anthropic,
+    limiter: RateLimiter | None = None,
+    on_text: Callable[[str], None] | None = None,
+    progress_interval: float = 5.0,
+    **kwargs,
+):
+    """
+    Als create_message, maar via de streaming API.
+
+    Elk binnenkomend tekstfragment gaat naar on_text; de voortgang (tokens,
+    tokens/s, verstreken tijd) wordt elke progress_interval seconden gelogd.
+
+    Returns het volledige bericht, net als messages.create.
+    """
+    estimated_input = estimate_tokens(_request_text(kwargs))
+    estimated_output = kwargs.get("max_tokens", 0)
+    if limiter is not None:
+        metrics.add(
+            "throttle_time", limiter.acquire(estimated_input, estimated_output)
+        )
+
+    start = time.monotonic()
+    last_log = start
+    chars = 0
+    try:
+        with client.messages.stream(**kwargs) as stream:
+            for text in stream.text_stream:
+                chars += len(text)
+                if on_text is not None:
+                    on_text(text)
+                now = time.monotonic()
+                if now - last_log >= progress_interval:
+                    last_log = now
+                    tokens = chars // 4
+                    elapsed = now - start
+                    logger.info(
+                        f"Streaming: ~{tokens} tokens, "
+                        f"{tokens / elapsed:.0f} tokens/s, {elapsed:.0f}s"
+                    )
+            response = stream.get_final_message()
+            if limiter is not None:
+                limiter.update_from_headers(stream.response.headers)
+    except anthropic.APIStatusError as e:
+        if limiter is not None:
+            limiter.update_from_headers(e.response.headers)
+        raise
+
+    elapsed = time.monotonic() - start
+    output_tokens = getattr(response.usage, "output_tokens", 0) or 0
+    if isinstance(output_tokens, int) and elapsed > 0:
+        logger.info(
+            f"Streaming klaar: {output_tokens} tokens in {elapsed:.1f}s "
+            f"({output_tokens / elapsed:.0f} tokens/s)"
+        )
+    if limiter is not None:
+        limiter.record_usage(estimated_input, estimated_output, response.usage)
+    metrics.add_usage(response.usage)
+    return response
@@ -0,0 +1,320 @@
+"""
+Rendering — zet het Markdown-rapport om naar HTML voor e-mail en publicatie.
+
+De renderer kent precies wat de analyse schrijft: koppen, alinea's, lijsten,
+tabellen, codeblokken, citaten, scheidingslijnen, vet/cursief, inline code
+en links. Hij loopt één keer over de regels en doet per regel een vast
+aantal regex-passes, dus de tijd groeit lineair met de rapportgrootte. Alle
+opmaak staat inline in style-attributen, omdat veel mailclients <style>
+negeren. Het resultaat wordt gecachet op een hash van de Markdown, zodat
+herverzending, meerdere ontvangers en de publicatie-kopie één render delen.
+"""
+
+import hashlib
+import html
+import logging
+import re
+import threading
+from collections import OrderedDict
+from urllib.parse import urlsplit
+
+from src.cache import ResponseCache
+
+logger = logging.getLogger(__name__)
+
+# Verhogen bij een wijziging in de output, zodat oude cache-entries vervallen
+RENDER_VERSION = 2
+
+# Links komen van het model en het web; alleen deze schema's worden een href
+LINK_SCHEMES = {"http", "https", "mailto"}
+
+STYLES = {
+    "body": (
+        "font-family:-apple-system,Segoe UI,Helvetica,Arial,sans-serif;"
+        "font-size:15px;line-height:1.5;color:#1f2328;max-width:760px;"
+        "margin:0 auto;padding:16px"
+    ),
+    "h1": "font-size:24px;margin:24px 0 12px;border-bottom:1px solid #d0d7de",
+    "h2": "font-size:20px;margin:24px 0 10px;border-bottom:1px solid #d0d7de",
+    "h3": "font-size:17px;margin:20px 0 8px",
+    "h4": "font-size:15px;margin:16px 0 8px",
+    "p": "margin:0 0 12px",
+    "ul": "margin:0 0 12px;padding-left:24px",
+    "ol": "margin:0 0 12px;padding-left:24px",
+    "li": "margin:2px 0",
+    "blockquote": (
+        "margin:0 0 12px;padding:0 12px;color:#59636e;"
+        "border-left:4px solid #d0d7de"
+    ),
+    "pre": (
+        "margin:0 0 12px;padding:12px;background:#f6f8fa;border-radius:6px;"
+        "overflow-x:auto;font-size:13px;line-height:1.4"
+    ),
+    "code": (
+        "font-family:SFMono-Regular,Consolas,Menlo,monospace;"
+        "background:#f6f8fa;padding:1px 4px;border-radius:4px;font-size:13px"
+    ),
+    "pre code": "font-family:SFMono-Regular,Consolas,Menlo,monospace",
+    "table": "border-collapse:collapse;margin:0 0 12px;width:100%",
+    "th": "border:1px solid #d0d7de;padding:6px 10px;background:#f6f8fa",
+    "td": "border:1px solid #d0d7de;padding:6px 10px;vertical-align:top",
+    "hr": "border:0;border-top:1px solid #d0d7de;margin:20px 0",
+    "a": "color:#0969da",
+}
+
+HEADING = re.compile(r"^(#{1,6})\s+(.*?)\s*#*\s*$")
+RULE = re.compile(r"^\s*([-*_])(\s*\1){2,}\s*$")
+FENCE = re.compile(r"^\s*(`{3,}|~{3,})")
+LIST_ITEM = re.compile(r"^\s*(?:([-*+])|(\d+)[.)])\s+(.*)$")
+TABLE_SEPARATOR = re.compile(r"^\s*\|?\s*:?-+:?\s*(\|\s*:?-+:?\s*)*\|?\s*$")
+CODE_SPAN = re.compile(r"(`+)(.+?)\1")
+LINK = re.compile(r"\[([^\[\]\n]+)\]\(([^()\s]+)\)")
+BOLD = re.compile(r"(\*\*|__)(?=\S)(.+?)(?<=\S)\1")
+ITALIC = re.compile(r"(?<![\w*])\*(?=[^\s*])([^*\n]+?)(?<=\S)\*(?![\w*])")
+
+
+def content_hash(markdown: str) -> str:
+    """Sleutel van een render: hash van versie en Markdown."""
+    payload = f"{RENDER_VERSION}\n{markdown}".encode("utf-8")
+    return hashlib.sha256(payload).hexdigest()
+
+
+def _tag(name: str, body: str) -> str:
+    return f'<{name} style="{STYLES[name]}">{body}</{name}>'
+
+
+def _inline(text: str) -> str:
+    """Inline opmaak van één regel; code spans blijven letterlijk."""
+    parts = []
+    last = 0
+    for match in CODE_SPAN.finditer(text):
+        parts.append(_inline_text(text[last:match.start()]))
+        parts.append(_tag("code", html.escape(match.group(2).strip())))
+        last = match.end()
+    parts.append(_inline_text(text[last:]))
+    return "".join(parts)
+
+
+def _link(match: re.Match) -> str:
+    """Een link met een veilig schema; andere links blijven (escaped) tekst."""
+    try:
+        scheme = urlsplit(html.unescape(match.group(2))).scheme.lower()
+    except ValueError:
+        scheme = ""
+    if scheme not in LINK_SCHEMES:
+        return match.group(0)
+    href = match.group(2).replace('"', "&quot;")
+    return f'<a href="{href}" style="{STYLES["a"]}">{match.group(1)}</a>'
+
+
+def _inline_text(text: str) -> str:
+    text = html.escape(text, quote=False)
+    text = LINK.sub(_link, text)
+    text = BOLD.sub(r"<strong>\2</strong>", text)
+    return ITALIC.sub(r"<em>\1</em>", text)
+
+
+def _split_row(line: str) -> list[str]:
+    line = line.strip()
+    if line.startswith("|"):
+        line = line[1:]
+    if line.endswith("|"):
+        line = line[:-1]
+    return [cell.strip() for cell in line.split("|")]
+
+
+def markdown_to_html(markdown: str) -> str:
+    """Zet een rapport om naar een volledig HTML-document met inline styles."""
+    lines = markdown.splitlines()
+    out = []
+    paragraph: list[str] = []
+    i = 0
+
+    def flush_paragraph():
+        if paragraph:
+            out.append(_tag("p", "<br>\n".join(_inline(p) for p in paragraph)))
+            paragraph.clear()
+
+    while i < len(lines):
+        line = lines[i]
+        stripped = line.strip()
+
+        fence = FENCE.match(line)
+        if fence:
+            flush_paragraph()
+            marker = fence.group(1)
+            code = []
+            i += 1
+            while i < len(lines) and not lines[i].strip().startswith(marker):
+                code.append(lines[i])
+                i += 1
+            i += 1  # sluitende fence
+            body = html.escape("\n".join(code))
+            out.append(
+                f'<pre style="{STYLES["pre"]}">'
+                f'<code style="{STYLES["pre code"]}">{body}</code></pre>'
+            )
+            continue
+
+        if not stripped:
+            flush_paragraph()
+            i += 1
+            continue
+
+        heading = HEADING.match(stripped)
+        if heading:
+            flush_paragraph()
+            level = min(len(heading.group(1)), 4)
+            out.append(_tag(f"h{level}", _inline(heading.group(2))))
+            i += 1
+            continue
+
+        if RULE.match(stripped):
+            flush_paragraph()
+            out.append(f'<hr style="{STYLES["hr"]}">')
+            i += 1
+            continue
+
+        if (
+            stripped.startswith("|")
+            and i + 1 < len(lines)
+            and TABLE_SEPARATOR.match(lines[i + 1])
+        ):
+            flush_paragraph()
+            header = "".join(_tag("th", _inline(c)) for c in _split_row(line))
+            rows = [f"<tr>{header}</tr>"]
+            i += 2
+            while i < len(lines) and lines[i].strip().startswith("|"):
+                cells = "".join(
+                    _tag("td", _inline(c)) for c in _split_row(lines[i])
+                )
+                rows.append(f"<tr>{cells}</tr>")
+                i += 1
+            out.append(_tag("table", "\n".join(rows)))
+            continue
+
+        if stripped.startswith(">"):
+            flush_paragraph()
+            quoted = []
+            while i < len(lines) and lines[i].strip().startswith(">"):
+                quoted.append(_inline(lines[i].strip()[1:].strip()))
+                i += 1
+            out.append(_tag("blockquote", _tag("p", "<br>\n".join(quoted))))
+            continue
+
+        item = LIST_ITEM.match(line)
+        if item:
+            flush_paragraph()
+            kind = "ul" if item.group(1) else "ol"
+            items = []
+            while i < len(lines):
+                item = LIST_ITEM.match(lines[i])
+                if item and ("ul" if item.group(1) else "ol") != kind:
+                    break
+                if item:
+                    items.append([item.group(3)])
+                elif lines[i].startswith((" ", "\t")) and lines[i].strip():
+                    # Vervolgregel van het vorige punt
+                    items[-1].append(lines[i].strip())
+                elif (
+                    not lines[i].strip()
+                    and i + 1 < len(lines)
+                    and LIST_ITEM.match(lines[i + 1])
+                ):
+                    # Lege regel tussen twee punten: zelfde lijst
+                    pass
+                else:
+                    break
+                i += 1
+            body = "".join(
+                _tag("li", "<br>\n".join(_inline(part) for part in parts))
+                for parts in items
+            )
+            out.append(_tag(kind, body))
+            continue
+
+        paragraph.append(stripped)
+        i += 1
+
+    flush_paragraph()
+    return (
+        '<!DOCTYPE html>\n<html><head><meta charset="utf-8"></head>\n'
+        f'<body style="{STYLES["body"]}">\n' + "\n".join(out) + "\n</body></html>\n"
+    )
+
+
+def markdown_to_text(markdown: str) -> str:
+    """
+    Platte-tekstversie: zonder vet/cursief-tekens en met links als "tekst (url)".
+
+    Koppen, lijsten en codeblokken blijven staan; die lezen ook zonder opmaak.
+    """
+    lines = []
+    in_code = False
+    for line in markdown.splitlines():
+        if FENCE.match(line):
+            in_code = not in_code
+            continue
+        if not in_code:
+            line = LINK.sub(r"\1 (\2)", line)
+            line = BOLD.sub(r"\2", line)
+            line = ITALIC.sub(r"\1", line)
+        lines.append(line)
+    return "\n".join(lines) + "\n"
+
+
+class ReportRenderer:
+    """
+    Rendert rapporten met een cache op content-hash (thread-safe).
+
+    Recente renders blijven in het geheugen; met een ResponseCache worden ze
+    ook op schijf bewaard, zodat een volgende run (bijv. --resume) ze
+    hergebruikt.
+    """
+
+    def __init__(self, cache: ResponseCache | None = None, max_memory: int = 16):
+        self.cache = cache
+        self.max_memory = max_memory
+        self.hits = 0
+        self.misses = 0
+        self._memory: OrderedDict[str, dict] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def render(self, markdown: str) -> dict:
+        """Returns {"html": ..., "text": ...} voor een rapport."""
+        key = content_hash(markdown)
+        with self._lock:
+            if key in self._memory:
+                self._memory.move_to_end(key)
+                self.hits += 1
+                return self._memory[key]
+        rendered = self.cache.get(key) if self.cache is not None else None
+        if rendered is None:
+            rendered = {
+                "html": markdown_to_html(markdown),
+                "text": markdown_to_text(markdown),
+            }
+            if self.cache is not None:
+                self.cache.set(key, rendered)
+            with self._lock:
+                self.misses += 1
+        else:
+            with self._lock:
+                self.hits += 1
+        with self._lock:
+            self._memory[key] = rendered
+            while len(self._memory) > self.max_memory:
+                self._memory.popitem(last=False)
+        return rendered
+
+
+def create_renderer(directory: str | None = None) -> ReportRenderer:
+    """Renderer met een schijfcache in directory (30 dagen, max 5 MB)."""
+    cache = None
+    if directory:
+        cache = ResponseCache(
+            directory=directory,
+            ttl_seconds=30 * 24 * 60 * 60,
+            max_bytes=5 * 1024 * 1024,
+        )
+    return ReportRenderer(cache)
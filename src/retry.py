@@ -0,0 +1,196 @@
+"""
+Retrybeleid — gedeeld door zoek- en analysefase.
+
+Fouten worden geclassificeerd op hun getypeerde anthropic-exceptie en
+statuscode: rate limits (429), overbelasting (529), serverfouten (5xx),
+timeouts en verbroken verbindingen worden opnieuw geprobeerd, al het andere
+niet. De wachttijd volgt "decorrelated jitter" en respecteert retry-after.
+Een RetryBudget begrenst het totaal aantal retries en de totale wachttijd
+per run, zodat een storing bij de API een cronrun niet urenlang laat slapen.
+"""
+
+import logging
+import random
+import threading
+import time
+from collections.abc import Callable
+from email.utils import parsedate_to_datetime
+
+import anthropic
+
+from src import metrics
+
+logger = logging.getLogger(__name__)
+
+RETRYABLE_STATUS = {
+    408: "timeout",
+    409: "conflict",
+    429: "rate_limit",
+    500: "server",
+    502: "server",
+    503: "server",
+    504: "timeout",
+    529: "overloaded",
+}
+
+
+def classify_error(error: BaseException) -> str | None:
+    """
+    Soort fout voor het retrybeleid, of None als opnieuw proberen geen zin heeft.
+
+    Returns "rate_limit", "overloaded", "server", "timeout", "conflict" of
+    "connection".
+    """
+    if isinstance(error, anthropic.APIStatusError):
+        status = error.status_code
+        if status in RETRYABLE_STATUS:
+            return RETRYABLE_STATUS[status]
+        return "server" if status >= 500 else None
+    if isinstance(error, (anthropic.APITimeoutError, TimeoutError)):
+        return "timeout"
+    if isinstance(error, (anthropic.APIConnectionError, ConnectionError)):
+        return "connection"
+    return None
+
+
+def retry_after(error: BaseException) -> float | None:
+    """Wachttijd in seconden uit de retry-after(-ms) header van een fout."""
+    response = getattr(error, "response", None)
+    headers = getattr(response, "headers", None)
+    if not headers:
+        return None
+    value = headers.get("retry-after-ms")
+    if value is not None:
+        try:
+            return max(0.0, float(value) / 1000)
+        except (TypeError, ValueError):
+            pass
+    value = headers.get("retry-after")
+    if value is None:
+        return None
+    try:
+        return max(0.0, float(value))
+    except (TypeError, ValueError):
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+class RetryBudget:
+    """Maximaal aantal retries en totale wachttijd voor één run (thread-safe)."""
+
+    def __init__(self, max_retries: int = 30, max_sleep: float = 15 * 60):
+        self.max_retries = max_retries
+        self.max_sleep = max_sleep
+        self.retries = 0
+        self.slept = 0.0
+        self._lock = threading.Lock()
+        self._exhausted_logged = False
+
+    def spend(self, wait: float) -> bool:
+        """Reserveer één retry van `wait` seconden; False als het budget op is."""
+        with self._lock:
+            if (
+                self.retries + 1 > self.max_retries
+                or self.slept + wait > self.max_sleep
+            ):
+                if not self._exhausted_logged:
+                    self._exhausted_logged = True
+                    logger.warning(
+                        f"Retrybudget op ({self.retries} retries, "
+                        f"{self.slept:.0f}s gewacht): geen retries meer deze run"
+                    )
+                return False
+            self.retries += 1
+            self.slept += wait
+            return True
+
+
+class RetryPolicy:
+    """
+    Voert een call uit met retries volgens decorrelated jitter.
+
+    De eerste wachttijd ligt tussen base_delay en 3 × base_delay, elke
+    volgende tussen base_delay en 3 × de vorige, begrensd op max_delay.
+    Geeft de API een retry-after mee, dan wordt minstens zo lang gewacht
+    (plus tot 20% jitter, zodat parallelle threads niet tegelijk terugkomen).
+    """
+
+    def __init__(
+        self,
+        max_retries: int = 3,
+        base_delay: float = 5,
+        max_delay: float = 60,
+        budget: RetryBudget | None = None,
+        rng: random.Random | None = None,
+        sleep: Callable[[float], None] | None = None,
+    ):
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.budget = budget
+        self._rng = rng or random.Random()
+        self._sleep = sleep or time.sleep
+
+    def next_delay(self, previous: float, error: BaseException) -> float:
+        """Wachttijd voor de volgende poging."""
+        delay = min(
+            self.max_delay,
+            self._rng.uniform(self.base_delay, max(self.base_delay, previous * 3)),
+        )
+        hinted = retry_after(error)
+        if hinted is not None:
+            delay = max(delay, hinted * self._rng.uniform(1.0, 1.2))
+        return delay
+
+    def call(
+        self,
+        fn: Callable[[], object],
+        label: str = "",
+        can_retry: Callable[[], bool] | None = None,
+    ):
+        """
+        Roep fn() aan en probeer opnieuw bij tijdelijke fouten.
+
+        can_retry is een extra voorwaarde, bijv. "er is nog niets gestreamd".
+        Retries en wachttijd gaan naar de metrics van de lopende call.
+        Gooit de laatste fout door als retries geen zin hebben of op zijn.
+        """
+        delay = self.base_delay
+        for attempt in range(self.max_retries + 1):
+            try:
+                return fn()
+            except Exception as e:
+                kind = classify_error(e)
+                if (
+                    kind is None
+                    or attempt >= self.max_retries
+                    or (can_retry is not None and not can_retry())
+                ):
+                    raise
+                delay = self.next_delay(delay, e)
+                if self.budget is not None and not self.budget.spend(delay):
+                    raise
+                logger.warning(
+                    f"{kind} bij '{label}', retry {attempt + 1}/"
+                    f"{self.max_retries} na {delay:.1f}s"
+                )
+                metrics.add("retries", 1)
+                metrics.add("backoff_time", delay)
+                self._sleep(delay)
+
+
+def create_retry_policy(config: dict | None) -> RetryPolicy:
+    """Maak het retrybeleid voor een run uit de `retry` sectie van config.yaml."""
+    config = config or {}
+    return RetryPolicy(
+        max_retries=config.get("max_retries", 3),
+        base_delay=config.get("base_delay", 5),
+        max_delay=config.get("max_delay", 60),
+        budget=RetryBudget(
+            max_retries=config.get("budget_retries", 30),
+            max_sleep=config.get("budget_seconds", 15 * 60),
+        ),
+    )
@@ -0,0 +1,144 @@
+"""
+Runbeheer — bewaart de tussenresultaten van een run op schijf.
+
+Elke run krijgt een eigen map met een manifest (status per stap en per
+prompt), een JSON-bestand per zoekprompt en het gegenereerde rapport. Bij
+meerdere onderwerpen heeft elk onderwerp een eigen submap binnen de run.
+Met `python main.py resume <run-id>` worden alleen de prompts en stappen
+overgedaan die nog ontbreken of mislukt zijn.
+"""
+
+import json
+import logging
+import os
+import threading
+from datetime import datetime
+from pathlib import Path
+
+logger = logging.getLogger(__name__)
+
+STAGES = ("search", "analyze", "save", "email")
+
+
+def is_failed_result(result: dict) -> bool:
+    """Een zoekresultaat dat opnieuw moet bij een resume."""
+    return result["raw_output"].startswith("FOUT:")
+
+
+def _write_json(path: Path, data: dict) -> None:
+    """Schrijf JSON atomair: eerst naar een tijdelijk bestand, dan hernoemen."""
+    tmp = path.with_name(f"{path.name}.tmp")
+    tmp.write_text(json.dumps(data, indent=2, ensure_ascii=False), encoding="utf-8")
+    os.replace(tmp, path)
+
+
+class RunStore:
+    """Manifest en tussenresultaten van één run (of één onderwerp daarin)."""
+
+    def __init__(self, runs_dir: str, run_id: str | None = None, topic: str = ""):
+        self.run_id = run_id or datetime.now().strftime("%Y-%m-%d-%H%M%S")
+        self.topic = topic
+        self.path = Path(runs_dir) / self.run_id
+        self.label = self.run_id
+        if topic:
+            self.path = self.path / topic
+            self.label = f"{self.run_id}/{topic}"
+        self.results_dir = self.path / "search"
+        self.manifest_path = self.path / "manifest.json"
+        self._lock = threading.Lock()
+
+        if self.manifest_path.exists():
+            self.manifest = json.loads(self.manifest_path.read_text(encoding="utf-8"))
+        else:
+            self.results_dir.mkdir(parents=True, exist_ok=True)
+            self.manifest = {
+                "run_id": self.run_id,
+                "created": datetime.now().isoformat(timespec="seconds"),
+                "stages": {stage: {"status": "pending"} for stage in STAGES},
+                "prompts": {},
+            }
+            self._save_manifest()
+
+    @classmethod
+    def resume(cls, runs_dir: str, run_id: str, topic: str = "") -> "RunStore":
+        """Open een bestaande run; FileNotFoundError als die niet bestaat."""
+        manifest = Path(runs_dir) / run_id / topic / "manifest.json"
+        if not manifest.exists():
+            raise FileNotFoundError(f"Run niet gevonden: {manifest}")
+        return cls(runs_dir, run_id, topic)
+
+    def _save_manifest(self) -> None:
+        _write_json(self.manifest_path, self.manifest)
+
+    # --- zoekresultaten per prompt ---
+
+    def save_result(self, result: dict) -> None:
+        """Bewaar één zoekresultaat en werk het manifest bij (thread-safe)."""
+        status = "failed" if is_failed_result(result) else "done"
+        _write_json(self.results_dir / f"{result['id']}.json", result)
+        with self._lock:
+            self.manifest["prompts"][result["id"]] = status
+            self._save_manifest()
+
+    def load_results(self) -> dict[str, dict]:
+        """Alle bewaarde zoekresultaten, per prompt-id."""
+        results = {}
+        for path in self.results_dir.glob("*.json"):
+            result = json.loads(path.read_text(encoding="utf-8"))
+            results[result["id"]] = result
+        return results
+
+    def pending_prompts(self, prompts: list[dict]) -> list[dict]:
+        """Prompts zonder geslaagd resultaat in deze run."""
+        statuses = self.manifest["prompts"]
+        return [p for p in prompts if statuses.get(p["id"]) != "done"]
+
+    # --- stappen ---
+
+    def stage_done(self, stage: str) -> bool:
+        return self.manifest["stages"][stage]["status"] == "done"
+
+    def mark_stage(self, stage: str, status: str, **info) -> None:
+        """Zet de status van een stap, met optionele extra gegevens."""
+        with self._lock:
+            self.manifest["stages"][stage] = {
+                "status": status,
+                "updated": datetime.now().isoformat(timespec="seconds"),
+                **info,
+            }
+            self._save_manifest()
+        logger.info(f"Run {self.label}: stap '{stage}' {status}")
+
+    # --- rapport ---
+
+    def save_report(self, report: str) -> None:
+        (self.path / "report.md").write_text(report, encoding="utf-8")
+
+    def load_report(self) -> str:
+        return (self.path / "report.md").read_text(encoding="utf-8")
+
+
+def open_runs(
+    runs_dir: str, topics: list[dict], resume_id: str | None = None
+) -> dict[str, RunStore]:
+    """
+    Maak (of hervat) de RunStore van elk onderwerp, allemaal met één run-id.
+
+    FileNotFoundError als een te hervatten run of onderwerp niet bestaat.
+    """
+    runs = {}
+    run_id = resume_id
+    for topic in topics:
+        if resume_id:
+            run = RunStore.resume(runs_dir, resume_id, topic["name"])
+        else:
+            run = RunStore(runs_dir, run_id, topic["name"])
+            run_id = run.run_id
+        runs[topic["name"]] = run
+    return runs
+
+
+def latest_run_id(runs_dir: str) -> str | None:
+    """Id van de nieuwste run in runs_dir (run-ids sorteren op tijd)."""
+    runs = sorted(p.name for p in Path(runs_dir).glob("*") if p.is_dir())
+    return runs[-1] if runs else None
@@ -0,0 +1,381 @@
+"""
+Scheduler — plant per prompt hoe vaak en met hoeveel budget er gezocht wordt.
+
+Per prompt wordt bijgehouden wat hij oplevert (artikelen boven de
+relevantiedrempel met een geverifieerde URL) tegenover wat hij kost
+(tokens, web searches, duur), als voortschrijdend gemiddelde over de runs.
+Daarmee wordt elke run gepland:
+
+- nieuwe prompts draaien eerst een paar keer normaal (verkennen);
+- prompts met een lage opbrengst draaien minder vaak en met minder web
+  searches;
+- prompts met een hoge opbrengst krijgen meer web searches en tokens;
+- de geschatte kosten blijven binnen het weekbudget: wat er niet in past
+  wordt eerst kleiner gemaakt en anders uitgesteld.
+
+`python main.py plan` toont de planning zonder iets te zoeken (dry run).
+"""
+
+import json
+import logging
+import os
+import threading
+from datetime import date, timedelta
+from pathlib import Path
+
+from src.articles import select_articles
+
+logger = logging.getLogger(__name__)
+
+# Zoekinstellingen per niveau; "normaal" is wat build_search_request standaard doet
+DEFAULT_TIERS = {
+    "laag": {"max_uses": 2, "max_tokens": 2048},
+    "normaal": {"max_uses": 5, "max_tokens": 4096},
+    "hoog": {"max_uses": 8, "max_tokens": 6144},
+}
+
+# Dollar per miljoen tokens en per web search; tokens in een Message Batch
+# kosten batch_discount maal de gewone prijs
+DEFAULT_PRICES = {
+    "input_per_mtok": 3.0,
+    "output_per_mtok": 15.0,
+    "search": 0.01,
+    "batch_discount": 0.5,
+}
+
+
+def call_cost(record: dict, prices: dict, batch: bool = False) -> float:
+    """Geschatte kosten in dollars van één call-record uit src/metrics.py."""
+    prices = {**DEFAULT_PRICES, **prices}
+    per_input = prices["input_per_mtok"] / 1e6
+    tokens = (
+        record.get("input_tokens", 0) * per_input
+        + record.get("cache_creation_input_tokens", 0) * per_input * 1.25
+        + record.get("cache_read_input_tokens", 0) * per_input * 0.1
+        + record.get("output_tokens", 0) * prices["output_per_mtok"] / 1e6
+    )
+    if batch:
+        tokens *= prices["batch_discount"]
+    return tokens + record.get("web_searches", 0) * prices["search"]
+
+
+def search_costs(
+    calls: list[dict], topic: str, prompt_ids, prices: dict
+) -> dict[str, dict]:
+    """
+    Kosten per prompt van één onderwerp uit de metrics-records van de zoekfase.
+
+    Een directe zoekcall heeft het prompt-id als label en het onderwerp onder
+    "topic"; een Message Batch heeft één record ("batch") met de tokens per
+    custom_id onder "prompts", elk met onderwerp en prompt-id. Onderwerpen
+    kunnen dezelfde prompt-ids hebben, dus beide moeten kloppen.
+    Batchprompts hebben geen eigen duur (wall_time None).
+
+    Returns {prompt-id: {"usd", "web_searches", "wall_time"}}.
+    """
+    costs = {}
+    for call in calls:
+        if call["stage"] != "search":
+            continue
+        if "prompts" not in call:
+            usage = {}
+            if call.get("topic", "") == topic and call["label"] in prompt_ids:
+                usage[call["label"]] = (call, False)
+        else:
+            # Sleutel is de custom_id; het prompt-id staat onder "id"
+            usage = {
+                counts.get("id", custom_id): (counts, True)
+                for custom_id, counts in call["prompts"].items()
+                if counts.get("topic", "") == topic
+                and counts.get("id", custom_id) in prompt_ids
+            }
+        for prompt_id, (record, batch) in usage.items():
+            cost = costs.setdefault(
+                prompt_id, {"usd": 0.0, "web_searches": 0, "wall_time": 0.0}
+            )
+            cost["usd"] += call_cost(record, prices, batch=batch)
+            cost["web_searches"] += record.get("web_searches", 0)
+            if batch:
+                cost["wall_time"] = None
+            elif cost["wall_time"] is not None:
+                cost["wall_time"] += record.get("wall_time", 0.0)
+    return costs
+
+
+def stats_key(topic: str, prompt_id: str) -> str:
+    return f"{topic}/{prompt_id}" if topic else prompt_id
+
+
+class PromptStats:
+    """
+    Persistente opbrengst en kosten per prompt (thread-safe).
+
+    Per prompt: aantal runs, voortschrijdend gemiddelde van opbrengst,
+    kosten, web searches en duur, de max_uses waarmee gemeten is en de
+    laatste run. Daarnaast de uitgaven per dag voor het weekbudget.
+    """
+
+    def __init__(self, path: str, smoothing: float = 0.3):
+        self.path = Path(path)
+        self.smoothing = smoothing
+        self.prompts: dict[str, dict] = {}
+        self.spend: dict[str, float] = {}
+        self._lock = threading.Lock()
+        if self.path.exists():
+            data = json.loads(self.path.read_text(encoding="utf-8"))
+            self.prompts = data.get("prompts", {})
+            self.spend = data.get("spend", {})
+
+    def save(self) -> None:
+        """Sla de statistieken atomair op (onderwerpen delen één bestand)."""
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.with_name(f"{self.path.name}.tmp")
+        with self._lock:
+            data = json.dumps(
+                {"prompts": self.prompts, "spend": self.spend},
+                indent=2, sort_keys=True,
+            )
+            tmp.write_text(data, encoding="utf-8")
+            os.replace(tmp, self.path)
+
+    def get(self, topic: str, prompt_id: str) -> dict | None:
+        return self.prompts.get(stats_key(topic, prompt_id))
+
+    def spent_since(self, since: date) -> float:
+        """Uitgaven vanaf een datum (inclusief)."""
+        return sum(
+            amount for day, amount in self.spend.items()
+            if day >= since.isoformat()
+        )
+
+    def _average(self, stats: dict, field: str, value: float) -> None:
+        if stats["runs"] == 0 or field not in stats:
+            stats[field] = value
+        else:
+            stats[field] += self.smoothing * (value - stats[field])
+
+    def record(
+        self,
+        topic: str,
+        prompts: list[dict],
+        results: list[dict],
+        calls: list[dict],
+        run_id: str,
+        run_date: date,
+        min_relevance: int = 0,
+        prices: dict | None = None,
+    ) -> None:
+        """
+        Verwerk de zoekresultaten van een run.
+
+        De kosten komen uit de metrics-records van de zoekfase (zie
+        search_costs), ook in batch-modus. Een resultaat uit de cache heeft
+        geen record en telt alleen voor de opbrengst. Mislukte zoekcalls
+        tellen niet mee; een prompt die in deze run al verwerkt is
+        (hervatting) wordt overgeslagen.
+        """
+        prices = prices or {}
+        by_id = {prompt["id"]: prompt for prompt in prompts}
+        costs = search_costs(calls, topic, by_id, prices)
+
+        with self._lock:
+            for result in results:
+                if result["raw_output"].startswith("FOUT:"):
+                    continue
+                stats = self.prompts.setdefault(
+                    stats_key(topic, result["id"]), {"runs": 0}
+                )
+                if stats.get("last_run_id") == run_id:
+                    continue
+                kept = select_articles([result], min_relevance=min_relevance)[1]
+                self._average(stats, "yield", kept["kept"])
+                cost = costs.get(result["id"])
+                if cost is not None:
+                    self._average(stats, "cost", cost["usd"])
+                    self._average(stats, "web_searches", cost["web_searches"])
+                    if cost["wall_time"] is not None:
+                        self._average(stats, "latency", cost["wall_time"])
+                    stats["max_uses"] = by_id[result["id"]].get(
+                        "max_uses", DEFAULT_TIERS["normaal"]["max_uses"]
+                    )
+                    day = run_date.isoformat()
+                    self.spend[day] = self.spend.get(day, 0.0) + cost["usd"]
+                stats["runs"] += 1
+                stats["last_run"] = run_date.isoformat()
+                stats["last_run_id"] = run_id
+            # Alleen de laatste weken zijn nodig voor het budget
+            cutoff = (run_date - timedelta(days=28)).isoformat()
+            self.spend = {d: a for d, a in self.spend.items() if d >= cutoff}
+
+
+class Scheduler:
+    """
+    Plant per prompt: draaien of uitstellen, en met welke instellingen.
+
+    plan() geeft per prompt een entry met topic, prompt, tier, run (bool),
+    max_uses, max_tokens, geschatte kosten en de reden.
+    """
+
+    def __init__(
+        self,
+        stats: PromptStats,
+        weekly_budget: float | None = None,
+        explore_runs: int = 3,
+        low_yield: float = 0.5,
+        high_yield: float = 3.0,
+        low_yield_interval_days: int = 28,
+        default_cost: float = 0.10,
+        tiers: dict | None = None,
+    ):
+        self.stats = stats
+        self.weekly_budget = weekly_budget
+        self.explore_runs = explore_runs
+        self.low_yield = low_yield
+        self.high_yield = high_yield
+        self.low_yield_interval_days = low_yield_interval_days
+        self.default_cost = default_cost
+        self.tiers = {
+            name: {**settings, **(tiers or {}).get(name, {})}
+            for name, settings in DEFAULT_TIERS.items()
+        }
+
+    def _estimate(self, stats: dict | None, tier: str) -> float:
+        """Kosten bij de max_uses van een tier, geschaald vanaf de meting."""
+        if not stats or "cost" not in stats:
+            return self.default_cost
+        measured = stats.get("max_uses") or self.tiers["normaal"]["max_uses"]
+        return stats["cost"] * self.tiers[tier]["max_uses"] / measured
+
+    def _entry(self, topic: str, prompt: dict, today: date) -> dict:
+        stats = self.stats.get(topic, prompt["id"])
+        score = 0.0
+        if not stats or stats["runs"] < self.explore_runs:
+            tier, run, reason = "normaal", True, "nieuw: verkennen"
+        elif stats["yield"] < self.low_yield:
+            tier, run = "laag", True
+            reason = f"lage opbrengst ({stats['yield']:.1f} per run)"
+            next_run = (
+                date.fromisoformat(stats["last_run"])
+                + timedelta(days=self.low_yield_interval_days)
+            )
+            if today < next_run:
+                run = False
+                reason += f", weer op {next_run.isoformat()}"
+        elif stats["yield"] >= self.high_yield:
+            tier, run = "hoog", True
+            reason = f"hoge opbrengst ({stats['yield']:.1f} per run)"
+        else:
+            tier, run = "normaal", True
+            reason = f"opbrengst {stats['yield']:.1f} per run"
+        if stats and "yield" in stats:
+            score = stats["yield"] / max(self._estimate(stats, "normaal"), 1e-6)
+        return {
+            "topic": topic,
+            "prompt": prompt,
+            "tier": tier,
+            "run": run,
+            **self.tiers[tier],
+            "cost": self._estimate(stats, tier),
+            "yield": stats.get("yield") if stats else None,
+            "score": score,
+            "explore": not stats or stats["runs"] < self.explore_runs,
+            "reason": reason,
+        }
+
+    def budget_left(self, today: date) -> float | None:
+        """Wat er deze week (laatste 7 dagen) nog over is, of None zonder cap."""
+        if self.weekly_budget is None:
+            return None
+        spent = self.stats.spent_since(today - timedelta(days=6))
+        return max(0.0, self.weekly_budget - spent)
+
+    def plan(self, prompts: dict[str, list[dict]], today: date) -> list[dict]:
+        """
+        Planning voor de prompts van alle onderwerpen ({onderwerp: prompts}).
+
+        Binnen het weekbudget gaan verkennende prompts voor, daarna de
+        prompts met de meeste artikelen per dollar. Wat er niet in past
+        wordt eerst naar "laag" gezet en anders uitgesteld.
+        """
+        entries = [
+            self._entry(topic, prompt, today)
+            for topic, topic_prompts in prompts.items()
+            for prompt in topic_prompts
+        ]
+        left = self.budget_left(today)
+        if left is None:
+            return entries
+        for entry in sorted(
+            (e for e in entries if e["run"]),
+            key=lambda e: (not e["explore"], -e["score"]),
+        ):
+            if entry["cost"] <= left:
+                left -= entry["cost"]
+                continue
+            stats = self.stats.get(entry["topic"], entry["prompt"]["id"])
+            low = self._estimate(stats, "laag")
+            if entry["tier"] != "laag" and low <= left:
+                entry.update(self.tiers["laag"], tier="laag", cost=low)
+                entry["reason"] += ", verkleind voor het weekbudget"
+                left -= low
+            else:
+                entry["run"] = False
+                entry["reason"] += ", uitgesteld: weekbudget op"
+        return entries
+
+
+def planned_prompts(plan: list[dict], topic: str) -> list[dict]:
+    """De prompts van een onderwerp die deze run draaien, met hun instellingen."""
+    return [
+        {
+            **entry["prompt"],
+            "max_uses": entry["max_uses"],
+            "max_tokens": entry["max_tokens"],
+        }
+        for entry in plan
+        if entry["topic"] == topic and entry["run"]
+    ]
+
+
+def format_plan(plan: list[dict], budget_left: float | None = None) -> str:
+    """De planning als tabel, voor de log en `python main.py plan`."""
+    header = (
+        f"{'prompt':<28} {'actie':<9} {'niveau':<8} {'searches':>8} "
+        f"{'tokens':>6} {'kosten':>7}  reden"
+    )
+    lines = [header, "-" * len(header)]
+    for entry in plan:
+        name = stats_key(entry["topic"], entry["prompt"]["id"])
+        lines.append(
+            f"{name:<28} {'zoeken' if entry['run'] else 'overslaan':<9} "
+            f"{entry['tier']:<8} {entry['max_uses']:>8} {entry['max_tokens']:>6} "
+            f"{entry['cost']:>7.3f}  {entry['reason']}"
+        )
+    planned = [entry for entry in plan if entry["run"]]
+    total = sum(entry["cost"] for entry in planned)
+    summary = f"{len(planned)}/{len(plan)} prompts, geschat ${total:.2f}"
+    if budget_left is not None:
+        summary += f" van ${budget_left:.2f} weekbudget over"
+    lines.append(summary)
+    return "\n".join(lines)
+
+
+def create_scheduler(config: dict, path: str) -> Scheduler | None:
+    """
+    Maak de scheduler uit de `scheduler` sectie van config.yaml (of None).
+
+    Staat standaard uit: zonder `enabled: true` draaien alle prompts zoals
+    in search_prompts.yaml.
+    """
+    if not config.get("enabled", False):
+        return None
+    return Scheduler(
+        PromptStats(path, smoothing=config.get("smoothing", 0.3)),
+        weekly_budget=config.get("weekly_budget_usd"),
+        explore_runs=config.get("explore_runs", 3),
+        low_yield=config.get("low_yield", 0.5),
+        high_yield=config.get("high_yield", 3.0),
+        low_yield_interval_days=config.get("low_yield_interval_days", 28),
+        default_cost=config.get("default_prompt_cost", 0.10),
+        tiers=config.get("tiers"),
+    )
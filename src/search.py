@@ -4,8 +4,16 @@ Zoekmodule — stuurt prompts naar Claude met web search.
 
 import time
 import logging
+from collections.abc import Callable
+from concurrent.futures import ThreadPoolExecutor
+
 import anthropic
 
+from src import metrics
+from src.cache import ResponseCache
+from src.rate_limiter import RateLimiter, create_message, usage_summary
+from src.retry import RetryPolicy
+
 logger = logging.getLogger(__name__)
 
 
@@ -30,9 +38,96 @@ def extract_sources(content_blocks: list) -> dict[str, str]:
     return sources
 
 
-def create_client(api_key: str) -> anthropic.Anthropic:
-    """Maak een Anthropic API client aan."""
-    return anthropic.Anthropic(api_key=api_key)
+def build_search_request(
+    model: str,
+    base_instruction: str,
+    output_format: str,
+    prompt: dict,
+) -> dict:
+    """
+    Bouw de parameters voor messages.create voor één zoekprompt.
+
+    base_instruction en output_format zijn voor alle prompts gelijk en staan
+    daarom als gecachet systeemblok vooraan; alleen de query verschilt. Een
+    prompt kan max_tokens en max_uses (web searches) zelf meegeven; de
+    scheduler (src/scheduler.py) doet dat per prompt.
+    """
+    return {
+        "model": model,
+        "max_tokens": prompt.get("max_tokens", 4096),
+        "system": [{
+            "type": "text",
+            "text": f"{base_instruction}\n\n{output_format}",
+            "cache_control": {"type": "ephemeral"},
+        }],
+        "messages": [{"role": "user", "content": prompt["query"]}],
+        "tools": [{
+            "type": "web_search_20250305",
+            "name": "web_search",
+            "max_uses": prompt.get("max_uses", 5),
+        }],
+    }
+
+
+def format_search_result(prompt: dict, content_blocks: list, usage=None) -> dict:
+    """
+    Zet de content blocks van een response om naar een zoekresultaat.
+
+    Voegt de geverifieerde bronnen uit extract_sources toe onder
+    "GEVERIFIEERDE BRONNEN" en bewaart ze ook als dict onder "sources".
+    """
+    text_parts = [
+        block.text for block in content_blocks
+        if hasattr(block, "text")
+    ]
+    sources = extract_sources(content_blocks)
+    text = "\n".join(text_parts) if text_parts else "GEEN RESULTATEN"
+    if sources:
+        source_lines = [f"- [{t}]({u})" for u, t in sources.items()]
+        text += "\n\nGEVERIFIEERDE BRONNEN:\n" + "\n".join(source_lines)
+    logger.info(
+        f"Prompt '{prompt['id']}' afgerond, {len(text)} tekens"
+        + (f", {usage_summary(usage)}" if usage is not None else "")
+    )
+    return {
+        "id": prompt["id"],
+        "name": prompt["name"],
+        "raw_output": text,
+        "sources": sources,
+    }
+
+
+def _cached_result(
+    cache: ResponseCache | None, key: str | None, prompt: dict
+) -> dict | None:
+    """Zoekresultaat uit de cache, of None."""
+    if cache is None:
+        return None
+    cached = cache.get(key)
+    if cached is None:
+        return None
+    logger.info(f"Prompt '{prompt['id']}' uit cache")
+    return {"id": prompt["id"], "name": prompt["name"], **cached}
+
+
+def _store_result(
+    cache: ResponseCache | None, key: str | None, result: dict
+) -> None:
+    if cache is not None:
+        cache.set(key, {
+            "raw_output": result["raw_output"],
+            "sources": result["sources"],
+        })
+
+
+def error_result(prompt: dict, error) -> dict:
+    """Zoekresultaat voor een prompt die mislukt is."""
+    return {
+        "id": prompt["id"],
+        "name": prompt["name"],
+        "raw_output": f"FOUT: {error}",
+        "sources": {},
+    }
 
 
 def search_single_prompt(
@@ -41,91 +136,326 @@ def search_single_prompt(
     base_instruction: str,
     output_format: str,
     prompt: dict,
-    max_retries: int = 3,
-    initial_delay: int = 5,
-    backoff_multiplier: int = 2,
+    limiter: RateLimiter | None = None,
+    cache: ResponseCache | None = None,
+    retry: RetryPolicy | None = None,
+    topic: str = "",
 ) -> dict:
     """
     Voer één zoekprompt uit via Claude met web search.
-    Retry met exponential backoff bij rate limits.
+    Tijdelijke fouten (rate limits, overbelasting, timeouts) worden opnieuw
+    geprobeerd volgens het retrybeleid. Met een cache wordt een eerder
+    resultaat voor exact hetzelfde request hergebruikt. Het metrics-record
+    krijgt het onderwerp mee, zodat de scheduler de kosten per onderwerp en
+    prompt kan toewijzen.
 
-    Returns een dict met prompt-id, naam en ruwe output.
+    Returns een dict met prompt-id, naam, ruwe output en bronnen.
     """
-    full_prompt = f"""{base_instruction}
+    request = build_search_request(model, base_instruction, output_format, prompt)
+    key = ResponseCache.key(request) if cache is not None else None
+    cached = _cached_result(cache, key, prompt)
+    if cached is not None:
+        return cached
 
-{output_format}
-
-{prompt['query']}"""
-
-    for attempt in range(max_retries + 1):
+    retry = retry or RetryPolicy()
+    with metrics.track("search", prompt["id"]) as record:
+        record["topic"] = topic
         try:
-            response = client.messages.create(
-                model=model,
-                max_tokens=4096,
-                messages=[{"role": "user", "content": full_prompt}],
-                tools=[{
-                    "type": "web_search_20250305",
-                    "name": "web_search",
-                    "max_uses": 5,
-                }],
+            response = retry.call(
+                lambda: create_message(client, limiter, **request), prompt["id"]
             )
-            text_parts = [
-                block.text for block in response.content
-                if hasattr(block, "text")
-            ]
-            sources = extract_sources(response.content)
-            text = "\n".join(text_parts) if text_parts else "GEEN RESULTATEN"
-            if sources:
-                source_lines = [f"- [{t}]({u})" for u, t in sources.items()]
-                text += "\n\nGEVERIFIEERDE BRONNEN:\n" + "\n".join(source_lines)
-            logger.info(f"Prompt '{prompt['id']}' afgerond, {len(text)} tekens")
-            return {
-                "id": prompt["id"],
-                "name": prompt["name"],
-                "raw_output": text,
-            }
         except Exception as e:
-            is_rate_limit = "429" in str(e) or "rate" in str(e).lower()
-            if is_rate_limit and attempt < max_retries:
-                wait = initial_delay * (backoff_multiplier ** attempt)
-                logger.warning(
-                    f"Rate limit bij '{prompt['id']}', "
-                    f"retry {attempt + 1}/{max_retries} na {wait}s"
-                )
-                time.sleep(wait)
-                continue
             logger.error(f"Fout bij prompt '{prompt['id']}': {e}")
-            return {
-                "id": prompt["id"],
-                "name": prompt["name"],
-                "raw_output": f"FOUT: {e}",
-            }
+            record["error"] = str(e)
+            return error_result(prompt, e)
+        result = format_search_result(prompt, response.content, response.usage)
+        record["bytes_returned"] = len(result["raw_output"].encode("utf-8"))
+    _store_result(cache, key, result)
+    return result
 
 
-def run_all_searches(
+def run_batch_searches(
     client: anthropic.Anthropic,
     model: str,
     base_instruction: str,
     output_format: str,
     prompts: list[dict],
-    delay: int = 5,
+    poll_interval: float = 60,
+    max_wait: float = 24 * 60 * 60,
+    cache: ResponseCache | None = None,
+    retry: RetryPolicy | None = None,
 ) -> list[dict]:
     """
-    Voer alle zoekprompts uit met een pauze ertussen.
+    Voer alle zoekprompts uit als één Message Batch.
+
+    Batches kosten de helft per token maar kunnen tot 24 uur duren; voor
+    de wekelijkse cronjob is dat geen probleem. Zie run_topic_batch_searches.
 
-    Returns een lijst van resultaten per prompt.
+    Returns een lijst van resultaten per prompt, in de volgorde van prompts.
     """
-    results = []
-    total = len(prompts)
+    topic = {
+        "base_instruction": base_instruction,
+        "output_format": output_format,
+        "prompts": prompts,
+    }
+    results = run_topic_batch_searches(
+        client, model, {"": topic},
+        poll_interval=poll_interval,
+        max_wait=max_wait,
+        cache=cache,
+        retry=retry,
+    )
+    return results[""]
 
-    for i, prompt in enumerate(prompts, 1):
-        logger.info(f"[{i}/{total}] Zoeken: {prompt['name']}")
+
+def batch_custom_id(topic: str, prompt_id: str) -> str:
+    """custom_id van een prompt in een batch met meerdere onderwerpen."""
+    return f"{topic}--{prompt_id}" if topic else prompt_id
+
+
+def run_topic_batch_searches(
+    client: anthropic.Anthropic,
+    model: str,
+    topics: dict[str, dict],
+    poll_interval: float = 60,
+    max_wait: float = 24 * 60 * 60,
+    cache: ResponseCache | None = None,
+    retry: RetryPolicy | None = None,
+) -> dict[str, list[dict]]:
+    """
+    Voer de zoekprompts van alle onderwerpen uit als één Message Batch.
+
+    topics is {naam: {"base_instruction", "output_format", "prompts"}}, zoals
+    bij run_topic_searches. De custom_id krijgt de onderwerpnaam als prefix,
+    zodat alle onderwerpen in dezelfde batch tegelijk lopen en de resultaten
+    daarna weer per onderwerp uiteengaan. Pollt tot de batch klaar is.
+    Prompts die al in de cache staan gaan niet mee in de batch. Aanmaken,
+    pollen en ophalen volgen het retrybeleid.
+
+    Returns {naam: resultaten in de volgorde van de prompts van dat onderwerp}.
+    """
+    jobs = {}
+    params = {}
+    keys = {}
+    done = {}
+    for name, topic in topics.items():
+        for prompt in topic["prompts"]:
+            custom_id = batch_custom_id(name, prompt["id"])
+            jobs[custom_id] = (name, prompt)
+            request = build_search_request(
+                model, topic["base_instruction"], topic["output_format"], prompt
+            )
+            if cache is not None:
+                keys[custom_id] = ResponseCache.key(request)
+            cached = _cached_result(cache, keys.get(custom_id), prompt)
+            if cached is not None:
+                done[custom_id] = cached
+            else:
+                params[custom_id] = request
+
+    def _by_topic(results: dict[str, dict]) -> dict[str, list[dict]]:
+        grouped: dict[str, list[dict]] = {name: [] for name in topics}
+        for custom_id, (name, _) in jobs.items():
+            grouped[name].append(results[custom_id])
+        return grouped
+
+    if not params:
+        return _by_topic(done)
+
+    requests = [
+        {"custom_id": custom_id, "params": request}
+        for custom_id, request in params.items()
+    ]
+
+    retry = retry or RetryPolicy()
+    with metrics.track("search", "batch") as record:
+        # Tokens en searches per prompt (custom_id), voor de scheduler
+        record["prompts"] = {}
+        try:
+            batch = retry.call(
+                lambda: client.messages.batches.create(requests=requests), "batch"
+            )
+            logger.info(
+                f"Batch {batch.id} aangemaakt met {len(requests)} prompts "
+                f"over {len(topics)} onderwerp(en)"
+            )
+
+            waited = 0.0
+            while batch.processing_status != "ended":
+                if waited >= max_wait:
+                    raise TimeoutError(
+                        f"batch {batch.id} niet klaar na {waited:.0f}s"
+                    )
+                time.sleep(poll_interval)
+                waited += poll_interval
+                batch_id = batch.id
+                batch = retry.call(
+                    lambda: client.messages.batches.retrieve(batch_id), batch_id
+                )
+                logger.info(f"Batch {batch.id}: {batch.processing_status}")
+
+            entries = retry.call(
+                lambda: {
+                    entry.custom_id: entry.result
+                    for entry in client.messages.batches.results(batch.id)
+                },
+                batch.id,
+            )
+        except Exception as e:
+            logger.error(f"Fout bij batch: {e}")
+            record["error"] = str(e)
+            return _by_topic({
+                custom_id: done.get(custom_id) or error_result(prompt, e)
+                for custom_id, (_, prompt) in jobs.items()
+            })
+
+        results = {}
+        for custom_id, (name, prompt) in jobs.items():
+            result = entries.get(custom_id)
+            if custom_id in done:
+                results[custom_id] = done[custom_id]
+            elif result is None:
+                logger.error(f"Geen batchresultaat voor prompt '{custom_id}'")
+                results[custom_id] = error_result(prompt, "geen resultaat in batch")
+            elif result.type == "succeeded":
+                message = result.message
+                formatted = format_search_result(prompt, message.content, message.usage)
+                metrics.add_usage(message.usage)
+                record["prompts"][custom_id] = {
+                    "topic": name, "id": prompt["id"],
+                    **metrics.usage_counts(message.usage),
+                }
+                raw_bytes = formatted["raw_output"].encode("utf-8")
+                record["bytes_returned"] += len(raw_bytes)
+                _store_result(cache, keys.get(custom_id), formatted)
+                results[custom_id] = formatted
+            else:
+                error = getattr(result, "error", None) or result.type
+                logger.error(f"Fout bij prompt '{custom_id}': {error}")
+                results[custom_id] = error_result(prompt, error)
+    return _by_topic(results)
+
+
+def interleave(prompt_sets: dict[str, list[dict]]) -> list[tuple[str, dict]]:
+    """
+    Zet de prompts van meerdere onderwerpen om en om in één wachtrij.
+
+    Zo krijgt elk onderwerp vanaf het begin een deel van de workers en de
+    rate-limit ruimte, in plaats van dat één onderwerp alles opeist.
+    """
+    queues = [[(topic, prompt) for prompt in prompts]
+              for topic, prompts in prompt_sets.items()]
+    jobs = []
+    for i in range(max((len(queue) for queue in queues), default=0)):
+        jobs.extend(queue[i] for queue in queues if i < len(queue))
+    return jobs
+
+
+def run_topic_searches(
+    client: anthropic.Anthropic,
+    model: str,
+    topics: dict[str, dict],
+    delay: int = 5,
+    max_workers: int = 1,
+    limiter: RateLimiter | None = None,
+    cache: ResponseCache | None = None,
+    on_result: Callable[[str, dict], None] | None = None,
+    retry: RetryPolicy | None = None,
+) -> dict[str, list[dict]]:
+    """
+    Voer de zoekprompts van meerdere onderwerpen uit via één scheduler.
+
+    topics is {naam: {"base_instruction", "output_format", "prompts"}}. De
+    prompts van alle onderwerpen worden om en om ingepland en delen één
+    client (dus één connection pool), één limiter en één retrybeleid.
+    on_result(onderwerp, resultaat) wordt aangeroepen zodra een prompt klaar
+    is; parallel gebeurt dat vanuit de worker-thread.
+
+    Returns {naam: resultaten in de volgorde van de prompts van dat onderwerp}.
+    """
+    jobs = interleave({name: topic["prompts"] for name, topic in topics.items()})
+    total = len(jobs)
+    retry = retry or RetryPolicy()
+
+    def _run(i: int, name: str, prompt: dict) -> dict:
+        topic = topics[name]
+        prefix = f"{name}: " if name else ""
+        logger.info(f"[{i}/{total}] Zoeken: {prefix}{prompt['name']}")
         result = search_single_prompt(
-            client, model, base_instruction, output_format, prompt
+            client, model, topic["base_instruction"], topic["output_format"],
+            prompt, limiter=limiter, cache=cache, retry=retry, topic=name,
         )
-        results.append(result)
+        if on_result is not None:
+            on_result(name, result)
+        return result
+
+    results: dict[str, list[dict]] = {name: [] for name in topics}
+    if max_workers <= 1 or total <= 1:
+        for i, (name, prompt) in enumerate(jobs, 1):
+            results[name].append(_run(i, name, prompt))
+            if i < total and limiter is None:
+                time.sleep(delay)
+        return results
 
-        if i < total:
-            time.sleep(delay)
+    workers = min(max_workers, total)
+    logger.info(
+        f"Zoekfase parallel: {total} prompts over {len(topics)} "
+        f"onderwerp(en), {workers} tegelijk"
+    )
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        futures = [
+            pool.submit(_run, i, name, prompt)
+            for i, (name, prompt) in enumerate(jobs, 1)
+        ]
 
+    for (name, prompt), future in zip(jobs, futures):
+        try:
+            results[name].append(future.result())
+        except Exception as e:
+            # search_single_prompt vangt zelf fouten af; dit is een vangnet
+            logger.error(f"Fout bij prompt '{prompt['id']}': {e}")
+            results[name].append(error_result(prompt, e))
     return results
+
+
+def run_all_searches(
+    client: anthropic.Anthropic,
+    model: str,
+    base_instruction: str,
+    output_format: str,
+    prompts: list[dict],
+    delay: int = 5,
+    max_workers: int = 1,
+    limiter: RateLimiter | None = None,
+    cache: ResponseCache | None = None,
+    on_result: Callable[[dict], None] | None = None,
+    retry: RetryPolicy | None = None,
+) -> list[dict]:
+    """
+    Voer alle zoekprompts uit.
+
+    Met max_workers=1 draaien de prompts na elkaar met een pauze ertussen.
+    Bij max_workers > 1 draaien maximaal zoveel prompts tegelijk in een
+    thread pool; de pauze vervalt dan, de pool begrenst de belasting.
+    Met een limiter vervalt de vaste pauze ook: de limiter bepaalt het tempo.
+    on_result wordt aangeroepen zodra een prompt klaar is (bijv. om het
+    resultaat meteen op schijf te zetten); parallel gebeurt dat vanuit de
+    worker-thread. Alle prompts delen hetzelfde retrybeleid (en budget).
+
+    Returns een lijst van resultaten per prompt, in de volgorde van prompts.
+    """
+    topic = {
+        "base_instruction": base_instruction,
+        "output_format": output_format,
+        "prompts": prompts,
+    }
+    results = run_topic_searches(
+        client, model, {"": topic},
+        delay=delay,
+        max_workers=max_workers,
+        limiter=limiter,
+        cache=cache,
+        on_result=(lambda _, result: on_result(result)) if on_result else None,
+        retry=retry,
+    )
+    return results[""]
@@ -6,12 +6,30 @@ Nieuwe bronnen worden automatisch toegevoegd.
 """
 
 import logging
+import os
+from collections.abc import Iterable
+from datetime import date
+from pathlib import Path
 from urllib.parse import urlparse
 
 import yaml
 
 logger = logging.getLogger(__name__)
 
+# Zoveel recente runs onthoudt learn() om een run niet dubbel te leren
+LEARNED_RUNS = 100
+
+# Notitie bij bronnen die niet met de hand zijn toegevoegd
+AUTO_ADDED = "Automatisch toegevoegd"
+
+# Maximaal aantal bronnen in de analyseprompt
+PROMPT_SOURCES = 50
+
+# Tellingen die learn() bijhoudt; die staan met de geleerde bonus op het
+# gewicht in het geleerde bestand in de state-map, niet in de (handmatig
+# bijgehouden) bronnenlijst
+LEARNED_FIELDS = ("seen_count", "cited_count", "last_seen")
+
 
 def load_source_weights(path: str) -> dict:
     """Laad de bronnenlijst uit een YAML-bestand."""
@@ -20,9 +38,12 @@ def load_source_weights(path: str) -> dict:
 
 
 def save_source_weights(path: str, data: dict) -> None:
-    """Sla de bronnenlijst op naar een YAML-bestand."""
-    with open(path, "w") as f:
+    """Sla de bronnenlijst atomair op naar een YAML-bestand."""
+    target = Path(path)
+    tmp = target.with_name(f"{target.name}.tmp")
+    with open(tmp, "w") as f:
         yaml.dump(data, f, default_flow_style=False, allow_unicode=True)
+    os.replace(tmp, target)
     logger.info(f"Bronnenlijst opgeslagen: {path}")
 
 
@@ -72,7 +93,7 @@ def update_source_weight(source_data: dict, domain: str, implemented: bool) -> d
             "domain": domain,
             "weight": default_weight + (1 if implemented else 0),
             "implemented_count": 1 if implemented else 0,
-            "notes": "Automatisch toegevoegd",
+            "notes": AUTO_ADDED,
         }
         source_data.setdefault("sources", []).append(new_source)
         logger.info(f"Nieuwe bron '{domain}' toegevoegd")
@@ -80,16 +101,327 @@ def update_source_weight(source_data: dict, domain: str, implemented: bool) -> d
     return source_data
 
 
-def get_source_weights_text(source_data: dict) -> str:
-    """Genereer een leesbare tekst van de bronnenlijst voor de analyseprompt."""
+def get_source_weights_text(source_data: dict, limit: int = PROMPT_SOURCES) -> str:
+    """
+    Genereer een leesbare tekst van de bronnenlijst voor de analyseprompt.
+
+    Automatisch toegevoegde bronnen op het standaardgewicht zeggen de
+    analyse niets en blijven weg, net als alles boven de `limit` zwaarste
+    bronnen. Gewichten worden afgerond, zodat de tekst (een gecachet
+    promptblok) niet na elke decay verandert.
+    """
+    default = round(source_data.get("default_weight", 5))
+    sources = [
+        source for source in source_data.get("sources", [])
+        if source.get("pinned")
+        or source.get("notes") != AUTO_ADDED
+        or round(source.get("weight", default)) != default
+    ]
+    sources.sort(key=lambda s: (-round(s.get("weight", 0)), s["domain"]))
     lines = ["Gewogen bronnen (hoger = waardevoller):"]
-    for source in sorted(
-        source_data.get("sources", []),
-        key=lambda s: s.get("weight", 0),
-        reverse=True,
-    ):
+    for source in sources[:limit]:
         lines.append(
-            f"- {source['domain']}: gewicht {source.get('weight', 5)}, "
+            f"- {source['domain']}: gewicht {round(source.get('weight', 5))}, "
             f"{source.get('implemented_count', 0)}x geïmplementeerd"
         )
     return "\n".join(lines)
+
+
+class SourceWeights:
+    """
+    Bronnenlijst met een index op domein.
+
+    Lookups en updates zijn O(1) per domein in plaats van een lineaire scan
+    over source_data["sources"]. Wijzigingen worden in het geheugen verzameld
+    en in één keer (atomair) weggeschreven met save().
+
+    learn() is de leerstap na een run: alle geverifieerde bronnen tellen als
+    gezien, bronnen die het rapport citeert krijgen een hoger gewicht, en
+    decay() trekt het geleerde deel geleidelijk terug. Wat geleerd is wordt
+    apart bewaard (save_learned): per bron de tellingen en een bonus ten
+    opzichte van het gewicht in de bronnenlijst, zodat een handmatig
+    aangepast gewicht bij het laden gewoon meetelt.
+    """
+
+    def __init__(
+        self,
+        sources: list[dict] | None = None,
+        default_weight: int = 5,
+        last_decay: str | None = None,
+        learned_runs: list[str] | None = None,
+    ):
+        self.default_weight = default_weight
+        self.last_decay = last_decay
+        self.learned_runs = list(learned_runs or [])
+        self._by_domain: dict[str, dict] = {}
+        # Gewichten uit de bronnenlijst; learn() en decay() werken daarop
+        self._reference: dict[str, float] = {}
+        for source in sources or []:
+            self._by_domain[source["domain"]] = source
+            self._reference[source["domain"]] = source.get("weight", default_weight)
+        self.dirty = False
+
+    @classmethod
+    def from_dict(cls, data: dict | None) -> "SourceWeights":
+        """Maak een SourceWeights uit het YAML-formaat van source_weights.yaml."""
+        data = data or {}
+        return cls(
+            data.get("sources", []),
+            data.get("default_weight", 5),
+            data.get("last_decay"),
+            data.get("learned_runs"),
+        )
+
+    def to_dict(self) -> dict:
+        """Exporteer naar het YAML-formaat van source_weights.yaml."""
+        data = {
+            "sources": list(self._by_domain.values()),
+            "default_weight": self.default_weight,
+        }
+        if self.last_decay:
+            data["last_decay"] = self.last_decay
+        if self.learned_runs:
+            data["learned_runs"] = self.learned_runs
+        return data
+
+    @classmethod
+    def load(cls, path: str, learned_path: str | None = None) -> "SourceWeights":
+        """Laad de bronnenlijst, met het geleerde bestand (als dat er is) erover."""
+        weights = cls.from_dict(load_source_weights(path))
+        if learned_path and Path(learned_path).exists():
+            weights.merge_learned(load_source_weights(learned_path))
+        return weights
+
+    def save(self, path: str) -> None:
+        """Schrijf de bronnenlijst in één keer atomair weg."""
+        save_source_weights(path, self.to_dict())
+        self.dirty = False
+
+    def base_weight(self, domain: str) -> float:
+        """Het gewicht uit de bronnenlijst, of default_weight voor nieuwe bronnen."""
+        return self._reference.get(domain, self.default_weight)
+
+    def merge_learned(self, data: dict | None) -> None:
+        """
+        Leg geleerde bonussen en tellingen over de bronnenlijst.
+
+        De bonus komt bovenop het huidige gewicht uit de bronnenlijst (max
+        10). Onbekende domeinen worden toegevoegd; bij bronnen met
+        `pinned: true` telt de bonus niet.
+        """
+        data = data or {}
+        self.last_decay = data.get("last_decay", self.last_decay)
+        self.learned_runs = list(data.get("learned_runs") or self.learned_runs)
+        for entry in data.get("sources", []):
+            domain = entry["domain"]
+            source = self._by_domain.get(domain)
+            if source is None:
+                source = self._by_domain[domain] = {
+                    "domain": domain,
+                    "weight": self.default_weight,
+                    "implemented_count": 0,
+                    "notes": AUTO_ADDED,
+                }
+            for field in LEARNED_FIELDS:
+                if field in entry:
+                    source[field] = entry[field]
+            bonus = entry.get("bonus", 0)
+            if "weight" in entry and domain not in self._reference:
+                # Oud formaat met absolute gewichten; alleen voor nieuwe bronnen
+                bonus = entry["weight"] - self.default_weight
+            if bonus and not source.get("pinned"):
+                weight = self.base_weight(domain) + bonus
+                source["weight"] = round(min(10, max(0, weight)), 2)
+
+    def learned_dict(self) -> dict:
+        """Het geleerde deel: bonussen, tellingen, last_decay en learned_runs."""
+        sources = []
+        for domain, source in self._by_domain.items():
+            entry = {"domain": domain}
+            bonus = round(
+                source.get("weight", self.default_weight) - self.base_weight(domain), 2
+            )
+            if bonus and not source.get("pinned"):
+                entry["bonus"] = bonus
+            entry.update({f: source[f] for f in LEARNED_FIELDS if f in source})
+            sources.append(entry)
+        return {
+            "sources": sources,
+            "last_decay": self.last_decay,
+            "learned_runs": self.learned_runs,
+        }
+
+    def save_learned(self, path: str) -> None:
+        """Schrijf het geleerde deel atomair weg (zie learned_dict)."""
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        save_source_weights(path, self.learned_dict())
+        self.dirty = False
+
+    def __len__(self) -> int:
+        return len(self._by_domain)
+
+    def __contains__(self, domain: str) -> bool:
+        return domain in self._by_domain
+
+    def get(self, domain: str) -> dict | None:
+        """De volledige entry van een domein, of None."""
+        return self._by_domain.get(domain)
+
+    def get_weight(self, domain: str) -> float:
+        """Het gewicht van een domein, of de standaardwaarde."""
+        source = self._by_domain.get(domain)
+        if source is None:
+            return self.default_weight
+        return source.get("weight", self.default_weight)
+
+    def get_weights(self, domains) -> dict[str, float]:
+        """Gewichten voor een reeks domeinen in één keer."""
+        return {domain: self.get_weight(domain) for domain in domains}
+
+    def update(self, domain: str, implemented: bool) -> None:
+        """
+        Werk het gewicht van één bron bij, zoals update_source_weight.
+
+        Implementatie verhoogt het gewicht (max 10); onbekende bronnen
+        worden toegevoegd.
+        """
+        source = self._by_domain.get(domain)
+        if source is None:
+            self._by_domain[domain] = {
+                "domain": domain,
+                "weight": self.default_weight + (1 if implemented else 0),
+                "implemented_count": 1 if implemented else 0,
+                "notes": AUTO_ADDED,
+            }
+            self.dirty = True
+            logger.info(f"Nieuwe bron '{domain}' toegevoegd")
+        elif implemented:
+            source["implemented_count"] = source.get("implemented_count", 0) + 1
+            source["weight"] = min(10, source.get("weight", 5) + 1)
+            self.dirty = True
+            logger.info(f"Bron '{domain}' verhoogd naar gewicht {source['weight']}")
+
+    def update_many(self, updates) -> None:
+        """Werk meerdere bronnen bij: een iterable van (domein, implemented)."""
+        for domain, implemented in updates:
+            self.update(domain, implemented)
+
+    def decay(self, today: date, half_life_days: float = 91) -> int:
+        """
+        Trek geleerde gewichten geleidelijk terug (anti-echokamer).
+
+        In plaats van een reset per kwartaal halveert de afstand tot het
+        gewicht uit de bronnenlijst (default_weight voor nieuwe bronnen) elke
+        half_life_days, naar rato van de tijd sinds de vorige decay. Alleen
+        het geleerde deel zakt dus terug; bronnen met `pinned: true` blijven
+        staan.
+
+        Returns het aantal gewijzigde bronnen.
+        """
+        previous = date.fromisoformat(self.last_decay) if self.last_decay else today
+        self.last_decay = today.isoformat()
+        self.dirty = True
+        days = (today - previous).days
+        if days <= 0:
+            return 0
+        factor = 0.5 ** (days / half_life_days)
+        changed = 0
+        for domain, source in self._by_domain.items():
+            weight = source.get("weight", self.default_weight)
+            base = self.base_weight(domain)
+            if source.get("pinned") or weight == base:
+                continue
+            new = base + (weight - base) * factor
+            new = round(new, 2)
+            if new != weight:
+                source["weight"] = new
+                changed += 1
+        return changed
+
+    def prune(self, today: date, max_age_days: float = 91) -> int:
+        """
+        Verwijder automatisch toegevoegde bronnen die niets opleverden.
+
+        Een bron gaat eruit als hij nooit geciteerd of geïmplementeerd is,
+        niet gepind is, op het standaardgewicht staat en al max_age_days
+        niet meer gezien is. Zo groeit de lijst niet met elk domein dat
+        ooit één keer voorbijkwam.
+
+        Returns het aantal verwijderde bronnen.
+        """
+        stale = [
+            domain
+            for domain, source in self._by_domain.items()
+            if source.get("notes") == AUTO_ADDED
+            and not source.get("pinned")
+            and not source.get("cited_count")
+            and not source.get("implemented_count")
+            and round(source.get("weight", self.default_weight), 1)
+            == self.default_weight
+            and "last_seen" in source
+            and (today - date.fromisoformat(source["last_seen"])).days > max_age_days
+        ]
+        for domain in stale:
+            del self._by_domain[domain]
+        if stale:
+            self.dirty = True
+        return len(stale)
+
+    def learn(
+        self,
+        seen: Iterable[str],
+        cited: Iterable[str],
+        today: date,
+        cite_step: float = 0.5,
+        half_life_days: float = 91,
+        run_id: str | None = None,
+    ) -> bool:
+        """
+        Leerstap na een run, als één batch in het geheugen.
+
+        Eerst decay() en prune(); daarna krijgt elk gezien domein
+        seen_count + 1 en last_seen (onbekende domeinen worden toegevoegd), en
+        elk geciteerd domein cited_count + 1 en cite_step extra gewicht
+        (max 10). Met run_id
+        (bij onderwerpen run-id/onderwerp) wordt dezelfde run maar één keer
+        geleerd, ook bij een hervatting.
+
+        Returns False als deze run al geleerd was.
+        """
+        if run_id is not None and run_id in self.learned_runs:
+            return False
+        decayed = self.decay(today, half_life_days)
+        pruned = self.prune(today, half_life_days)
+        cited = set(cited)
+        seen = set(seen) | cited
+        added = 0
+        for domain in seen:
+            source = self._by_domain.get(domain)
+            if source is None:
+                source = self._by_domain[domain] = {
+                    "domain": domain,
+                    "weight": self.default_weight,
+                    "implemented_count": 0,
+                    "notes": AUTO_ADDED,
+                }
+                added += 1
+            source["seen_count"] = source.get("seen_count", 0) + 1
+            source["last_seen"] = today.isoformat()
+            if domain in cited:
+                source["cited_count"] = source.get("cited_count", 0) + 1
+                weight = source.get("weight", self.default_weight)
+                source["weight"] = round(min(10, weight + cite_step), 2)
+        if run_id is not None:
+            # Onderwerpen kunnen één bestand delen, dus niet alleen de laatste
+            self.learned_runs = [*self.learned_runs, run_id][-LEARNED_RUNS:]
+        self.dirty = True
+        logger.info(
+            f"Bronnen geleerd: {len(seen)} gezien ({added} nieuw), "
+            f"{len(cited)} geciteerd, {decayed} gewichten afgezwakt, "
+            f"{pruned} ongebruikte bronnen verwijderd"
+        )
+        return True
+
+    def text(self) -> str:
+        """Leesbare tekst voor de analyseprompt (zie get_source_weights_text)."""
+        return get_source_weights_text(self.to_dict())
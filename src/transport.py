@@ -0,0 +1,163 @@
+"""
+Transport — één gedeelde HTTP-connection pool voor Claude en Resend.
+
+Eén httpx2-client (de HTTP-laag van de Anthropic SDK) met keep-alive en
+HTTP/2 (via de extra httpx2[http2], die h2 installeert). De parallelle zoekfase, de
+analyse en de Resend-calls hergebruiken zo warme TLS-verbindingen in plaats
+van elk een eigen verbinding op te zetten. Elke stap heeft een eigen
+read-time-out, met daarnaast vaste connect-, write- en pool-time-outs, zodat
+een hangende web-search-call de cronjob nooit eindeloos laat wachten.
+"""
+
+import importlib.util
+import logging
+from collections.abc import Mapping
+
+import httpx2
+import resend
+
+logger = logging.getLogger(__name__)
+
+HTTP2_AVAILABLE = importlib.util.find_spec("h2") is not None
+
+# Read-time-out per stap in seconden. Een zoekcall met web search stuurt
+# niets tot het antwoord klaar is; bij streamen geldt de time-out per chunk.
+DEFAULT_TIMEOUTS = {
+    "search": 300,
+    "analyze": 600,
+    "batch": 60,
+    "email": 30,
+}
+
+
+class ResendHTTPClient(resend.HTTPClient):
+    """Resend-calls over de gedeelde pool (vervangt de requests-client)."""
+
+    def __init__(self, client: httpx2.Client, timeout: httpx2.Timeout):
+        self._client = client
+        self._timeout = timeout
+
+    def request(
+        self,
+        method: str,
+        url: str,
+        headers: Mapping[str, str],
+        json: dict | list | None = None,
+        files: dict | None = None,
+        data: dict | None = None,
+    ) -> tuple[bytes, int, Mapping[str, str]]:
+        if files is None and data is None:
+            body = {"json": json}
+        else:
+            body = {"files": files, "data": data}
+        try:
+            response = self._client.request(
+                method, url, headers=headers, timeout=self._timeout, **body
+            )
+        except httpx2.HTTPError as e:
+            # Resend maakt hier een ResendError van, net als bij zijn eigen clients
+            raise RuntimeError(f"Request failed: {e}") from e
+        return response.content, response.status_code, response.headers
+
+
+class Transport:
+    """
+    Eigenaar van de gedeelde pool; geeft clients per stap.
+
+    anthropic(stage) geeft een Anthropic-client met de time-out van die stap,
+    allemaal op dezelfde pool. install_resend() laat de Resend SDK dezelfde
+    pool gebruiken tot close().
+    """
+
+    def __init__(
+        self,
+        api_key: str | None = None,
+        timeouts: dict[str, float] | None = None,
+        connect_timeout: float = 10,
+        pool_timeout: float = 30,
+        max_connections: int = 20,
+        keepalive_connections: int = 10,
+        keepalive_expiry: float = 30,
+        http2: bool = True,
+    ):
+        self.api_key = api_key
+        self.timeouts = {**DEFAULT_TIMEOUTS, **(timeouts or {})}
+        self.connect_timeout = connect_timeout
+        self.pool_timeout = pool_timeout
+        if http2 and not HTTP2_AVAILABLE:
+            logger.warning(
+                "http.http2 staat aan maar het pakket h2 ontbreekt "
+                "(pip install 'httpx2[http2]'): verbindingen gaan over HTTP/1.1"
+            )
+        self.http2 = http2 and HTTP2_AVAILABLE
+        self.http = httpx2.Client(
+            http2=self.http2,
+            limits=httpx2.Limits(
+                max_connections=max_connections,
+                max_keepalive_connections=keepalive_connections,
+                keepalive_expiry=keepalive_expiry,
+            ),
+            timeout=self.timeout("analyze"),
+            follow_redirects=True,
+        )
+        self._base = None
+        self._clients = {}
+        self._previous_resend = None
+
+    def timeout(self, stage: str) -> httpx2.Timeout:
+        """Time-outs voor een stap: read uit timeouts, de rest vast."""
+        read = self.timeouts.get(stage, DEFAULT_TIMEOUTS["analyze"])
+        return httpx2.Timeout(
+            read, connect=self.connect_timeout, write=60, pool=self.pool_timeout
+        )
+
+    def anthropic(self, stage: str):
+        """Anthropic-client voor een stap; SDK-retries staan uit (zie src/retry.py)."""
+        if stage not in self._clients:
+            # Pas hier laden: `send` heeft de Anthropic SDK niet nodig
+            import anthropic
+
+            if self._base is None:
+                self._base = anthropic.Anthropic(
+                    api_key=self.api_key, max_retries=0, http_client=self.http
+                )
+            self._clients[stage] = self._base.with_options(
+                timeout=self.timeout(stage)
+            )
+        return self._clients[stage]
+
+    def install_resend(self) -> None:
+        """Laat de Resend SDK via de gedeelde pool versturen."""
+        if self._previous_resend is None:
+            self._previous_resend = resend.default_http_client
+        resend.default_http_client = ResendHTTPClient(
+            self.http, self.timeout("email")
+        )
+
+    def close(self) -> None:
+        """Zet de Resend-client terug en sluit alle verbindingen."""
+        if self._previous_resend is not None:
+            resend.default_http_client = self._previous_resend
+            self._previous_resend = None
+        self.http.close()
+
+    def __enter__(self) -> "Transport":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+
+def create_transport(api_key: str | None, config: dict | None) -> Transport:
+    """Maak de transportlaag uit de `http` sectie van config.yaml."""
+    config = config or {}
+    return Transport(
+        api_key=api_key,
+        timeouts=config.get("timeouts"),
+        connect_timeout=config.get("connect_timeout", 10),
+        pool_timeout=config.get("pool_timeout", 30),
+        max_connections=config.get("max_connections", 20),
+        keepalive_connections=config.get("keepalive_connections", 10),
+        keepalive_expiry=config.get("keepalive_expiry", 30),
+        http2=config.get("http2", True),
+    )
@@ -0,0 +1,121 @@
+"""
+Watermarks — incrementeel zoeken vanaf de laatste geslaagde run.
+
+Per prompt wordt bijgehouden tot welke datum er al gezocht is (de datum van
+de laatste run waarvan het rapport is opgeslagen) en de nieuwste DATUM die
+in de resultaten voorkwam. Elke prompt krijgt een exact datumvenster mee
+vanaf die watermark tot vandaag; een gemiste cronrun laat zo geen gat, en
+een prompt die vandaag al gedaan is wordt overgeslagen.
+"""
+
+import json
+import logging
+import os
+import re
+import threading
+from datetime import date, timedelta
+from pathlib import Path
+
+from src.dedup import article_fields, split_articles
+
+logger = logging.getLogger(__name__)
+
+WINDOW_INSTRUCTION = (
+    "Date window: only include articles published between {since} and {until} "
+    "(inclusive). This replaces any other time frame mentioned above."
+)
+
+ISO_DATE = re.compile(r"\b(\d{4})-(\d{2})-(\d{2})\b")
+
+
+def newest_date(raw_output: str, until: date) -> date | None:
+    """Nieuwste ISO-datum in de DATUM-velden van ruwe zoekoutput (tot until)."""
+    newest = None
+    for block in split_articles(raw_output)[0]:
+        match = ISO_DATE.search(article_fields(block).get("DATUM", ""))
+        if not match:
+            continue
+        try:
+            found = date(*(int(part) for part in match.groups()))
+        except ValueError:
+            continue
+        if found <= until and (newest is None or found > newest):
+            newest = found
+    return newest
+
+
+class Watermarks:
+    """Persistente high-water marks per prompt-id (thread-safe)."""
+
+    def __init__(self, path: str, default_days: int = 7):
+        self.path = Path(path)
+        self.default_days = default_days
+        self.prompts: dict[str, dict] = {}
+        self._lock = threading.Lock()
+        if self.path.exists():
+            data = json.loads(self.path.read_text(encoding="utf-8"))
+            self.prompts = data.get("prompts", {})
+
+    def save(self) -> None:
+        """Sla de watermarks atomair op."""
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.with_name(f"{self.path.name}.tmp")
+        with self._lock:
+            data = json.dumps({"prompts": self.prompts}, indent=2, sort_keys=True)
+        tmp.write_text(data, encoding="utf-8")
+        os.replace(tmp, self.path)
+
+    def window(self, prompt_id: str, today: date) -> tuple[date, date] | None:
+        """
+        Datumvenster (since, until) voor een prompt, of None als het leeg is.
+
+        Zonder watermark is het venster de laatste default_days dagen. De dag
+        van de vorige run telt weer mee, zodat artikelen van later op die dag
+        niet wegvallen; dubbelingen haalt de deduplicatie eruit.
+        """
+        mark = self.prompts.get(prompt_id)
+        if not mark:
+            return today - timedelta(days=self.default_days), today
+        last_run = date.fromisoformat(mark["last_run"])
+        if last_run >= today:
+            return None
+        return last_run, today
+
+    def apply(
+        self, prompts: list[dict], today: date
+    ) -> tuple[list[dict], list[str]]:
+        """
+        Voeg het datumvenster toe aan de query van elke prompt.
+
+        Returns (prompts met venster, ids van overgeslagen prompts).
+        """
+        windowed = []
+        skipped = []
+        for prompt in prompts:
+            window = self.window(prompt["id"], today)
+            if window is None:
+                skipped.append(prompt["id"])
+                continue
+            since, until = window
+            instruction = WINDOW_INSTRUCTION.format(
+                since=since.isoformat(), until=until.isoformat()
+            )
+            windowed.append({
+                **prompt,
+                "query": f"{prompt['query'].rstrip()}\n\n{instruction}",
+            })
+        return windowed, skipped
+
+    def advance(self, results: list[dict], run_date: date) -> None:
+        """Zet de watermark van elke geslaagde prompt op de datum van de run."""
+        with self._lock:
+            for result in results:
+                if result["raw_output"].startswith("FOUT:"):
+                    continue
+                mark = self.prompts.setdefault(result["id"], {})
+                mark["last_run"] = max(
+                    run_date.isoformat(), mark.get("last_run", "")
+                )
+                newest = newest_date(result["raw_output"], run_date)
+                if newest and newest.isoformat() > mark.get("newest_date", ""):
+                    mark["newest_date"] = newest.isoformat()
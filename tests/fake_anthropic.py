@@ -0,0 +1,414 @@
+"""
+Lokale nep-implementatie van de Anthropic Messages API voor tests.
+
+Draait een ThreadingHTTPServer op 127.0.0.1 met een willekeurige poort.
+Ondersteunt POST /v1/messages (ook gestreamd als SSE), de Message Batches
+endpoints en POST /emails(/batch) van Resend; een echte anthropic.Anthropic client
+met base_url=server.url praat er gewoon mee. Latency en 429-responses zijn
+instelbaar, zodat ook de benchmarks in benchmarks/ deze server gebruiken.
+De server spreekt HTTP/1.1 met keep-alive en telt geopende verbindingen.
+"""
+
+import json
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+def make_message(text: str, sources: dict[str, str] | None = None) -> dict:
+    """Bouw een Messages API response met tekst en optionele zoekresultaten."""
+    content = []
+    if sources:
+        content.append({
+            "type": "web_search_tool_result",
+            "tool_use_id": "srvtoolu_fake",
+            "content": [
+                {
+                    "type": "web_search_result",
+                    "url": url,
+                    "title": title,
+                    "encrypted_content": "",
+                    "page_age": None,
+                }
+                for url, title in sources.items()
+            ],
+        })
+    content.append({"type": "text", "text": text, "citations": None})
+    return {
+        "id": "msg_fake",
+        "type": "message",
+        "role": "assistant",
+        "model": "fake-model",
+        "content": content,
+        "stop_reason": "end_turn",
+        "stop_sequence": None,
+        "usage": {"input_tokens": 10, "output_tokens": len(text) // 4 + 1},
+    }
+
+
+def make_search_message(
+    query: str, articles: int = 8, content_bytes: int = 2048
+) -> dict:
+    """
+    Bouw een zoekresponse van realistische grootte.
+
+    Eén web_search_tool_result met `articles` resultaten (elk met
+    `content_bytes` aan encrypted_content, zoals de echte API), gevolgd door
+    een text-blok per artikel in het TITEL/URL/...-format met een citation.
+    """
+    slug = re.sub(r"[^a-z0-9]+", "-", query.lower()).strip("-")[:40] or "query"
+    results = [
+        {
+            "type": "web_search_result",
+            "url": f"https://blog{i}.example.com/{slug}/{i}",
+            "title": f"Artikel {i} over {slug}",
+            "encrypted_content": "x" * content_bytes,
+            "page_age": "3 days ago",
+        }
+        for i in range(articles)
+    ]
+    content = [
+        {
+            "type": "server_tool_use",
+            "id": "srvtoolu_fake",
+            "name": "web_search",
+            "input": {"query": query[:200]},
+        },
+        {
+            "type": "web_search_tool_result",
+            "tool_use_id": "srvtoolu_fake",
+            "content": results,
+        },
+    ]
+    for i, result in enumerate(results):
+        text = (
+            f"TITEL: {result['title']}\n"
+            "AUTEUR: Onbekend\n"
+            f"BRON: blog{i}.example.com\n"
+            f"URL: {result['url']}\n"
+            "DATUM: recent\n"
+            f"INZICHT: Een concreet inzicht over {slug} in één zin.\n"
+            f"RELEVANTIE: {i % 5 + 1}\n---\n"
+        )
+        content.append({
+            "type": "text",
+            "text": text,
+            "citations": [{
+                "type": "web_search_result_location",
+                "url": result["url"],
+                "title": result["title"],
+                "encrypted_index": "y" * 64,
+                "cited_text": f"Een citaat uit artikel {i} over {slug}. " * 4,
+            }],
+        })
+    output = sum(len(block.get("text", "")) for block in content) // 4 + 1
+    return {
+        "id": "msg_fake",
+        "type": "message",
+        "role": "assistant",
+        "model": "fake-model",
+        "content": content,
+        "stop_reason": "end_turn",
+        "stop_sequence": None,
+        "usage": {
+            "input_tokens": 400,
+            "output_tokens": output,
+            "cache_read_input_tokens": 300,
+            "cache_creation_input_tokens": 0,
+            "server_tool_use": {"web_search_requests": 1},
+        },
+    }
+
+
+def sse_events(message: dict, chunk_size: int = 64) -> str:
+    """Zet een message om naar de SSE-events van een gestreamde response."""
+    events = [(
+        "message_start",
+        {"type": "message_start", "message": {
+            **message,
+            "content": [],
+            "stop_reason": None,
+            "usage": {**message["usage"], "output_tokens": 1},
+        }},
+    )]
+    for index, block in enumerate(message["content"]):
+        if block["type"] == "text":
+            events.append(("content_block_start", {
+                "type": "content_block_start",
+                "index": index,
+                "content_block": {"type": "text", "text": ""},
+            }))
+            text = block["text"]
+            for start in range(0, len(text), chunk_size):
+                events.append(("content_block_delta", {
+                    "type": "content_block_delta",
+                    "index": index,
+                    "delta": {
+                        "type": "text_delta",
+                        "text": text[start:start + chunk_size],
+                    },
+                }))
+        else:
+            events.append(("content_block_start", {
+                "type": "content_block_start",
+                "index": index,
+                "content_block": block,
+            }))
+        events.append(("content_block_stop", {
+            "type": "content_block_stop", "index": index,
+        }))
+    events.append(("message_delta", {
+        "type": "message_delta",
+        "delta": {"stop_reason": message["stop_reason"], "stop_sequence": None},
+        "usage": {"output_tokens": message["usage"]["output_tokens"]},
+    }))
+    events.append(("message_stop", {"type": "message_stop"}))
+    return "".join(
+        f"event: {name}\ndata: {json.dumps(data)}\n\n" for name, data in events
+    )
+
+
+class FakeAnthropicServer:
+    """
+    Nep Anthropic API.
+
+    `responder(params) -> dict` bepaalt de message die bij een request hoort;
+    standaard wordt de laatste user-tekst teruggegeven. `polls_until_ended`
+    bepaalt hoe vaak een batch "in_progress" rapporteert. `latency` is de
+    vertraging in seconden per message-request; met `rate_limit_every=n`
+    krijgt elk n-de message-request een 429 met retry-after header.
+    `email_failures=n` laat de eerste n e-mailrequests mislukken met een 500.
+    """
+
+    def __init__(
+        self,
+        responder=None,
+        polls_until_ended: int = 1,
+        latency: float = 0.0,
+        rate_limit_every: int = 0,
+        retry_after_ms: int = 10,
+        email_failures: int = 0,
+    ):
+        self.responder = responder or (
+            lambda params: make_message(params["messages"][-1]["content"])
+        )
+        self.polls_until_ended = polls_until_ended
+        self.latency = latency
+        self.rate_limit_every = rate_limit_every
+        self.retry_after_ms = retry_after_ms
+        self.requests: list[tuple[str, str, dict | None]] = []
+        self.batches: dict[str, dict] = {}
+        self.emails: list[dict] = []
+        self.email_failures = email_failures
+        self.message_count = 0
+        self.rate_limited = 0
+        self.connections = 0
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), self._handler())
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._server.shutdown()
+        self._server.server_close()
+
+    # --- API ---
+
+    def should_rate_limit(self) -> bool:
+        """Tel een message-request en bepaal of het een 429 krijgt."""
+        with self._lock:
+            self.message_count += 1
+            limited = bool(
+                self.rate_limit_every
+                and self.message_count % self.rate_limit_every == 0
+            )
+            if limited:
+                self.rate_limited += 1
+        return limited
+
+    def create_batch(self, body: dict) -> dict:
+        with self._lock:
+            batch_id = f"msgbatch_{len(self.batches) + 1:04d}"
+            self.batches[batch_id] = {
+                "requests": body["requests"],
+                "polls": 0,
+            }
+        return self.batch_status(batch_id, count_poll=False)
+
+    def send_emails(self, messages: list[dict]) -> list[str] | None:
+        """Bewaar verstuurde e-mails; None als dit request moet mislukken."""
+        with self._lock:
+            if self.email_failures > 0:
+                self.email_failures -= 1
+                return None
+            ids = []
+            for message in messages:
+                self.emails.append(message)
+                ids.append(f"email_{len(self.emails):04d}")
+        return ids
+
+    def batch_status(self, batch_id: str, count_poll: bool = True) -> dict:
+        with self._lock:
+            batch = self.batches[batch_id]
+            if count_poll:
+                batch["polls"] += 1
+            ended = batch["polls"] >= self.polls_until_ended
+        total = len(batch["requests"])
+        return {
+            "id": batch_id,
+            "type": "message_batch",
+            "processing_status": "ended" if ended else "in_progress",
+            "request_counts": {
+                "processing": 0 if ended else total,
+                "succeeded": total if ended else 0,
+                "errored": 0,
+                "canceled": 0,
+                "expired": 0,
+            },
+            "created_at": "2026-01-01T00:00:00Z",
+            "expires_at": "2026-01-02T00:00:00Z",
+            "ended_at": "2026-01-01T01:00:00Z" if ended else None,
+            "archived_at": None,
+            "cancel_initiated_at": None,
+            "results_url": (
+                f"{self.url}/v1/messages/batches/{batch_id}/results"
+                if ended else None
+            ),
+        }
+
+    def batch_results(self, batch_id: str) -> str:
+        lines = []
+        for request in self.batches[batch_id]["requests"]:
+            try:
+                result = {
+                    "type": "succeeded",
+                    "message": self.responder(request["params"]),
+                }
+            except Exception as e:
+                result = {
+                    "type": "errored",
+                    "error": {
+                        "type": "error",
+                        "error": {"type": "api_error", "message": str(e)},
+                    },
+                }
+            lines.append(json.dumps({
+                "custom_id": request["custom_id"],
+                "result": result,
+            }))
+        return "\n".join(lines) + "\n"
+
+    # --- HTTP ---
+
+    def _handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            # Keep-alive, zodat hergebruik van verbindingen te meten is
+            protocol_version = "HTTP/1.1"
+
+            def setup(self):
+                super().setup()
+                with server._lock:
+                    server.connections += 1
+
+            def log_message(self, *args):
+                pass
+
+            def _send(
+                self,
+                status: int,
+                body: str,
+                content_type="application/json",
+                headers: dict | None = None,
+            ):
+                data = body.encode()
+                self.send_response(status)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(data)))
+                for name, value in (headers or {}).items():
+                    self.send_header(name, value)
+                self.end_headers()
+                self.wfile.write(data)
+
+            def _message(self, body: dict):
+                if server.latency:
+                    time.sleep(server.latency)
+                if server.should_rate_limit():
+                    retry_ms = server.retry_after_ms
+                    self._send(
+                        429,
+                        json.dumps({
+                            "type": "error",
+                            "error": {
+                                "type": "rate_limit_error",
+                                "message": "Number of requests has exceeded "
+                                "your rate limit",
+                            },
+                        }),
+                        headers={
+                            "retry-after-ms": str(retry_ms),
+                            "retry-after": str(max(1, retry_ms // 1000)),
+                        },
+                    )
+                elif body.get("stream"):
+                    self._send(
+                        200, sse_events(server.responder(body)), "text/event-stream"
+                    )
+                else:
+                    self._send(200, json.dumps(server.responder(body)))
+
+            def _body(self) -> dict:
+                length = int(self.headers.get("Content-Length", 0))
+                return json.loads(self.rfile.read(length) or b"{}")
+
+            def do_POST(self):
+                body = self._body()
+                server.requests.append(("POST", self.path, body))
+                if self.path.startswith("/v1/messages/batches"):
+                    self._send(200, json.dumps(server.create_batch(body)))
+                elif self.path.startswith("/v1/messages"):
+                    self._message(body)
+                elif self.path.startswith("/emails"):
+                    batch = self.path.startswith("/emails/batch")
+                    ids = server.send_emails(body if batch else [body])
+                    if ids is None:
+                        self._send(500, json.dumps({
+                            "statusCode": 500,
+                            "message": "Internal server error",
+                            "name": "application_error",
+                        }))
+                    elif batch:
+                        data = [{"id": email_id} for email_id in ids]
+                        self._send(200, json.dumps({"data": data}))
+                    else:
+                        self._send(200, json.dumps({"id": ids[0]}))
+                else:
+                    self._send(404, "{}")
+
+            def do_GET(self):
+                server.requests.append(("GET", self.path, None))
+                match = re.match(
+                    r"^/v1/messages/batches/([\w-]+)(/results)?", self.path
+                )
+                if not match or match.group(1) not in server.batches:
+                    self._send(404, "{}")
+                elif match.group(2):
+                    self._send(
+                        200,
+                        server.batch_results(match.group(1)),
+                        "application/binary",
+                    )
+                else:
+                    self._send(200, json.dumps(server.batch_status(match.group(1))))
+
+        return Handler
@@ -39,3 +39,239 @@ def test_build_analysis_prompt_multiple_results():
 def test_system_prompt_is_nonempty():
     assert len(ANALYSIS_SYSTEM_PROMPT) > 100
     assert "weekrapport" in ANALYSIS_SYSTEM_PROMPT
+
+
+def test_build_analysis_request_caches_static_blocks():
+    from src.analyze import build_analysis_request
+
+    results = [{"id": "p1", "name": "Test Prompt", "raw_output": "Some findings"}]
+    request = build_analysis_request(
+        results, "My design doc", "My current setup", "- example.com: gewicht 8"
+    )
+    system = request["system"]
+    assert system[0]["text"] == ANALYSIS_SYSTEM_PROMPT
+    assert "My design doc" in system[1]["text"]
+    assert "My current setup" in system[1]["text"]
+    assert "example.com" in system[2]["text"]
+    assert system[1]["cache_control"] == {"type": "ephemeral"}
+    assert system[2]["cache_control"] == {"type": "ephemeral"}
+
+    # Zoekresultaten alleen in het user-bericht, na de cacheblokken
+    user = request["messages"][0]["content"]
+    assert "Some findings" in user
+    assert "My design doc" not in user
+    assert all("Some findings" not in block["text"] for block in system)
+
+
+def test_build_analysis_prompt_puts_results_last():
+    results = [{"id": "p1", "name": "Test Prompt", "raw_output": "Some findings"}]
+    prompt = build_analysis_prompt(results, "My design doc", "setup", "weights")
+    assert prompt.index("My design doc") < prompt.index("Some findings")
+
+
+# --- gefaseerde analyse ---
+
+def _result(id, size):
+    return {"id": id, "name": id.upper(), "raw_output": "x" * size}
+
+
+def test_chunk_results_respects_budget_and_order():
+    from src.analyze import chunk_results
+
+    results = [_result("a", 400), _result("b", 400), _result("c", 400)]
+    chunks = chunk_results(results, max_tokens=250)
+    assert [[r["id"] for r in chunk] for chunk in chunks] == [["a", "b"], ["c"]]
+
+
+def test_chunk_results_truncates_oversized_result():
+    from src.analyze import chunk_results
+
+    chunks = chunk_results([_result("big", 10_000)], max_tokens=100)
+    assert len(chunks) == 1
+    assert chunks[0][0]["raw_output"].endswith("[ingekort]")
+    assert len(chunks[0][0]["raw_output"]) < 500
+
+
+def _text_response(text):
+    from unittest.mock import MagicMock
+
+    response = MagicMock()
+    response.content = [MagicMock(text=text)]
+    return response
+
+
+def test_analyze_results_small_input_uses_single_call():
+    from unittest.mock import MagicMock
+    from src.analyze import analyze_results
+
+    client = MagicMock()
+    client.messages.create.return_value = _text_response("# Rapport")
+    report = analyze_results(
+        client, "m", [_result("a", 100)], "design", "setup", "weights",
+        chunk_tokens=1000,
+    )
+    assert report == "# Rapport"
+    client.messages.create.assert_called_once()
+
+
+def test_analyze_results_large_input_maps_then_merges():
+    from unittest.mock import MagicMock
+    from src.analyze import analyze_results
+
+    def create(**kwargs):
+        content = kwargs["messages"][0]["content"]
+        if content.startswith("Hieronder staan deelanalyses"):
+            assert "DEELANALYSE 1" in content and "DEELANALYSE 3" in content
+            return _text_response("# Samengevoegd rapport")
+        return _text_response("voorstellen voor " + content.split("---")[1])
+
+    client = MagicMock()
+    client.messages.create.side_effect = create
+    results = [_result("a", 400), _result("b", 400), _result("c", 400)]
+
+    report = analyze_results(
+        client, "m", results, "design", "setup", "weights",
+        chunk_tokens=150, max_workers=2,
+    )
+    assert report == "# Samengevoegd rapport"
+    assert client.messages.create.call_count == 4
+    # Alle calls delen dezelfde gecachete systeemprompt
+    systems = [c.kwargs["system"] for c in client.messages.create.call_args_list]
+    assert all(system == systems[0] for system in systems)
+
+
+def test_analyze_results_staged_survives_failed_chunk():
+    from unittest.mock import MagicMock
+    from src.analyze import analyze_results_staged
+
+    def create(**kwargs):
+        content = kwargs["messages"][0]["content"]
+        if content.startswith("Hieronder staan deelanalyses"):
+            assert "mislukt" in content
+            return _text_response("# Rapport")
+        if "(b)" in content:
+            raise RuntimeError("API down")
+        return _text_response("ok")
+
+    client = MagicMock()
+    client.messages.create.side_effect = create
+    results = [_result("a", 400), _result("b", 400)]
+    failed = []
+    report = analyze_results_staged(
+        client, "m", results, "d", "s", "w", chunk_tokens=150,
+        failed_chunks=failed,
+    )
+    assert failed == ["b"]
+    assert report.startswith("# Rapport\n\n> **Let op:** dit rapport is onvolledig")
+    assert report.rstrip().endswith("mislukte voor: b")
+
+
+def test_analyze_results_does_not_cache_incomplete_report(tmp_path):
+    from unittest.mock import MagicMock
+    from src.analyze import analyze_results
+    from src.cache import ResponseCache
+
+    chunk_fails = True
+
+    def create(**kwargs):
+        content = kwargs["messages"][0]["content"]
+        if content.startswith("Hieronder staan deelanalyses"):
+            return _text_response("# Rapport")
+        if "(b)" in content and chunk_fails:
+            raise RuntimeError("API down")
+        return _text_response("ok")
+
+    client = MagicMock()
+    client.messages.create.side_effect = create
+    cache = ResponseCache(str(tmp_path))
+    results = [_result("a", 400), _result("b", 400)]
+
+    failed = []
+    report = analyze_results(
+        client, "m", results, "d", "s", "w", chunk_tokens=150, cache=cache,
+        failed_chunks=failed,
+    )
+    assert failed == ["b"] and "onvolledig" in report
+    # Een nieuwe poging gaat niet naar de cache maar doet de analyse opnieuw
+    chunk_fails = False
+    failed = []
+    report = analyze_results(
+        client, "m", results, "d", "s", "w", chunk_tokens=150, cache=cache,
+        failed_chunks=failed,
+    )
+    assert failed == [] and report == "# Rapport"
+    calls = client.messages.create.call_count
+    assert analyze_results(
+        client, "m", results, "d", "s", "w", chunk_tokens=150, cache=cache
+    ) == "# Rapport"
+    assert client.messages.create.call_count == calls
+
+
+def test_analyze_results_streams_when_on_text_given():
+    from unittest.mock import MagicMock
+    from src.analyze import analyze_results
+
+    client = MagicMock()
+    stream = client.messages.stream.return_value.__enter__.return_value
+    stream.text_stream = iter(["# Rap", "port"])
+    stream.get_final_message.return_value = _text_response("# Rapport")
+
+    seen = []
+    report = analyze_results(
+        client, "m", [_result("a", 10)], "d", "s", "w", on_text=seen.append
+    )
+    assert report == "# Rapport"
+    assert seen == ["# Rap", "port"]
+    client.messages.create.assert_not_called()
+
+
+def _overloaded():
+    from unittest.mock import MagicMock
+
+    import anthropic
+
+    response = MagicMock(status_code=529, headers={})
+    return anthropic.APIStatusError("overloaded", response=response, body=None)
+
+
+def test_analyze_results_retries_overloaded_api():
+    from unittest.mock import MagicMock
+    from src.analyze import analyze_results
+    from src.retry import RetryPolicy
+
+    client = MagicMock()
+    client.messages.create.side_effect = [_overloaded(), _text_response("# Rapport")]
+    sleep = MagicMock()
+
+    report = analyze_results(
+        client, "m", [_result("a", 10)], "d", "s", "w",
+        retry=RetryPolicy(base_delay=1, sleep=sleep),
+    )
+    assert report == "# Rapport"
+    assert client.messages.create.call_count == 2
+    sleep.assert_called_once()
+
+
+def test_analyze_results_does_not_retry_after_streamed_text():
+    from unittest.mock import MagicMock
+    from src.analyze import ERROR_HEADING, analyze_results
+    from src.retry import RetryPolicy
+
+    def broken_stream():
+        yield "# Rap"
+        raise _overloaded()
+
+    client = MagicMock()
+    stream = client.messages.stream.return_value.__enter__.return_value
+    stream.text_stream = broken_stream()
+    sleep = MagicMock()
+
+    seen = []
+    report = analyze_results(
+        client, "m", [_result("a", 10)], "d", "s", "w", on_text=seen.append,
+        retry=RetryPolicy(sleep=sleep),
+    )
+    assert report.startswith(ERROR_HEADING)
+    assert seen == ["# Rap"]
+    assert client.messages.stream.call_count == 1
+    sleep.assert_not_called()
@@ -0,0 +1,134 @@
+"""Tests for src/archive.py — FTS5-archief van rapporten en zoekresultaten."""
+
+import json
+import os
+
+from src.archive import (
+    Archive,
+    create_archive,
+    format_previous,
+    fts_query,
+    parse_report,
+)
+
+REPORT = """# Claude Code Scout — weekrapport 2026-03-06
+
+## Samenvatting
+Hooks en subagents.
+
+## Nieuwe inzichten per categorie
+
+### [Hooks]
+
+**Voorstel:** Blokkeer gevaarlijke commands met een PreToolUse-hook
+**Bron:** Anthropic, docs.anthropic.com, [Hooks guide](https://docs.anthropic.com/hooks)
+**Type:** klein
+**Toelichting:** Verbetert de security van de setup.
+
+### [Subagents]
+
+**Voorstel:** Laat een reviewer-subagent elke diff nakijken
+**Bron:** blog.example.com — https://blog.example.com/review.
+**Type:** fundamenteel
+**Toelichting:** Minder fouten.
+
+## Bronnen om in de gaten te houden
+- blog.example.com
+"""
+
+
+def _result(prompt_id, name, title, url):
+    return {
+        "id": prompt_id,
+        "name": name,
+        "raw_output": f"TITEL: {title}\nURL: {url}\nRELEVANTIE: 4\n---",
+        "sources": {url: title},
+    }
+
+
+def _workspace(tmp_path):
+    reports = tmp_path / "reports"
+    reports.mkdir()
+    (reports / "rapport-2026-03-06.md").write_text(REPORT, encoding="utf-8")
+    search = tmp_path / "runs" / "2026-03-13-210000" / "search"
+    search.mkdir(parents=True)
+    (search / "hooks.json").write_text(json.dumps(_result(
+        "hooks", "Hooks", "Security hooks for Claude Code", "https://example.com/sec"
+    )))
+    (search / "kapot.json").write_text(json.dumps(
+        {"id": "kapot", "name": "Kapot", "raw_output": "FOUT: time-out"}
+    ))
+    return [str(reports)], str(tmp_path / "runs")
+
+
+def test_parse_report_reads_proposals():
+    proposals = parse_report(REPORT)
+    assert [(p["category"], p["url"]) for p in proposals] == [
+        ("Hooks", "https://docs.anthropic.com/hooks"),
+        ("Subagents", "https://blog.example.com/review"),
+    ]
+    assert proposals[1]["title"] == "Laat een reviewer-subagent elke diff nakijken"
+    assert "Bronnen om in de gaten te houden" not in proposals[1]["body"]
+
+
+def test_search_finds_proposals_and_articles(tmp_path):
+    report_dirs, runs_dir = _workspace(tmp_path)
+    archive = Archive(str(tmp_path / "archive.db"))
+    assert archive.update("", report_dirs, runs_dir) == 3
+
+    rows = archive.search("hooks security")
+    assert [(r["kind"], r["date"]) for r in rows] == [
+        ("article", "2026-03-13"),
+        ("proposal", "2026-03-06"),
+    ]
+    assert archive.search("hooks", kind="proposal")[0]["url"] == (
+        "https://docs.anthropic.com/hooks"
+    )
+    assert archive.search("gevaarlijk*")[0]["category"] == "Hooks"
+    assert archive.search("hooks", before="2026-03-06") == []
+    assert archive.search('"; DROP TABLE entries; --') == []
+
+
+def test_update_is_incremental(tmp_path):
+    report_dirs, runs_dir = _workspace(tmp_path)
+    path = tmp_path / "archive.db"
+    archive = Archive(str(path))
+    archive.update("", report_dirs, runs_dir)
+    archive.close()
+
+    archive = Archive(str(path))
+    assert archive.update("", report_dirs, runs_dir) == 0
+
+    report = tmp_path / "reports" / "rapport-2026-03-06.md"
+    report.write_text(REPORT.replace("reviewer-subagent", "tester-subagent"))
+    os.utime(report, ns=(1, 1))
+    assert archive.update("", report_dirs, runs_dir) == 1
+    assert archive.search("reviewer") == []
+    assert len(archive.search("tester")) == 1
+
+
+def test_previous_proposals_per_category(tmp_path):
+    report_dirs, runs_dir = _workspace(tmp_path)
+    archive = Archive(str(tmp_path / "archive.db"))
+    archive.update("", report_dirs, runs_dir)
+
+    proposals = archive.previous_proposals(["Hooks", "MCP"], "", before="2026-03-13")
+    assert [p["category"] for p in proposals] == ["Hooks"]
+    text = format_previous(proposals)
+    assert text.startswith("## EERDER VOORGESTELD")
+    assert "2026-03-06 · Hooks: Blokkeer gevaarlijke commands" in text
+    assert archive.previous_proposals(["Hooks"], "", before="2026-03-06") == []
+    assert format_previous([]) == ""
+
+
+def test_fts_query_quotes_terms():
+    assert fts_query('hooks "security" pre-tool*') == (
+        '"hooks" """security""" "pre-tool"*'
+    )
+    assert fts_query("  ") == ""
+
+
+def test_create_archive_can_be_disabled(tmp_path):
+    assert create_archive({"enabled": False}, str(tmp_path / "a.db")) is None
+    archive = create_archive({}, str(tmp_path / "state" / "a.db"))
+    assert archive.path == tmp_path / "state" / "a.db"
@@ -0,0 +1,108 @@
+"""Tests for src/articles.py — incremental parsing and article selection."""
+
+import pytest
+
+from src.articles import Article, ArticleParser, parse_articles, select_articles
+
+RAW = """TITEL: Hooks in de praktijk
+AUTEUR: Jan
+BRON: blog.example.com
+URL: https://blog.example.com/hooks
+DATUM: 2026-03-01
+INZICHT: Hooks maken reviews sneller
+  en betrouwbaarder.
+RELEVANTIE: 4/5
+---
+TITEL: Oud nieuws
+URL: https://www.other.com/old?utm_source=x
+RELEVANTIE: 1
+---
+
+GEVERIFIEERDE BRONNEN:
+- [Hooks](https://blog.example.com/hooks)
+TITEL: geen artikel
+"""
+
+
+def test_parse_articles_reads_fields_and_continuations():
+    hooks, old = parse_articles(RAW)
+    assert hooks.title == "Hooks in de praktijk"
+    assert hooks.author == "Jan"
+    assert hooks.url == "https://blog.example.com/hooks"
+    assert hooks.insight == "Hooks maken reviews sneller en betrouwbaarder."
+    assert hooks.relevance == 4
+    assert old.relevance == 1
+
+
+def test_parser_is_incremental():
+    parser = ArticleParser()
+    seen = []
+    for char in RAW:
+        seen.extend(parser.feed(char))
+    seen.extend(parser.close())
+    assert seen == parse_articles(RAW)
+
+
+def test_parser_yields_article_as_soon_as_block_ends():
+    parser = ArticleParser()
+    assert list(parser.feed("TITEL: A\nURL: https://a.com\n")) == []
+    [article] = parser.feed("---\nTITEL: B")
+    assert article.title == "A"
+    [last] = parser.close()
+    assert last.title == "B"
+
+
+def test_new_title_without_separator_starts_new_article():
+    articles = parse_articles("TITEL: A\nRELEVANTIE: 3\nTITEL: B\nRELEVANTIE: 5")
+    assert [(a.title, a.relevance) for a in articles] == [("A", 3), ("B", 5)]
+
+
+def test_article_uses_slots_and_round_trips():
+    article = Article(title="A", url="https://a.com", relevance=3)
+    with pytest.raises(AttributeError):
+        article.extra = 1
+    assert article.to_text() == "TITEL: A\nURL: https://a.com\nRELEVANTIE: 3"
+    assert parse_articles(article.to_text()) == [article]
+
+
+def test_select_articles_keeps_verified_relevant_articles():
+    results = [
+        {
+            "id": "hooks",
+            "name": "Hooks",
+            "raw_output": "TITEL: Verzonnen\nURL: https://nep.com\n"
+            "RELEVANTIE: 5\n---\n" + RAW,
+            "sources": {
+                "https://blog.example.com/hooks": "Hooks",
+                "https://other.com/old": "Oud",
+            },
+        },
+        {
+            "id": "leeg",
+            "name": "Leeg",
+            "raw_output": "TITEL: X\nURL: https://x.com\nRELEVANTIE: 1\n---",
+            "sources": {"https://x.com": "X"},
+        },
+    ]
+
+    selected, stats = select_articles(results, min_relevance=2)
+    assert stats == {"kept": 1, "unverified": 1, "low_relevance": 2}
+    [hooks] = selected
+    assert hooks["raw_output"].startswith("TITEL: Hooks in de praktijk")
+    assert hooks["raw_output"].endswith(
+        "---\n\nGEVERIFIEERDE BRONNEN:\n- [Hooks](https://blog.example.com/hooks)"
+    )
+    assert "Oud nieuws" not in hooks["raw_output"]
+    assert "[Oud]" not in hooks["raw_output"]
+    assert hooks["sources"] == {"https://blog.example.com/hooks": "Hooks"}
+
+
+def test_select_articles_can_skip_verification():
+    results = [{
+        "id": "a", "name": "A", "sources": {},
+        "raw_output": "TITEL: A\nURL: https://a.com\nRELEVANTIE: 3\n---",
+    }]
+    assert select_articles(results)[1]["unverified"] == 1
+    selected, stats = select_articles(results, require_verified=False)
+    assert stats["kept"] == 1
+    assert len(selected) == 1
@@ -0,0 +1,31 @@
+"""Smoke test for benchmarks/bench_pipeline.py against the fake server."""
+
+import subprocess
+import sys
+from pathlib import Path
+
+from benchmarks.bench_pipeline import format_table, run_benchmarks
+
+ROOT = Path(__file__).resolve().parent.parent
+
+
+def test_benchmarks_run_end_to_end_with_rate_limits():
+    rows = run_benchmarks(sizes=[3], latency=0, rate_limit_every=2, workers=2)
+
+    assert [row["benchmark"] for row in rows] == ["search", "analyze", "main"]
+    assert all(row["ok"] for row in rows)
+    assert rows[0]["rate_limited"] >= 1
+    assert rows[0]["api_calls"] > 3
+    assert all(row["peak_mb"] > 0 for row in rows)
+    assert "search" in format_table(rows)
+
+
+def test_benchmark_cli_prints_only_the_table(tmp_path):
+    out = subprocess.run(
+        [sys.executable, "-m", "benchmarks.bench_pipeline", "--sizes", "2",
+         "--latency", "0", "--json", str(tmp_path / "bench.json")],
+        cwd=ROOT, capture_output=True, text=True, check=True,
+    )
+    assert "[INFO]" not in out.stdout and "[INFO]" not in out.stderr
+    assert out.stdout.splitlines()[0].startswith("benchmark")
+    assert not (ROOT / "scout.log").exists()
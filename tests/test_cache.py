@@ -0,0 +1,112 @@
+"""Tests for src/cache.py — on-disk cache in tmp_path, fake clock."""
+
+from unittest.mock import MagicMock
+
+from src.cache import ResponseCache, create_response_cache
+
+
+class FakeClock:
+    def __init__(self, now=1_000_000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+def test_key_is_stable_and_content_addressed():
+    a = ResponseCache.key({"model": "m", "max_tokens": 10, "messages": ["x"]})
+    b = ResponseCache.key({"messages": ["x"], "max_tokens": 10, "model": "m"})
+    c = ResponseCache.key({"model": "m", "max_tokens": 11, "messages": ["x"]})
+    assert a == b
+    assert a != c
+
+
+def test_set_and_get_roundtrip(tmp_path):
+    cache = ResponseCache(str(tmp_path))
+    cache.set("abc123", {"raw_output": "tekst", "sources": {"https://a.com": "A"}})
+    assert cache.get("abc123") == {
+        "raw_output": "tekst",
+        "sources": {"https://a.com": "A"},
+    }
+
+
+def test_get_miss_returns_none(tmp_path):
+    assert ResponseCache(str(tmp_path)).get("onbekend") is None
+
+
+def test_expired_entry_is_dropped(tmp_path):
+    clock = FakeClock()
+    cache = ResponseCache(str(tmp_path), ttl_seconds=60, clock=clock)
+    cache.set("k1", {"report": "oud"})
+    clock.now += 61
+    assert cache.get("k1") is None
+    assert not list(tmp_path.glob("*/*.json"))
+
+
+def test_lru_eviction_keeps_recently_used(tmp_path):
+    clock = FakeClock()
+    cache = ResponseCache(str(tmp_path), max_bytes=10_000, clock=clock)
+    payload = {"report": "x" * 3000}
+    for key in ("k1", "k2", "k3"):
+        cache.set(key, payload)
+        clock.now += 1
+    cache.get("k1")  # k1 is nu recenter gebruikt dan k2
+    clock.now += 1
+    cache.set("k4", payload)
+
+    assert cache.get("k1") is not None
+    assert cache.get("k2") is None
+    assert cache.get("k4") is not None
+
+
+def test_create_response_cache_from_config(tmp_path):
+    assert create_response_cache(None) is None
+    assert create_response_cache({"enabled": False}) is None
+    cache = create_response_cache({"dir": str(tmp_path), "ttl_hours": 1})
+    assert cache.ttl_seconds == 3600
+
+
+# --- integratie met search en analyze ---
+
+def test_search_single_prompt_uses_cache(tmp_path):
+    from src.search import search_single_prompt
+    from tests.test_search import _make_prompt, _mock_response
+
+    cache = ResponseCache(str(tmp_path))
+    client = MagicMock()
+    client.messages.create.return_value = _mock_response(
+        "Gevonden", sources={"https://a.com": "A"}
+    )
+
+    first = search_single_prompt(client, "m", "b", "f", _make_prompt(), cache=cache)
+    second = search_single_prompt(client, "m", "b", "f", _make_prompt(), cache=cache)
+    assert first == second
+    assert second["sources"] == {"https://a.com": "A"}
+    client.messages.create.assert_called_once()
+
+
+def test_search_single_prompt_does_not_cache_errors(tmp_path):
+    from src.search import search_single_prompt
+    from tests.test_search import _make_prompt
+
+    cache = ResponseCache(str(tmp_path))
+    client = MagicMock()
+    client.messages.create.side_effect = RuntimeError("API down")
+
+    search_single_prompt(client, "m", "b", "f", _make_prompt(), cache=cache)
+    search_single_prompt(client, "m", "b", "f", _make_prompt(), cache=cache)
+    assert client.messages.create.call_count == 2
+
+
+def test_analyze_results_uses_cache(tmp_path):
+    from src.analyze import analyze_results
+
+    cache = ResponseCache(str(tmp_path))
+    client = MagicMock()
+    client.messages.create.return_value.content = [MagicMock(text="# Rapport")]
+    results = [{"id": "a", "name": "A", "raw_output": "iets"}]
+
+    for _ in range(2):
+        report = analyze_results(client, "m", results, "d", "s", "w", cache=cache)
+    assert report == "# Rapport"
+    client.messages.create.assert_called_once()
@@ -0,0 +1,334 @@
+"""Tests for src/cli.py — subcommands, lazy imports en opstarttijd."""
+
+import json
+import os
+import subprocess
+import sys
+from datetime import date
+from pathlib import Path
+
+import pytest
+import resend
+import yaml
+
+from src import cli
+from src.history import ArticleHistory
+from src.metrics import Metrics
+from src.run_store import RunStore
+from src.scheduler import PromptStats
+from tests.fake_anthropic import FakeAnthropicServer, make_message
+
+ROOT = Path(__file__).resolve().parent.parent
+
+# Tijd voor import van de CLI plus het command, zonder opstart van Python zelf
+STARTUP_BUDGET_MS = 300
+
+MEASURE = """
+import json, sys, time
+start = time.perf_counter()
+from src import cli
+try:
+    code = cli.main(sys.argv[1:])
+except SystemExit as e:
+    code = e.code
+elapsed = (time.perf_counter() - start) * 1000
+heavy = [m for m in ("anthropic", "resend", "src.pipeline") if m in sys.modules]
+print(json.dumps({"ms": elapsed, "heavy": heavy, "code": code}))
+"""
+
+
+def _measure(workdir: Path, *argv: str) -> dict:
+    result = subprocess.run(
+        [sys.executable, "-c", MEASURE, *argv],
+        cwd=workdir,
+        env={**os.environ, "PYTHONPATH": str(ROOT)},
+        capture_output=True,
+        text=True,
+        timeout=60,
+    )
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def _workspace(tmp_path: Path) -> Path:
+    """Een geldige config met één prompt in tmp_path."""
+    for name in ("system_design.md", "current_setup.md"):
+        (tmp_path / name).write_text("# leeg\n")
+    (tmp_path / "weights.yaml").write_text("sources: []\n")
+    (tmp_path / "prompts.yaml").write_text(yaml.safe_dump({
+        "base_instruction": "base",
+        "output_format": "fmt",
+        "prompts": [{"id": "p0", "name": "P0", "query": "hooks"}],
+    }))
+    (tmp_path / "config.yaml").write_text(yaml.safe_dump({
+        "anthropic": {"api_key": "test", "model": "m"},
+        "email": {
+            "resend_api_key": "k",
+            "from_address": "s@example.com",
+            "to_address": "me@example.com",
+            "subject_prefix": "[Scout]",
+        },
+        "paths": {
+            "prompts": "prompts.yaml",
+            "system_design": "system_design.md",
+            "current_setup": "current_setup.md",
+            "source_weights": "weights.yaml",
+            "reports_dir": "reports",
+        },
+        "search": {"delay_between_calls": 0},
+        "analysis": {"stream": False},
+        "cache": {"enabled": False},
+    }))
+    return tmp_path
+
+
+@pytest.mark.parametrize(
+    "argv",
+    [["--help"], ["check"], ["query", "hooks"], ["trends"], ["plan"]],
+)
+def test_quick_commands_skip_heavy_imports(tmp_path, argv):
+    measured = _measure(_workspace(tmp_path), *argv)
+    assert measured["code"] == 0
+    assert measured["heavy"] == []
+    assert measured["ms"] < STARTUP_BUDGET_MS
+
+
+def test_legacy_flags_map_to_commands(monkeypatch):
+    calls = []
+    monkeypatch.setattr(cli, "setup_logging", lambda: None)
+    monkeypatch.setitem(cli.COMMANDS, "run", lambda args: calls.append(args) or 0)
+    monkeypatch.setitem(cli.COMMANDS, "resume", lambda args: calls.append(args) or 0)
+
+    cli.main([])
+    cli.main(["--resume", "2026-01-01-000000"])
+    cli.main(["--no-cache", "run"])
+    cli.main(["resume", "2026-01-02-000000", "--no-cache"])
+
+    assert [(a.command, a.run_id, a.no_cache) for a in calls] == [
+        ("run", None, False),
+        ("resume", "2026-01-01-000000", False),
+        ("run", None, True),
+        ("resume", "2026-01-02-000000", True),
+    ]
+
+
+def test_check_reports_problems(tmp_path, monkeypatch, capsys):
+    monkeypatch.chdir(_workspace(tmp_path))
+    (tmp_path / "weights.yaml").unlink()
+    assert cli.main(["check"]) == 1
+    assert "source_weights niet gevonden" in capsys.readouterr().out
+
+
+def test_stats_prints_latest_run(tmp_path, monkeypatch, capsys):
+    monkeypatch.chdir(_workspace(tmp_path))
+    run = RunStore("runs", "2026-03-06-210000")
+    run.mark_stage("search", "done")
+    metrics = Metrics()
+    with metrics.track("search", "p0"):
+        pass
+    metrics.write_json("runs/2026-03-06-210000/metrics.json")
+    RunStore("runs", "2026-02-27-210000")
+
+    assert cli.main(["stats"]) == 0
+    out = capsys.readouterr().out
+    assert "Run 2026-03-06-210000" in out
+    assert "rapport: search done, analyze pending" in out
+    assert "search/p0" in out
+
+
+def test_trends_lists_prompts_by_hit_rate(tmp_path, monkeypatch, capsys):
+    monkeypatch.chdir(_workspace(tmp_path))
+    assert cli.main(["trends"]) == 0
+    assert "Geen historie in state/history" in capsys.readouterr().out
+
+    history = ArticleHistory("state/history")
+    for run_id, day in (("r1", date(2026, 3, 6)), ("r2", date(2026, 3, 13))):
+        history.append(run_id, "hooks", day, f"https://{run_id}.com/a", 4)
+        history.append(run_id, "mcp", day)
+    history.save()
+
+    assert cli.main(["trends", "--weeks", "1"]) == 0
+    out = capsys.readouterr().out.splitlines()
+    rows = [line.split() for line in out if line.startswith(("hooks", "mcp"))]
+    assert rows == [
+        ["mcp", "2", "0", "0%", "0", "-"],
+        ["hooks", "2", "2", "100%", "2", "4.0"],
+    ]
+    assert out[-1].split() == ["2026-W11", "1"]
+
+
+def test_plan_and_dry_run_show_the_schedule(tmp_path, monkeypatch, capsys):
+    monkeypatch.chdir(_workspace(tmp_path))
+    assert cli.main(["plan"]) == 0
+    assert "De scheduler staat uit" in capsys.readouterr().out
+
+    config = yaml.safe_load(Path("config.yaml").read_text())
+    config["scheduler"] = {"enabled": True}
+    Path("config.yaml").write_text(yaml.safe_dump(config))
+    stats = PromptStats("state/prompt_stats.json")
+    stats.prompts["p0"] = {
+        "runs": 5, "yield": 0.1, "cost": 0.2, "max_uses": 5,
+        "last_run": date.today().isoformat(),
+    }
+    stats.save()
+
+    assert cli.main(["plan"]) == 0
+    out = capsys.readouterr().out
+    assert cli.main(["run", "--dry-run"]) == 0
+    assert capsys.readouterr().out == out
+    row = out.splitlines()[2].split()
+    assert row[:4] == ["p0", "overslaan", "laag", "2"]
+    assert out.splitlines()[-1] == "0/1 prompts, geschat $0.00"
+    assert not Path("runs").exists()
+
+
+def test_search_analyze_send_in_steps(tmp_path, monkeypatch):
+    def responder(params):
+        if params.get("tools"):
+            return make_message(
+                "TITEL: Hooks in de praktijk\nURL: https://example.com/a\n"
+                "RELEVANTIE: 4\n---",
+                sources={"https://example.com/a": "Hooks in de praktijk"},
+            )
+        return make_message("# Rapport")
+
+    monkeypatch.chdir(_workspace(tmp_path))
+    with FakeAnthropicServer(responder) as server:
+        monkeypatch.setenv("ANTHROPIC_BASE_URL", server.url)
+        monkeypatch.setattr(resend, "api_url", server.url)
+
+        assert cli.main(["search"]) == 0
+        [run_dir] = (tmp_path / "runs").iterdir()
+        run = RunStore.resume("runs", run_dir.name)
+        assert run.manifest["prompts"] == {"p0": "done"}
+        assert run.manifest["stages"]["analyze"]["status"] == "pending"
+
+        assert cli.main(["analyze", run_dir.name]) == 0
+        assert list((tmp_path / "reports").glob("rapport-*.md"))
+        assert server.emails == []
+        # Geen nieuwe zoekcalls bij analyze
+        searches = [
+            body for _, _, body in server.requests if body and body.get("tools")
+        ]
+        assert len(searches) == 1
+
+        assert cli.main(["send", run_dir.name]) == 0
+        assert [email["to"] for email in server.emails] == [["me@example.com"]]
+
+    run = RunStore.resume("runs", run_dir.name)
+    assert run.manifest["stages"]["email"]["status"] == "done"
+    assert json.loads((run_dir / "metrics.json").read_text())["calls"]
+
+
+def test_failed_analysis_does_not_cover_the_search_window(tmp_path, monkeypatch):
+    analysis_fails = True
+
+    def responder(params):
+        if params.get("tools"):
+            return make_message(
+                "TITEL: Hooks in de praktijk\nURL: https://example.com/a\n"
+                "RELEVANTIE: 4\n---",
+                sources={"https://example.com/a": "Hooks in de praktijk"},
+            )
+        # Een onbruikbaar antwoord laat de analyse mislukken
+        return {} if analysis_fails else make_message("# Rapport")
+
+    monkeypatch.chdir(_workspace(tmp_path))
+    with FakeAnthropicServer(responder) as server:
+        monkeypatch.setenv("ANTHROPIC_BASE_URL", server.url)
+        monkeypatch.setattr(resend, "api_url", server.url)
+        assert cli.main(["run"]) == 0
+        [run_dir] = (tmp_path / "runs").iterdir()
+        [report] = (tmp_path / "reports").glob("rapport-*.md")
+        assert report.read_text().startswith("# Fout bij het genereren")
+        # Het venster is niet afgedekt: de volgende run zoekt opnieuw
+        assert not (tmp_path / "state" / "watermarks.json").exists()
+        # en de artikelen gelden nog niet als gezien
+        assert not (tmp_path / "state" / "seen_index.json").exists()
+        # De melding gaat wel uit, maar telt niet als verstuurd rapport
+        assert len(server.emails) == 1
+        run = RunStore.resume("runs", run_dir.name)
+        assert run.manifest["stages"]["email"]["status"] == "notice-sent"
+
+        # Zoals een onvolledig rapport dat het artikel al citeert
+        report.write_text("# Rapport\n\n[Hooks](https://example.com/a)\n")
+        analysis_fails = False
+        before = len(server.requests)
+        assert cli.main(["resume", run_dir.name]) == 0
+        # Het eigen rapport filtert het artikel niet weg bij de resume
+        [analysis] = [
+            body for _, path, body in server.requests[before:]
+            if path == "/v1/messages" and not body.get("tools")
+        ]
+        assert "https://example.com/a" in json.dumps(analysis)
+        assert len(server.emails) == 2
+        assert "# Rapport" in server.emails[1]["text"]
+
+    assert report.read_text() == "# Rapport"
+    run = RunStore.resume("runs", run_dir.name)
+    assert run.manifest["stages"]["email"]["status"] == "done"
+    marks = json.loads((tmp_path / "state" / "watermarks.json").read_text())
+    assert marks["prompts"]["p0"]["last_run"] == date.today().isoformat()
+    seen = (tmp_path / "state" / "seen_index.json").read_text()
+    assert "example.com/a" in seen
+
+
+def test_empty_search_still_covers_the_search_window(tmp_path, monkeypatch):
+    def responder(params):
+        return make_message("GEEN RESULTATEN")
+
+    monkeypatch.chdir(_workspace(tmp_path))
+    with FakeAnthropicServer(responder) as server:
+        monkeypatch.setenv("ANTHROPIC_BASE_URL", server.url)
+        monkeypatch.setattr(resend, "api_url", server.url)
+        assert cli.main(["run"]) == 0
+        [run_dir] = (tmp_path / "runs").iterdir()
+        assert cli.main(["send", run_dir.name]) == 0
+        assert server.emails == []
+
+    assert not list((tmp_path / "reports").glob("rapport-*.md"))
+    marks = json.loads((tmp_path / "state" / "watermarks.json").read_text())
+    assert marks["prompts"]["p0"]["last_run"] == date.today().isoformat()
+    run = RunStore.resume("runs", run_dir.name)
+    assert run.manifest["stages"]["analyze"]["status"] == "skipped"
+
+
+def test_analysis_gets_previous_proposals_and_query_finds_them(
+    tmp_path, monkeypatch, capsys
+):
+    def responder(params):
+        if params.get("tools"):
+            return make_message(
+                "TITEL: Hooks voor security\nURL: https://example.com/b\n"
+                "RELEVANTIE: 4\n---",
+                sources={"https://example.com/b": "Hooks voor security"},
+            )
+        return make_message("# Rapport")
+
+    monkeypatch.chdir(_workspace(tmp_path))
+    (tmp_path / "reports").mkdir()
+    (tmp_path / "reports" / "rapport-2026-01-02.md").write_text(
+        "### [P0]\n\n**Voorstel:** Zet een PreToolUse-hook op rm -rf\n"
+        "**Bron:** https://example.com/a\n"
+    )
+    with FakeAnthropicServer(responder) as server:
+        monkeypatch.setenv("ANTHROPIC_BASE_URL", server.url)
+        monkeypatch.setattr(resend, "api_url", server.url)
+        assert cli.main(["run"]) == 0
+
+    [analysis] = [
+        body for _, _, body in server.requests
+        if body and "system" in body and not body.get("tools")
+    ]
+    prompt = analysis["messages"][0]["content"]
+    assert "## EERDER VOORGESTELD" in prompt
+    assert "2026-01-02 · P0: Zet een PreToolUse-hook op rm -rf" in prompt
+
+    capsys.readouterr()
+    assert cli.main(["query", "hooks security"]) == 0
+    out = capsys.readouterr().out
+    assert "artikel   P0: Hooks voor security" in out
+    assert "1 resultaten" in out
+    assert cli.main(["query", "pretooluse", "--kind", "proposal"]) == 0
+    assert "2026-01-02  voorstel  P0: Zet een PreToolUse-hook" in (
+        capsys.readouterr().out
+    )
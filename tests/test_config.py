@@ -0,0 +1,48 @@
+"""Tests for src/config.py — controle van config.yaml en bestanden."""
+
+import shutil
+from pathlib import Path
+
+import yaml
+
+from src.config import state_path, validate_config
+
+ROOT = Path(__file__).resolve().parent.parent
+
+
+def _config():
+    return yaml.safe_load((ROOT / "config.example.yaml").read_text())
+
+
+def test_example_config_is_valid(monkeypatch, tmp_path):
+    shutil.copytree(ROOT / "reference", tmp_path / "reference")
+    shutil.copytree(ROOT / "prompts", tmp_path / "prompts")
+    monkeypatch.chdir(tmp_path)
+    config = _config()
+    config.pop("topics", None)
+    assert validate_config(config) == []
+
+
+def test_validate_config_reports_problems(monkeypatch, tmp_path):
+    monkeypatch.chdir(tmp_path)
+    config = _config()
+    config.pop("topics", None)
+    del config["anthropic"]["api_key"]
+    assert validate_config(config) == ["anthropic.api_key ontbreekt"]
+
+    config = _config()
+    config.pop("topics", None)
+    (tmp_path / "prompts").mkdir()
+    (tmp_path / "prompts" / "search_prompts.yaml").write_text(
+        yaml.safe_dump({"prompts": [{"id": "a"}, {"id": "a"}, {"query": "x"}]})
+    )
+    problems = validate_config(config)
+    assert "system_design niet gevonden: reference/system_design.md" in problems
+    assert "prompt zonder id in prompts/search_prompts.yaml" in problems
+    assert "dubbele prompt-ids: a" in problems
+
+
+def test_state_path_adds_topic():
+    config = {"paths": {"state_dir": "state"}}
+    assert state_path(config, "seen_index.json") == "state/seen_index.json"
+    assert state_path(config, "seen_index.json", "mcp") == "state/seen_index-mcp.json"
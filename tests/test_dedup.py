@@ -0,0 +1,155 @@
+"""Tests for src/dedup.py — pure logic plus a JSON index in tmp_path."""
+
+from src.dedup import (
+    SeenIndex,
+    filter_seen,
+    normalize_url,
+    split_articles,
+    title_fingerprint,
+)
+
+
+RAW_OUTPUT = """TITEL: Claude Code Hooks: a Guide
+AUTEUR: Jan
+BRON: example.com
+URL: https://www.example.com/hooks/?utm_source=x
+DATUM: 2026-02-20
+INZICHT: Hooks zijn handig.
+RELEVANTIE: 4
+---
+TITEL: Nieuw artikel over skills
+AUTEUR: Piet
+BRON: blog.dev
+URL: https://blog.dev/skills
+DATUM: 2026-02-26
+INZICHT: Skills zijn ook handig.
+RELEVANTIE: 5
+---
+
+GEVERIFIEERDE BRONNEN:
+- [Hooks guide](https://example.com/hooks)
+- [Skills](https://blog.dev/skills)"""
+
+
+def _result(raw_output=RAW_OUTPUT, sources=None):
+    return {
+        "id": "p1",
+        "name": "P1",
+        "raw_output": raw_output,
+        "sources": sources if sources is not None else {
+            "https://example.com/hooks": "Hooks guide",
+            "https://blog.dev/skills": "Skills",
+        },
+    }
+
+
+# --- normalisatie ---
+
+def test_normalize_url_strips_noise():
+    assert normalize_url("http://WWW.Example.com/a/?utm_source=x&b=2#top") == (
+        "https://example.com/a?b=2"
+    )
+    assert normalize_url("https://example.com/a") == normalize_url(
+        "https://example.com/a/"
+    )
+
+
+def test_title_fingerprint_ignores_order_case_and_stopwords():
+    assert title_fingerprint("Claude Code Hooks: a Guide") == title_fingerprint(
+        "A guide to claude code HOOKS"
+    )
+    assert title_fingerprint("Claude Code hooks") != title_fingerprint(
+        "Claude Code skills"
+    )
+    assert title_fingerprint("Hooks guide") == ""
+
+
+def test_split_articles():
+    blocks, sources = split_articles(RAW_OUTPUT)
+    assert len(blocks) == 2
+    assert "Hooks guide" in sources
+
+
+# --- SeenIndex ---
+
+def test_index_roundtrip(tmp_path):
+    index = SeenIndex(str(tmp_path / "seen.json"))
+    index.add("https://example.com/a", "Subagents in Claude Code", "rapport-1.md")
+    index.save()
+
+    reopened = SeenIndex(str(tmp_path / "seen.json"))
+    assert reopened.seen("https://www.example.com/a/", None)
+    assert reopened.seen(None, "claude code subagents")
+    assert not reopened.seen("https://example.com/b", "Skills in Claude Code")
+
+
+def test_update_from_reports_is_incremental(tmp_path):
+    reports = tmp_path / "reports"
+    reports.mkdir()
+    (reports / "rapport-2026-02-20.md").write_text(
+        "**Bron:** [Claude Code hooks guide](https://example.com/hooks) "
+        "en https://x.org/y"
+    )
+    index = SeenIndex(str(tmp_path / "seen.json"))
+    assert index.update_from_reports([str(reports)]) == 1
+    assert index.update_from_reports([str(reports)]) == 0
+    assert index.seen("https://x.org/y", None)
+    assert index.seen(None, "Guide: Claude Code Hooks")
+
+
+def test_update_from_reports_skips_the_current_report(tmp_path):
+    (tmp_path / "rapport-2026-03-06.md").write_text("[Oud](https://old.com/x)")
+    index = SeenIndex(str(tmp_path / "seen.json"))
+    skip = {"rapport-2026-03-06.md"}
+    assert index.update_from_reports([str(tmp_path)], skip=skip) == 0
+    assert not index.seen("https://old.com/x", None)
+    assert index.update_from_reports([str(tmp_path)]) == 1
+
+
+# --- filter_seen ---
+
+def test_filter_seen_removes_known_articles_and_sources(tmp_path):
+    index = SeenIndex(str(tmp_path / "seen.json"))
+    index.add("https://example.com/hooks", None, "rapport-2026-02-20.md")
+
+    filtered, removed = filter_seen([_result()], index, "run-2")
+    assert removed == 1
+    raw = filtered[0]["raw_output"]
+    assert "Hooks: a Guide" not in raw
+    assert "Nieuw artikel over skills" in raw
+    assert filtered[0]["sources"] == {"https://blog.dev/skills": "Skills"}
+    assert "https://example.com/hooks" not in raw
+
+
+def test_filter_seen_by_near_duplicate_title(tmp_path):
+    index = SeenIndex(str(tmp_path / "seen.json"))
+    index.add(None, "A guide to Claude Code hooks", "rapport-2026-02-20.md")
+    filtered, removed = filter_seen([_result()], index, "run-2")
+    assert removed == 1
+
+
+def test_filter_seen_everything_known_becomes_geen_resultaten(tmp_path):
+    index = SeenIndex(str(tmp_path / "seen.json"))
+    index.add("https://example.com/hooks", None, "old")
+    index.add("https://blog.dev/skills", None, "old")
+    filtered, removed = filter_seen([_result()], index, "run-2")
+    assert removed == 2
+    assert filtered[0]["raw_output"] == "GEEN RESULTATEN"
+
+
+def test_filter_seen_ignores_own_run(tmp_path):
+    index = SeenIndex(str(tmp_path / "seen.json"))
+    index.add_search_results([_result()], "run-1")
+    filtered, removed = filter_seen([_result()], index, "run-1")
+    assert removed == 0
+    assert "Claude Code Hooks: a Guide" in filtered[0]["raw_output"]
+    assert "Nieuw artikel over skills" in filtered[0]["raw_output"]
+    assert len(filtered[0]["sources"]) == 2
+
+
+def test_filter_seen_passes_unstructured_output_through(tmp_path):
+    index = SeenIndex(str(tmp_path / "seen.json"))
+    result = _result("Vrije tekst zonder velden", sources={})
+    filtered, removed = filter_seen([result], index)
+    assert filtered == [result]
+    assert removed == 0
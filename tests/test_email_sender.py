@@ -2,7 +2,7 @@
 
 from unittest.mock import patch, MagicMock
 
-from src.email_sender import send_report
+from src.email_sender import build_message, send_messages, send_report
 
 
 @patch("src.email_sender.resend")
@@ -35,3 +35,18 @@ def test_send_report_failure(mock_resend):
         report_markdown="text",
     )
     assert result is False
+
+
+@patch("src.email_sender.resend")
+def test_send_messages_uses_batch_for_several(mock_resend):
+    mock_resend.Batch.send.return_value = {"data": [{"id": "e1"}, {"id": "e2"}]}
+    messages = [
+        build_message("a@b.com", "c@d.com", "[X]", "een"),
+        build_message("a@b.com", ["e@f.com", "g@h.com"], "[X]", "twee"),
+    ]
+    ids = send_messages("key", messages, idempotency_key="run-1")
+    assert ids == ["e1", "e2"]
+    mock_resend.Emails.send.assert_not_called()
+    sent, options = mock_resend.Batch.send.call_args[0]
+    assert sent[1]["to"] == ["e@f.com", "g@h.com"]
+    assert options == {"idempotency_key": "run-1"}
@@ -0,0 +1,103 @@
+"""Tests for src/history.py — kolomopslag en aggregaties van artikelen."""
+
+import time
+from datetime import date, timedelta
+
+from src.history import ArticleHistory, create_history, week_label
+
+
+def _result(prompt_id, *articles, sources=()):
+    raw = "".join(
+        f"TITEL: {url}\nURL: {url}\nRELEVANTIE: {relevance}\n---\n"
+        for url, relevance in articles
+    )
+    return {
+        "id": prompt_id,
+        "name": prompt_id,
+        "raw_output": raw or "GEEN RESULTATEN",
+        "sources": {url: url for url in sources},
+    }
+
+
+def test_add_results_and_reload(tmp_path):
+    history = ArticleHistory(str(tmp_path / "h"))
+    added = history.add_results("run-1", date(2026, 3, 6), [
+        _result(
+            "hooks", ("https://www.a.com/x?utm_source=y", 4), ("https://b.io/y", 2),
+            sources=["https://a.com/x"],
+        ),
+        _result("mcp"),
+        {"id": "kapot", "name": "kapot", "raw_output": "FOUT: time-out"},
+    ])
+    assert added == 3
+    history.save()
+
+    history = ArticleHistory(str(tmp_path / "h"))
+    assert len(history) == 3
+    assert history.strings["urls"].values[1:] == ["https://a.com/x", "https://b.io/y"]
+    assert list(history.columns["relevance"]) == [4, 2, -1]
+    assert list(history.columns["verified"]) == [1, 0, 0]
+    # Hervatte run: prompts die er al staan worden niet dubbel geteld
+    assert history.add_results("run-1", date(2026, 3, 6), [_result("mcp")]) == 0
+
+
+def test_interrupted_save_drops_partial_rows(tmp_path):
+    history = ArticleHistory(str(tmp_path))
+    history.add_results(
+        "run-1", date(2026, 3, 6), [_result("hooks", ("https://a.com", 3))]
+    )
+    history.save()
+    with open(tmp_path / "run.bin", "ab") as f:
+        f.write(b"\x01\x00\x00\x00")
+    assert len(ArticleHistory(str(tmp_path))) == 1
+
+
+def test_aggregations(tmp_path):
+    history = ArticleHistory(str(tmp_path))
+    history.add_results("run-1", date(2026, 3, 6), [
+        _result("hooks", ("https://a.com/1", 4), ("https://b.com/1", 2)),
+        _result("mcp"),
+    ])
+    history.add_results("run-2", date(2026, 3, 13), [
+        _result("hooks", ("https://a.com/2", 5), ("https://c.com/1", 3)),
+        _result("mcp", ("https://d.com/1", 0)),
+    ])
+
+    assert history.hit_rate() == {
+        "hooks": {"runs": 2, "hits": 2, "articles": 4, "rate": 1.0},
+        "mcp": {"runs": 2, "hits": 0, "articles": 0, "rate": 0.0},
+    }
+    assert history.new_domains_per_week() == {"2026-W10": 2, "2026-W11": 2}
+    assert history.relevance_trend() == {
+        "hooks": {"2026-W10": 3.0, "2026-W11": 4.0},
+        "mcp": {"2026-W11": 0.0},
+    }
+
+
+def test_aggregations_over_years_are_fast(tmp_path):
+    history = ArticleHistory(str(tmp_path))
+    start = date(2016, 1, 1)
+    # Tien jaar wekelijkse runs, 21 prompts met elk 5 artikelen
+    for week in range(520):
+        day = start + timedelta(weeks=week)
+        for prompt in range(21):
+            for i in range(5):
+                history.append(
+                    f"run-{week}", f"p{prompt}", day,
+                    f"https://d{(week + i) % 300}.com/{week}-{prompt}-{i}", i,
+                )
+    history.save()
+    history = ArticleHistory(str(tmp_path))
+    assert len(history) == 520 * 21 * 5
+
+    begin = time.perf_counter()
+    history.hit_rate()
+    history.new_domains_per_week()
+    history.relevance_trend()
+    assert time.perf_counter() - begin < 1
+
+
+def test_create_history_and_week_label(tmp_path):
+    assert create_history({"enabled": False}, str(tmp_path)) is None
+    assert isinstance(create_history({}, str(tmp_path / "h")), ArticleHistory)
+    assert week_label(date(2026, 1, 1).toordinal()) == "2026-W01"
@@ -1,8 +1,10 @@
-"""Tests for main.py — file I/O helpers."""
+"""Tests for main.py — config, pipeline-helpers en een volledige run."""
 
+import json
 from pathlib import Path
 
-from main import load_config, load_prompts, load_text_file, save_report
+from src.config import load_config, load_prompts, load_text_file
+from src.pipeline import save_report
 
 
 def test_load_config(tmp_path):
@@ -36,3 +38,225 @@ def test_save_report(tmp_path):
     assert report_path.exists()
     assert report_path.read_text() == "# Test Report"
     assert "rapport-" in report_path.name
+
+
+def test_save_report_renames_complete_partial(tmp_path):
+    from src.pipeline import PartialReport
+
+    partial = PartialReport(str(tmp_path))
+    partial.write("# Test ")
+    partial.write("Report")
+    partial.close()
+    assert partial.path.read_text() == "# Test Report"
+
+    report_path = save_report(str(tmp_path), "# Test Report", partial.path)
+    assert report_path.read_text() == "# Test Report"
+    assert not partial.path.exists()
+
+
+def test_save_report_replaces_incomplete_partial(tmp_path):
+    from src.pipeline import PartialReport
+
+    partial = PartialReport(str(tmp_path))
+    partial.write("# Half")
+    partial.close()
+
+    report_path = save_report(str(tmp_path), "# Volledig rapport", partial.path)
+    assert report_path.read_text() == "# Volledig rapport"
+    assert not partial.path.exists()
+    assert list(tmp_path.iterdir()) == [report_path]
+
+
+# --- onderwerpen ---
+
+def _config(**extra):
+    return {
+        "paths": {
+            "prompts": "prompts/search_prompts.yaml",
+            "system_design": "reference/system_design.md",
+            "current_setup": "reference/current_setup.md",
+            "source_weights": "reference/source_weights.yaml",
+            "reports_dir": "reports",
+            "publications_dir": "publications",
+        },
+        "email": {"to_address": "me@example.com", "subject_prefix": "[Scout]"},
+        **extra,
+    }
+
+
+def test_load_topics_without_topics_is_single_unnamed_topic():
+    from src.config import load_topics
+
+    [topic] = load_topics(_config())
+    assert topic["name"] == ""
+    assert topic["prompts"] == "prompts/search_prompts.yaml"
+    assert topic["reports_dir"] == "reports"
+    assert topic["to_address"] == "me@example.com"
+
+
+def test_load_topics_falls_back_to_paths_and_email():
+    from src.config import load_topics
+
+    topics = load_topics(_config(topics=[
+        {"name": "claude-code"},
+        {
+            "name": "mcp",
+            "prompts": "prompts/mcp.yaml",
+            "system_design": "reference/mcp.md",
+            "to_address": "team@example.com",
+        },
+    ]))
+    code, mcp = topics
+    assert code["prompts"] == "prompts/search_prompts.yaml"
+    assert code["reports_dir"] == str(Path("reports") / "claude-code")
+    assert code["publications_dir"] == str(Path("publications") / "claude-code")
+    assert mcp["prompts"] == "prompts/mcp.yaml"
+    assert mcp["system_design"] == "reference/mcp.md"
+    assert mcp["current_setup"] == "reference/current_setup.md"
+    assert mcp["to_address"] == "team@example.com"
+    assert mcp["subject_prefix"] == "[Scout]"
+
+
+def test_load_topics_rejects_bad_and_duplicate_names():
+    import pytest
+    from src.config import load_topics
+
+    with pytest.raises(SystemExit):
+        load_topics(_config(topics=[{"name": "Met Spatie"}]))
+    with pytest.raises(SystemExit):
+        load_topics(_config(topics=[{"name": "a"}, {"name": "a"}]))
+
+
+def test_main_runs_topics_through_one_scheduler(tmp_path, monkeypatch):
+    import resend
+    import yaml
+
+    import main
+    from tests.fake_anthropic import FakeAnthropicServer, make_message
+
+    def responder(params):
+        if params.get("tools"):
+            query = params["messages"][-1]["content"].split("\n")[0]
+            url = f"https://example.com/{query}"
+            return make_message(
+                f"TITEL: Artikel over {query} met details\n"
+                f"URL: {url}\nRELEVANTIE: 4\n---",
+                sources={url: f"Artikel over {query}"},
+            )
+        return make_message("# Rapport")
+
+    for topic in ("code", "mcp"):
+        (tmp_path / f"{topic}.yaml").write_text(yaml.safe_dump({
+            "base_instruction": "base",
+            "output_format": "fmt",
+            "prompts": [
+                {"id": f"p{i}", "name": f"P{i}", "query": f"{topic}{i}"}
+                for i in range(3)
+            ],
+        }))
+        (tmp_path / f"{topic}.md").write_text(f"ontwerp {topic}")
+    (tmp_path / "weights.yaml").write_text("sources: []\n")
+    config = _config(
+        anthropic={"api_key": "test", "model": "m"},
+        search={"delay_between_calls": 0, "max_concurrent": 1},
+        analysis={"stream": False},
+        cache={"enabled": False},
+        topics=[
+            {"name": "code", "prompts": "code.yaml", "to_address": "a@example.com"},
+            {"name": "mcp", "prompts": "mcp.yaml", "to_address": "b@example.com"},
+        ],
+    )
+    config["email"].update({"resend_api_key": "k", "from_address": "s@example.com"})
+    config["paths"].update({
+        "system_design": "code.md",
+        "current_setup": "mcp.md",
+        "source_weights": "weights.yaml",
+        "runs_dir": "runs",
+        "state_dir": "state",
+    })
+    (tmp_path / "config.yaml").write_text(yaml.safe_dump(config))
+
+    with FakeAnthropicServer(responder) as server:
+        monkeypatch.chdir(tmp_path)
+        monkeypatch.setenv("ANTHROPIC_BASE_URL", server.url)
+        monkeypatch.setattr(resend, "api_url", server.url)
+        main.main([])
+        requests_after_first_run = len(server.requests)
+        # Tweede run op dezelfde dag: alle vensters zijn leeg
+        main.main([])
+        assert not [
+            body for method, path, body in server.requests[requests_after_first_run:]
+            if path == "/v1/messages" and body.get("tools")
+        ]
+
+    searches = [
+        body["messages"][-1]["content"].split("\n")[0]
+        for method, path, body in server.requests
+        if path == "/v1/messages" and body.get("tools")
+    ]
+    # De analyse krijgt de geverifieerde bronnen waaruit ze mag citeren
+    [analysis] = [
+        json.dumps(body, ensure_ascii=False)
+        for method, path, body in server.requests
+        if path == "/v1/messages" and not body.get("tools")
+        and "code0" in json.dumps(body)
+    ]
+    assert (
+        "GEVERIFIEERDE BRONNEN:\\n- [Artikel over code0](https://example.com/code0)"
+        in analysis
+    )
+    # Om en om ingepland door één scheduler
+    assert searches == ["code0", "mcp0", "code1", "mcp1", "code2", "mcp2"]
+    assert sorted(email["to"][0] for email in server.emails) == [
+        "a@example.com", "b@example.com",
+    ]
+    assert all(email["html"].startswith("<!DOCTYPE html>") for email in server.emails)
+    for topic in ("code", "mcp"):
+        assert list((tmp_path / "reports" / topic).glob("rapport-*.md"))
+        run_dirs = sorted((tmp_path / "runs").iterdir())
+        manifest = json.loads((run_dirs[0] / topic / "manifest.json").read_text())
+        assert manifest["stages"]["email"]["status"] == "done"
+        assert not list((tmp_path / "outbox").glob("*.json"))
+    assert (run_dirs[0] / "metrics.json").exists()
+    assert (tmp_path / "state" / "seen_index-code.json").exists()
+    assert (tmp_path / "state" / "watermarks-mcp.json").exists()
+    # Beide onderwerpen leren in dezelfde (gedeelde) bronnenlijst, maar het
+    # geleerde staat in de state-map
+    assert (tmp_path / "weights.yaml").read_text() == "sources: []\n"
+    weights = yaml.safe_load(
+        (tmp_path / "state" / "weights-learned.yaml").read_text()
+    )
+    assert weights["sources"][0]["domain"] == "example.com"
+    assert weights["sources"][0]["seen_count"] == 2
+
+
+def test_learn_source_weights_from_citations(tmp_path):
+    from src.pipeline import learn_source_weights
+    from src.run_store import RunStore
+    from src.source_manager import SourceWeights
+
+    path = tmp_path / "weights.yaml"
+    path.write_text("sources: []\ndefault_weight: 5\n")
+    run = RunStore(str(tmp_path / "runs"), "2026-03-06-210000")
+    results = [{
+        "id": "p0",
+        "raw_output": "...",
+        "sources": {
+            "https://www.a.com/x": "X",
+            "https://b.com/y?utm_source=z": "Y",
+        },
+    }]
+    report = "**Bron:** [X](https://a.com/x) en https://c.com/niet-geverifieerd"
+
+    learned = tmp_path / "state" / "weights-learned.yaml"
+    learn_source_weights({}, str(path), str(learned), run, results, report)
+    learn_source_weights({}, str(path), str(learned), run, results, report)
+
+    assert path.read_text() == "sources: []\ndefault_weight: 5\n"
+    weights = SourceWeights.load(str(path), str(learned))
+    assert weights.get_weights(["a.com", "b.com", "c.com"]) == {
+        "a.com": 5.5, "b.com": 5, "c.com": 5,
+    }
+    assert weights.get("a.com")["cited_count"] == 1
+    assert weights.get("b.com")["seen_count"] == 1
+    assert weights.learned_runs == ["2026-03-06-210000"]
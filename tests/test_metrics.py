@@ -0,0 +1,126 @@
+"""Tests for src/metrics.py — call records, aggregates and the run report."""
+
+import json
+import threading
+from types import SimpleNamespace
+
+import pytest
+
+from src import metrics
+from src.metrics import Metrics, percentile
+
+
+def _usage(**kwargs):
+    values = {
+        "input_tokens": 0,
+        "output_tokens": 0,
+        "cache_read_input_tokens": 0,
+        "cache_creation_input_tokens": 0,
+        "server_tool_use": None,
+    }
+    values.update(kwargs)
+    return SimpleNamespace(**values)
+
+
+def test_percentile_nearest_rank():
+    values = [5.0, 1.0, 3.0, 2.0, 4.0]
+    assert percentile(values, 50) == 3.0
+    assert percentile(values, 95) == 5.0
+    assert percentile([], 50) == 0.0
+
+
+def test_track_records_usage_and_counters():
+    m = Metrics()
+    with m.track("search", "p1") as record:
+        metrics.add_usage(_usage(
+            input_tokens=100,
+            output_tokens=20,
+            cache_read_input_tokens=80,
+            server_tool_use=SimpleNamespace(web_search_requests=3),
+        ))
+        metrics.add("retries", 1)
+        record["bytes_returned"] = 42
+
+    [call] = m.calls
+    assert call["stage"] == "search"
+    assert call["label"] == "p1"
+    assert call["input_tokens"] == 100
+    assert call["cache_read_input_tokens"] == 80
+    assert call["web_searches"] == 3
+    assert call["retries"] == 1
+    assert call["bytes_returned"] == 42
+    assert call["wall_time"] >= 0
+    assert metrics.current_record() is None
+
+
+def test_add_outside_track_is_ignored():
+    metrics.add("retries", 1)
+    metrics.add_usage(_usage(input_tokens=5))
+    assert metrics.current_record() is None
+
+
+def test_track_records_errors_and_reraises():
+    m = Metrics()
+    with pytest.raises(RuntimeError):
+        with m.track("analyze", "rapport"):
+            raise RuntimeError("kapot")
+    assert m.calls[0]["error"] == "kapot"
+    assert m.summary()["stages"]["analyze"]["errors"] == 1
+
+
+def test_records_are_per_thread():
+    m = Metrics()
+
+    def worker(label, tokens):
+        with m.track("search", label):
+            metrics.add("input_tokens", tokens)
+
+    threads = [
+        threading.Thread(target=worker, args=(f"p{i}", i)) for i in range(1, 5)
+    ]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    by_label = {c["label"]: c["input_tokens"] for c in m.calls}
+    assert by_label == {"p1": 1, "p2": 2, "p3": 3, "p4": 4}
+
+
+def test_summary_aggregates_by_stage_and_label():
+    m = Metrics()
+    for label in ("p1", "p1", "p2"):
+        with m.track("search", label):
+            metrics.add("output_tokens", 10)
+    with m.track("email", "resend"):
+        pass
+
+    summary = m.summary()
+    assert summary["stages"]["search"]["calls"] == 3
+    assert summary["stages"]["search"]["output_tokens"] == 30
+    assert summary["labels"]["search/p1"]["calls"] == 2
+    assert summary["labels"]["email/resend"]["output_tokens"] == 0
+
+
+def test_write_json_and_summary_table(tmp_path):
+    m = Metrics()
+    with m.track("search", "hooks"):
+        metrics.add("input_tokens", 1234)
+
+    path = tmp_path / "run" / "metrics.json"
+    m.write_json(str(path))
+    data = json.loads(path.read_text(encoding="utf-8"))
+    assert data["calls"][0]["label"] == "hooks"
+    assert data["summary"]["stages"]["search"]["input_tokens"] == 1234
+
+    table = m.summary_table()
+    assert "search/hooks" in table
+    assert "1234" in table
+
+
+def test_reset_clears_calls():
+    m = Metrics()
+    with m.track("search", "p1"):
+        pass
+    m.reset()
+    assert m.calls == []
@@ -0,0 +1,133 @@
+"""Tests for src/outbox.py — outbox in tmp_path, Resend via de nep-server."""
+
+import pytest
+import resend
+
+from src.email_sender import build_message
+from src.outbox import Outbox, OutboxWorker
+from tests.fake_anthropic import FakeAnthropicServer
+
+
+@pytest.fixture
+def server(monkeypatch):
+    with FakeAnthropicServer() as server:
+        monkeypatch.setattr(resend, "api_url", server.url)
+        yield server
+
+
+def _message(to="me@example.com", text="# Rapport"):
+    return build_message("scout@example.com", to, "[Test]", text)
+
+
+def test_enqueue_and_pending(tmp_path):
+    outbox = Outbox(str(tmp_path / "outbox"))
+    assert outbox.pending() == []
+    assert outbox.enqueue("run-1", _message(), run_id="run-1")
+    assert outbox.enqueue("run-2", _message(text="ander"))
+    pending = outbox.pending()
+    assert [entry["id"] for entry in pending] == ["run-1", "run-2"]
+    assert pending[0]["run_id"] == "run-1"
+    assert pending[0]["message"]["to"] == ["me@example.com"]
+
+
+def test_sent_message_is_not_queued_again(tmp_path):
+    outbox = Outbox(str(tmp_path))
+    outbox.enqueue("run-1", _message())
+    outbox.mark_sent(outbox.pending()[0], "email_1")
+    assert outbox.pending() == []
+    assert (tmp_path / "sent" / "run-1.json").exists()
+    assert outbox.enqueue("run-1", _message()) is False
+    assert outbox.pending() == []
+
+
+def test_send_pending_batches_into_one_call(tmp_path, server):
+    outbox = Outbox(str(tmp_path))
+    outbox.enqueue("a", _message(to="a@example.com"))
+    outbox.enqueue("b", _message(to=["b@example.com", "c@example.com"]))
+
+    sent, error = outbox.send_pending("key")
+
+    assert error is None
+    assert [entry["email_id"] for entry in sent] == ["email_0001", "email_0002"]
+    email_posts = [path for _, path, _ in server.requests if path.startswith("/emails")]
+    assert email_posts == ["/emails/batch"]
+    assert server.emails[1]["to"] == ["b@example.com", "c@example.com"]
+    assert outbox.pending() == []
+
+
+def test_idempotency_key_differs_for_long_shared_prefixes(tmp_path, monkeypatch):
+    keys = []
+
+    def fake_send(api_key, messages, idempotency_key=None):
+        keys.append(idempotency_key)
+        return [f"email_{i}" for i in range(len(messages))]
+
+    monkeypatch.setattr("src.outbox.send_messages", fake_send)
+    # Samen ruim boven 256 tekens; alleen het laatste bericht verschilt
+    shared = [f"run-2026-03-06T08-00-00-onderwerp-{i:02d}" for i in range(8)]
+    for last in ("zz-a", "zz-b"):
+        outbox = Outbox(str(tmp_path / last))
+        for message_id in [*shared, last]:
+            outbox.enqueue(message_id, _message())
+        outbox.send_pending("key")
+
+    assert keys[0] != keys[1]
+    assert all(len(key) == 64 for key in keys)
+
+
+def test_failed_send_stays_pending(tmp_path, monkeypatch):
+    with FakeAnthropicServer(email_failures=1) as server:
+        monkeypatch.setattr(resend, "api_url", server.url)
+        outbox = Outbox(str(tmp_path))
+        outbox.enqueue("a", _message())
+
+        sent, error = outbox.send_pending("key")
+        assert sent == [] and error is not None
+        entry = outbox.pending()[0]
+        assert entry["attempts"] == 1
+        assert entry["last_error"]
+
+        sent, error = outbox.send_pending("key")
+        assert error is None and len(server.emails) == 1
+
+
+def test_worker_retries_until_sent(tmp_path, monkeypatch):
+    with FakeAnthropicServer(email_failures=2) as server:
+        monkeypatch.setattr(resend, "api_url", server.url)
+        delivered = []
+        sleeps = []
+        worker = OutboxWorker(
+            Outbox(str(tmp_path)), "key", on_sent=delivered.append,
+            sleep=sleeps.append,
+        )
+        worker.start()
+        worker.submit("a", _message(), run_id="run-1")
+        assert worker.stop(timeout=5) == []
+
+    assert len(sleeps) == 2 and sleeps[0] < sleeps[1]
+    assert len(server.emails) == 1
+    assert delivered[0]["run_id"] == "run-1"
+    assert delivered[0]["email_id"] == "email_0001"
+
+
+def test_worker_leaves_messages_after_max_retries(tmp_path, monkeypatch):
+    with FakeAnthropicServer(email_failures=100) as server:
+        monkeypatch.setattr(resend, "api_url", server.url)
+        worker = OutboxWorker(
+            Outbox(str(tmp_path)), "key", max_retries=1, sleep=lambda s: None
+        )
+        worker.start()
+        worker.submit("a", _message())
+        left = worker.stop(timeout=5)
+    assert [entry["id"] for entry in left] == ["a"]
+
+
+def test_next_worker_drains_leftovers(tmp_path, server):
+    Outbox(str(tmp_path)).enqueue("vorige-run", _message())
+
+    delivered = []
+    worker = OutboxWorker(Outbox(str(tmp_path)), "key", on_sent=delivered.append)
+    worker.start()
+    assert worker.stop(timeout=5) == []
+    assert [entry["id"] for entry in delivered] == ["vorige-run"]
+    assert len(server.emails) == 1
@@ -0,0 +1,82 @@
+"""Tests for src/ranking.py — scoring, budget packing and the appendix."""
+
+from src.articles import Article, parse_articles
+from src.ranking import APPENDIX_HEADING, article_score, format_appendix, rank_articles
+from src.source_manager import SourceWeights
+
+WEIGHTS = SourceWeights(
+    [{"domain": "docs.anthropic.com", "weight": 8},
+     {"domain": "medium.com", "weight": 2}],
+    default_weight=5,
+)
+
+
+def _article(title, url, relevance, insight=""):
+    return Article(title=title, url=url, relevance=relevance, insight=insight)
+
+
+def _result(id, *articles):
+    return {
+        "id": id,
+        "name": id.upper(),
+        "raw_output": "\n---\n".join(a.to_text() for a in articles) + "\n---",
+        "sources": {a.url: a.title for a in articles},
+    }
+
+
+def test_article_score_combines_relevance_and_domain_weight():
+    assert article_score(
+        _article("A", "https://www.docs.anthropic.com/x", 4), WEIGHTS
+    ) == 32
+    assert article_score(_article("B", "https://onbekend.nl/y", 3), WEIGHTS) == 15
+
+
+def test_rank_articles_keeps_everything_within_budget():
+    results = [_result("a", _article("A", "https://medium.com/a", 3))]
+    ranked, dropped = rank_articles(results, WEIGHTS, token_budget=10_000)
+    assert dropped == []
+    assert parse_articles(ranked[0]["raw_output"]) == parse_articles(
+        results[0]["raw_output"]
+    )
+
+
+def test_rank_articles_drops_lowest_value_and_keeps_order():
+    filler = "x" * 400  # ~100 tokens per artikel
+    best = _article("Best", "https://docs.anthropic.com/1", 5, filler)
+    weak = _article("Zwak", "https://medium.com/2", 2, filler)
+    good = _article("Goed", "https://onbekend.nl/3", 4, filler)
+    results = [_result("a", weak, best), _result("b", good)]
+
+    ranked, dropped = rank_articles(results, WEIGHTS, token_budget=300)
+
+    assert [(a.title, score) for a, score in dropped] == [("Zwak", 4)]
+    assert [r["id"] for r in ranked] == ["a", "b"]
+    assert [a.title for a in parse_articles(ranked[0]["raw_output"])] == ["Best"]
+    assert [a.title for a in parse_articles(ranked[1]["raw_output"])] == ["Goed"]
+    # De bronnensectie houdt alleen de bronnen van de overgebleven artikelen
+    assert ranked[0]["sources"] == {"https://docs.anthropic.com/1": "Best"}
+    assert ranked[0]["raw_output"].endswith(
+        "GEVERIFIEERDE BRONNEN:\n- [Best](https://docs.anthropic.com/1)"
+    )
+
+
+def test_rank_articles_removes_results_without_articles():
+    filler = "x" * 2000
+    results = [
+        _result("a", _article("Groot", "https://medium.com/1", 1, filler)),
+        _result("b", _article("Klein", "https://docs.anthropic.com/2", 5)),
+    ]
+    ranked, dropped = rank_articles(results, WEIGHTS, token_budget=100)
+    assert [r["id"] for r in ranked] == ["b"]
+    assert [a.title for a, _ in dropped] == ["Groot"]
+
+
+def test_format_appendix_lists_dropped_articles():
+    assert format_appendix([]) == ""
+    appendix = format_appendix([(_article("A", "https://a.com", 2), 10)])
+    assert APPENDIX_HEADING in appendix
+    assert "- [A](https://a.com) — score 10.0" in appendix
+    appendix = format_appendix(
+        [(_article("B", "https://b.com", 2), 21.299999999999997)]
+    )
+    assert "- [B](https://b.com) — score 21.3\n" in appendix + "\n"
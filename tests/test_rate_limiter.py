@@ -0,0 +1,175 @@
+"""Tests for src/rate_limiter.py — fake clock, no real sleeping."""
+
+from unittest.mock import MagicMock
+
+import anthropic
+import pytest
+
+from src.rate_limiter import (
+    RateLimiter,
+    create_message,
+    create_rate_limiter,
+    estimate_tokens,
+)
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+        self.sleeps = []
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+def _limiter(rpm=60, itpm=6000, otpm=6000):
+    clock = FakeClock()
+    limiter = RateLimiter(rpm, itpm, otpm, clock=clock, sleep=clock.sleep)
+    return limiter, clock
+
+
+# --- RateLimiter ---
+
+def test_acquire_within_budget_does_not_wait():
+    limiter, clock = _limiter()
+    assert limiter.acquire(100, 100) == 0
+    assert clock.sleeps == []
+
+
+def test_acquire_waits_for_request_bucket():
+    limiter, clock = _limiter(rpm=2)
+    limiter.acquire(1, 1)
+    limiter.acquire(1, 1)
+    waited = limiter.acquire(1, 1)
+    # 2 rpm = één request per 30 seconden
+    assert waited == pytest.approx(30)
+
+
+def test_acquire_waits_for_output_tokens():
+    limiter, clock = _limiter(otpm=6000)
+    limiter.acquire(1, 6000)
+    waited = limiter.acquire(1, 3000)
+    assert waited == pytest.approx(30)
+
+
+def test_oversized_request_passes_when_bucket_full():
+    limiter, clock = _limiter(itpm=1000)
+    assert limiter.acquire(5000, 1) == 0
+
+
+def test_record_usage_debits_actual_tokens():
+    limiter, clock = _limiter(itpm=6000)
+    limiter.acquire(100, 10)
+    usage = MagicMock(
+        input_tokens=3100, cache_creation_input_tokens=0, output_tokens=10
+    )
+    limiter.record_usage(100, 10, usage)
+    assert limiter.buckets["input_tokens"].tokens == pytest.approx(2900)
+
+
+def test_update_from_headers_sets_limits_and_remaining():
+    limiter, clock = _limiter()
+    limiter.update_from_headers({
+        "anthropic-ratelimit-requests-limit": "1000",
+        "anthropic-ratelimit-requests-remaining": "5",
+        "anthropic-ratelimit-input-tokens-limit": "400000",
+    })
+    assert limiter.buckets["requests"].capacity == 1000
+    assert limiter.buckets["requests"].tokens == 5
+    assert limiter.buckets["input_tokens"].capacity == 400000
+
+
+def test_retry_after_blocks_next_acquire():
+    limiter, clock = _limiter()
+    limiter.update_from_headers({"retry-after": "12"})
+    assert limiter.acquire(1, 1) == pytest.approx(12)
+
+
+def test_create_rate_limiter_from_config():
+    assert create_rate_limiter(None) is None
+    limiter = create_rate_limiter({"requests_per_minute": 10})
+    assert limiter.buckets["requests"].capacity == 10
+
+
+def test_estimate_tokens():
+    assert estimate_tokens("a" * 400) == 101
+
+
+# --- create_message ---
+
+def test_create_message_without_limiter_calls_create():
+    client = MagicMock()
+    create_message(client, None, model="m", max_tokens=10, messages=[])
+    client.messages.create.assert_called_once_with(
+        model="m", max_tokens=10, messages=[]
+    )
+
+
+def test_create_message_reads_headers():
+    limiter, clock = _limiter()
+    client = MagicMock()
+    raw = client.messages.with_raw_response.create.return_value
+    raw.headers = {"anthropic-ratelimit-requests-remaining": "0"}
+    raw.parse.return_value.usage = None
+
+    response = create_message(
+        client, limiter, model="m", max_tokens=10,
+        messages=[{"role": "user", "content": "hoi"}],
+    )
+    assert response is raw.parse.return_value
+    assert limiter.buckets["requests"].tokens == 0
+    client.messages.create.assert_not_called()
+
+
+def test_create_message_reads_headers_on_rate_limit_error():
+    limiter, clock = _limiter()
+    response = MagicMock(status_code=429, headers={"retry-after": "7"})
+    client = MagicMock()
+    client.messages.with_raw_response.create.side_effect = anthropic.RateLimitError(
+        "rate limited", response=response, body=None
+    )
+
+    with pytest.raises(anthropic.RateLimitError):
+        create_message(client, limiter, model="m", max_tokens=10, messages=[])
+    assert limiter.blocked_until == pytest.approx(7)
+
+
+# --- stream_message ---
+
+def _mock_stream_client(chunks):
+    client = MagicMock()
+    stream = client.messages.stream.return_value.__enter__.return_value
+    stream.text_stream = iter(chunks)
+    stream.response.headers = {"anthropic-ratelimit-requests-remaining": "3"}
+    final = stream.get_final_message.return_value
+    final.content = [MagicMock(text="".join(chunks))]
+    final.usage = MagicMock(
+        input_tokens=10, cache_creation_input_tokens=0, output_tokens=5
+    )
+    return client
+
+
+def test_stream_message_forwards_text_chunks():
+    from src.rate_limiter import stream_message
+
+    client = _mock_stream_client(["# Rap", "port"])
+    seen = []
+    response = stream_message(
+        client, None, on_text=seen.append, model="m", max_tokens=10, messages=[]
+    )
+    assert seen == ["# Rap", "port"]
+    assert response.content[0].text == "# Rapport"
+    client.messages.create.assert_not_called()
+
+
+def test_stream_message_updates_limiter():
+    from src.rate_limiter import stream_message
+
+    limiter, clock = _limiter()
+    client = _mock_stream_client(["x"])
+    stream_message(client, limiter, model="m", max_tokens=10, messages=[])
+    assert limiter.buckets["requests"].tokens == 3
@@ -0,0 +1,100 @@
+"""Tests for src/render.py — Markdown naar HTML en de render-cache."""
+
+from pathlib import Path
+
+from src.cache import ResponseCache
+from src.render import (
+    ReportRenderer,
+    content_hash,
+    markdown_to_html,
+    markdown_to_text,
+)
+
+PUBLICATIONS = Path(__file__).resolve().parent.parent / "publications"
+
+REPORT = """# Weekrapport
+
+## Hooks
+
+**Voorstel:** Gebruik een *notificatie*-hook
+**Bron:** Blog — [Hooks & meer](https://example.com/a?x=1&y=2)
+
+```bash
+echo "<klaar>"
+```
+
+1. eerste punt
+2. tweede punt
+
+- los punt met `code <x>`
+
+> citaat
+
+| Bron | Gewicht |
+|---|---|
+| **a.com** | 7 |
+
+---
+"""
+
+
+def test_markdown_to_html_blocks():
+    html = markdown_to_html(REPORT)
+    assert html.startswith("<!DOCTYPE html>")
+    assert '<h1 style="' in html and ">Weekrapport</h1>" in html
+    assert "<strong>Voorstel:</strong>" in html
+    assert "<em>notificatie</em>" in html
+    assert '<a href="https://example.com/a?x=1&amp;y=2"' in html
+    assert ">Hooks &amp; meer</a>" in html
+    # Opeenvolgende regels in één alinea met een regeleinde
+    assert "hook<br>\n<strong>Bron:</strong>" in html
+    assert "echo &quot;&lt;klaar&gt;&quot;" in html
+    assert html.count("<li ") == 3
+    assert html.count("<ol ") == 1 and html.count("<ul ") == 1
+    assert ">code &lt;x&gt;</code>" in html
+    assert "<blockquote " in html
+    assert "<strong>a.com</strong></td>" in html
+    assert "<hr " in html
+    assert "<style" not in html
+
+
+def test_markdown_to_html_only_links_safe_schemes():
+    html = markdown_to_html(
+        "[x](javascript:alert%281%29) [y](data:text/html,hi) "
+        "[z](JavaScript:void) [mail](mailto:me@example.com)"
+    )
+    # Alleen de mailto-link wordt een href; de rest blijft platte tekst
+    assert html.count("href=") == 1
+    assert "[x](javascript:alert%281%29) [y](data:text/html,hi)" in html
+    assert '<a href="mailto:me@example.com"' in html
+
+
+def test_markdown_to_text_strips_markup():
+    text = markdown_to_text(REPORT)
+    assert "Voorstel: Gebruik een notificatie-hook" in text
+    assert "Hooks & meer (https://example.com/a?x=1&y=2)" in text
+    assert 'echo "<klaar>"' in text
+    assert "```" not in text
+
+
+def test_publications_render_completely():
+    for path in PUBLICATIONS.glob("rapport-*.md"):
+        markdown = path.read_text(encoding="utf-8")
+        html = markdown_to_html(markdown)
+        assert html.count("<pre ") == markdown.count("\n```") // 2
+        assert "**" not in html.split("<pre ")[0]
+
+
+def test_renderer_caches_by_content(tmp_path):
+    renderer = ReportRenderer(ResponseCache(str(tmp_path)))
+    first = renderer.render(REPORT)
+    assert renderer.render(REPORT) is first
+    assert (renderer.hits, renderer.misses) == (1, 1)
+    assert renderer.render(REPORT + "extra") is not first
+    assert renderer.misses == 2
+
+    # Een nieuwe renderer (volgende run) leest de render van schijf
+    again = ReportRenderer(ResponseCache(str(tmp_path)))
+    assert again.render(REPORT) == first
+    assert (again.hits, again.misses) == (1, 0)
+    assert content_hash(REPORT) != content_hash(REPORT + " ")
@@ -0,0 +1,166 @@
+"""Tests for src/retry.py — error classification, jitter and retry budget."""
+
+from unittest.mock import MagicMock
+
+import anthropic
+import pytest
+
+from src.retry import (
+    RetryBudget,
+    RetryPolicy,
+    classify_error,
+    create_retry_policy,
+    retry_after,
+)
+
+
+def _status_error(status, headers=None):
+    response = MagicMock(status_code=status, headers=headers or {})
+    return anthropic.APIStatusError("fout", response=response, body=None)
+
+
+def _low_rng():
+    """rng.uniform geeft altijd de ondergrens (geen jitter)."""
+    rng = MagicMock()
+    rng.uniform.side_effect = lambda low, high: low
+    return rng
+
+
+def _high_rng():
+    rng = MagicMock()
+    rng.uniform.side_effect = lambda low, high: high
+    return rng
+
+
+# --- classificatie ---
+
+@pytest.mark.parametrize("status, kind", [
+    (429, "rate_limit"),
+    (529, "overloaded"),
+    (500, "server"),
+    (503, "server"),
+    (504, "timeout"),
+    (520, "server"),
+    (400, None),
+    (401, None),
+    (404, None),
+])
+def test_classify_status_errors(status, kind):
+    assert classify_error(_status_error(status)) == kind
+
+
+def test_classify_connection_errors():
+    request = MagicMock()
+    assert classify_error(anthropic.APITimeoutError(request=request)) == "timeout"
+    assert classify_error(
+        anthropic.APIConnectionError(request=request)
+    ) == "connection"
+    assert classify_error(ConnectionResetError()) == "connection"
+    assert classify_error(TimeoutError()) == "timeout"
+
+
+def test_plain_errors_mentioning_429_are_not_retried():
+    assert classify_error(RuntimeError("429 rate limit")) is None
+
+
+# --- retry-after ---
+
+def test_retry_after_prefers_milliseconds():
+    error = _status_error(429, {"retry-after-ms": "1500", "retry-after": "9"})
+    assert retry_after(error) == 1.5
+
+
+def test_retry_after_seconds_and_missing():
+    assert retry_after(_status_error(429, {"retry-after": "7"})) == 7
+    assert retry_after(_status_error(429)) is None
+    assert retry_after(RuntimeError("x")) is None
+
+
+def test_retry_after_http_date_in_the_past_is_zero():
+    error = _status_error(503, {"retry-after": "Wed, 21 Oct 2015 07:28:00 GMT"})
+    assert retry_after(error) == 0
+
+
+# --- wachttijden ---
+
+def test_decorrelated_jitter_bounds():
+    low = RetryPolicy(base_delay=2, max_delay=60, rng=_low_rng())
+    high = RetryPolicy(base_delay=2, max_delay=60, rng=_high_rng())
+    error = _status_error(529)
+
+    assert low.next_delay(10, error) == 2
+    assert high.next_delay(10, error) == 30
+    assert high.next_delay(100, error) == 60
+
+
+def test_retry_after_sets_minimum_delay():
+    policy = RetryPolicy(base_delay=1, max_delay=5, rng=_low_rng())
+    assert policy.next_delay(1, _status_error(429, {"retry-after": "20"})) == 20
+
+
+# --- call ---
+
+def test_call_retries_overloaded_then_succeeds():
+    sleep = MagicMock()
+    fn = MagicMock(side_effect=[_status_error(529), _status_error(500), "ok"])
+    policy = RetryPolicy(base_delay=1, rng=_low_rng(), sleep=sleep)
+
+    assert policy.call(fn, "test") == "ok"
+    assert fn.call_count == 3
+    assert sleep.call_count == 2
+
+
+def test_call_does_not_retry_client_errors():
+    sleep = MagicMock()
+    fn = MagicMock(side_effect=_status_error(400))
+    policy = RetryPolicy(sleep=sleep)
+
+    with pytest.raises(anthropic.APIStatusError):
+        policy.call(fn)
+    assert fn.call_count == 1
+    sleep.assert_not_called()
+
+
+def test_call_respects_can_retry():
+    sleep = MagicMock()
+    fn = MagicMock(side_effect=_status_error(529))
+    policy = RetryPolicy(sleep=sleep)
+
+    with pytest.raises(anthropic.APIStatusError):
+        policy.call(fn, can_retry=lambda: False)
+    assert fn.call_count == 1
+
+
+def test_budget_is_shared_and_stops_retries():
+    sleep = MagicMock()
+    budget = RetryBudget(max_retries=3, max_sleep=1000)
+    policy = RetryPolicy(
+        max_retries=5, base_delay=1, budget=budget, rng=_low_rng(), sleep=sleep
+    )
+    fn = MagicMock(side_effect=_status_error(529))
+
+    with pytest.raises(anthropic.APIStatusError):
+        policy.call(fn, "eerste")
+    assert fn.call_count == 4  # 1 poging + 3 retries uit het budget
+
+    fn.reset_mock()
+    with pytest.raises(anthropic.APIStatusError):
+        policy.call(fn, "tweede")
+    assert fn.call_count == 1
+    assert budget.retries == 3
+    assert sleep.call_count == 3
+
+
+def test_budget_limits_total_sleep():
+    budget = RetryBudget(max_retries=100, max_sleep=10)
+    assert budget.spend(6)
+    assert not budget.spend(6)
+    assert budget.slept == 6
+
+
+def test_create_retry_policy_from_config():
+    policy = create_retry_policy({"max_retries": 5, "budget_seconds": 60})
+    assert policy.max_retries == 5
+    assert policy.base_delay == 5
+    assert policy.budget.max_sleep == 60
+    assert create_retry_policy(None).budget.max_retries == 30
@@ -0,0 +1,73 @@
+"""Tests for src/run_store.py — run manifests in tmp_path."""
+
+import json
+
+import pytest
+
+from src.run_store import RunStore, is_failed_result
+
+
+def _result(id, raw_output="gevonden"):
+    return {"id": id, "name": id.upper(), "raw_output": raw_output, "sources": {}}
+
+
+def test_new_run_writes_manifest(tmp_path):
+    run = RunStore(str(tmp_path), "run-1")
+    manifest = json.loads((tmp_path / "run-1" / "manifest.json").read_text())
+    assert manifest["run_id"] == "run-1"
+    assert manifest["stages"]["search"]["status"] == "pending"
+    assert run.path == tmp_path / "run-1"
+
+
+def test_save_and_load_results(tmp_path):
+    run = RunStore(str(tmp_path), "run-1")
+    run.save_result(_result("a"))
+    run.save_result(_result("b", "FOUT: API down"))
+
+    reopened = RunStore.resume(str(tmp_path), "run-1")
+    results = reopened.load_results()
+    assert set(results) == {"a", "b"}
+    assert reopened.manifest["prompts"] == {"a": "done", "b": "failed"}
+
+
+def test_pending_prompts_skips_done_and_retries_failed(tmp_path):
+    run = RunStore(str(tmp_path), "run-1")
+    run.save_result(_result("a"))
+    run.save_result(_result("b", "FOUT: API down"))
+    prompts = [{"id": "a"}, {"id": "b"}, {"id": "c"}]
+    assert [p["id"] for p in run.pending_prompts(prompts)] == ["b", "c"]
+
+
+def test_stage_status_and_report(tmp_path):
+    run = RunStore(str(tmp_path), "run-1")
+    assert not run.stage_done("analyze")
+    run.save_report("# Rapport")
+    run.mark_stage("analyze", "done")
+
+    reopened = RunStore.resume(str(tmp_path), "run-1")
+    assert reopened.stage_done("analyze")
+    assert reopened.load_report() == "# Rapport"
+
+
+def test_resume_unknown_run_raises(tmp_path):
+    with pytest.raises(FileNotFoundError):
+        RunStore.resume(str(tmp_path), "bestaat-niet")
+
+
+def test_topics_get_their_own_directory(tmp_path):
+    code = RunStore(str(tmp_path), "run-1", "code")
+    mcp = RunStore(str(tmp_path), "run-1", "mcp")
+    code.save_result(_result("a"))
+
+    assert code.path == tmp_path / "run-1" / "code"
+    assert mcp.load_results() == {}
+    assert set(RunStore.resume(str(tmp_path), "run-1", "code").load_results()) == {
+        "a"
+    }
+    with pytest.raises(FileNotFoundError):
+        RunStore.resume(str(tmp_path), "run-1", "onbekend")
+
+
+def test_is_failed_result():
+    assert is_failed_result(_result("a", "FOUT: x"))
+    assert not is_failed_result(_result("a", "GEEN RESULTATEN"))
@@ -0,0 +1,189 @@
+"""Tests for src/scheduler.py — opbrengst, kosten en planning per prompt."""
+
+from datetime import date
+
+from src.scheduler import (
+    PromptStats,
+    Scheduler,
+    call_cost,
+    create_scheduler,
+    format_plan,
+    planned_prompts,
+)
+from src.search import build_search_request
+
+TODAY = date(2026, 3, 13)
+
+
+def _result(prompt_id, articles=0):
+    urls = [f"https://example.com/{prompt_id}/{i}" for i in range(articles)]
+    return {
+        "id": prompt_id,
+        "name": prompt_id,
+        "raw_output": "".join(
+            f"TITEL: Artikel {url}\nURL: {url}\nRELEVANTIE: 4\n---\n" for url in urls
+        ) or "GEEN RESULTATEN",
+        "sources": {url: url for url in urls},
+    }
+
+
+def _call(prompt_id, searches=5):
+    return {
+        "stage": "search", "label": prompt_id, "wall_time": 2.0,
+        "input_tokens": 10_000, "output_tokens": 1_000, "web_searches": searches,
+    }
+
+
+def _stats(tmp_path, **prompts):
+    stats = PromptStats(str(tmp_path / "prompt_stats.json"))
+    for prompt_id, fields in prompts.items():
+        stats.prompts[prompt_id] = {
+            "runs": 5, "cost": 0.10, "max_uses": 5, "last_run": "2026-03-06",
+            **fields,
+        }
+    return stats
+
+
+def test_call_cost():
+    assert call_cost(_call("p"), {}) == 0.03 + 0.015 + 0.05
+    assert call_cost({"web_searches": 2}, {"search": 0.5}) == 1.0
+
+
+def test_record_yield_cost_and_spend(tmp_path):
+    stats = PromptStats(str(tmp_path / "s.json"), smoothing=0.5)
+    prompts = [{"id": "hooks"}, {"id": "mcp", "max_uses": 2}]
+    results = [_result("hooks", 4), _result("mcp"), {
+        "id": "kapot", "name": "kapot", "raw_output": "FOUT: time-out",
+    }]
+    calls = [_call("hooks"), _call("mcp", 2), {**_call("hooks"), "stage": "analyze"}]
+    stats.record("", prompts, results, calls, "run-1", date(2026, 3, 6))
+    stats.record("", prompts, [_result("hooks", 2)], calls, "run-2", TODAY)
+    # Hervatting van run-2 telt niet dubbel
+    stats.record("", prompts, [_result("hooks", 2)], calls, "run-2", TODAY)
+    stats.save()
+
+    stats = PromptStats(str(tmp_path / "s.json"))
+    assert stats.get("", "hooks")["runs"] == 2
+    assert stats.get("", "hooks")["yield"] == 3.0
+    assert round(stats.get("", "hooks")["cost"], 3) == 0.095
+    assert stats.get("", "mcp")["yield"] == 0
+    assert stats.get("", "mcp")["max_uses"] == 2
+    assert stats.get("", "kapot") is None
+    assert round(stats.spent_since(TODAY), 3) == 0.095
+    assert round(stats.spent_since(date(2026, 3, 6)), 3) == 0.095 * 2 + 0.065
+
+
+def test_plan_tiers(tmp_path):
+    stats = _stats(
+        tmp_path,
+        zwak={"yield": 0.2},
+        oud={"yield": 0.2, "last_run": "2026-02-01"},
+        goed={"yield": 5.0},
+        gewoon={"yield": 1.5},
+    )
+    stats.prompts["nieuw"] = {"runs": 1, "yield": 0.0, "last_run": "2026-03-06"}
+    prompts = [{"id": name, "query": name} for name in
+               ("zwak", "oud", "goed", "gewoon", "nieuw", "onbekend")]
+    plan = Scheduler(stats).plan({"": prompts}, TODAY)
+
+    summary = {e["prompt"]["id"]: (e["tier"], e["run"], e["max_uses"]) for e in plan}
+    assert summary == {
+        "zwak": ("laag", False, 2),
+        "oud": ("laag", True, 2),
+        "goed": ("hoog", True, 8),
+        "gewoon": ("normaal", True, 5),
+        "nieuw": ("normaal", True, 5),
+        "onbekend": ("normaal", True, 5),
+    }
+    assert "weer op 2026-04-03" in plan[0]["reason"]
+    assert plan[2]["cost"] == 0.10 * 8 / 5
+
+    planned = planned_prompts(plan, "")
+    assert [p["id"] for p in planned] == ["oud", "goed", "gewoon", "nieuw", "onbekend"]
+    assert planned[1]["max_tokens"] == 6144
+    request = build_search_request("m", "base", "fmt", planned[0])
+    assert request["tools"][0]["max_uses"] == 2
+    assert request["max_tokens"] == 2048
+
+
+def test_plan_stays_within_weekly_budget(tmp_path):
+    stats = _stats(
+        tmp_path,
+        beste={"yield": 4.0},
+        middel={"yield": 2.0},
+        slechtste={"yield": 1.0},
+    )
+    stats.spend = {"2026-03-09": 0.05, "2026-03-01": 5.0}
+    prompts = [{"id": "slechtste"}, {"id": "middel"}, {"id": "beste"}]
+    scheduler = Scheduler(stats, weekly_budget=0.22, high_yield=10)
+    assert round(scheduler.budget_left(TODAY), 2) == 0.17
+
+    plan = {e["prompt"]["id"]: e for e in scheduler.plan({"": prompts}, TODAY)}
+    assert (plan["beste"]["tier"], plan["beste"]["run"]) == ("normaal", True)
+    assert (plan["middel"]["tier"], plan["middel"]["run"]) == ("laag", True)
+    assert "verkleind voor het weekbudget" in plan["middel"]["reason"]
+    assert plan["slechtste"]["run"] is False
+    assert "weekbudget op" in plan["slechtste"]["reason"]
+
+    table = format_plan(list(plan.values()), scheduler.budget_left(TODAY))
+    assert "slechtste" in table and "overslaan" in table
+    assert table.splitlines()[-1] == (
+        "2/3 prompts, geschat $0.14 van $0.17 weekbudget over"
+    )
+
+
+def test_record_batch_costs_per_prompt(tmp_path):
+    stats = PromptStats(str(tmp_path / "s.json"))
+    batch = {
+        "stage": "search", "label": "batch", "wall_time": 60.0,
+        "input_tokens": 20_000, "output_tokens": 2_000, "web_searches": 7,
+        "prompts": {
+            "hooks": {"input_tokens": 10_000, "output_tokens": 1_000,
+                      "web_searches": 5},
+            "mcp": {"input_tokens": 10_000, "output_tokens": 1_000,
+                    "web_searches": 2},
+        },
+    }
+    stats.record(
+        "", [{"id": "hooks"}, {"id": "mcp"}], [_result("hooks", 1), _result("mcp")],
+        [batch], "run-1", TODAY,
+    )
+    # Tokens voor de helft van de prijs, searches niet
+    assert stats.get("", "hooks")["cost"] == (0.03 + 0.015) / 2 + 0.05
+    assert stats.get("", "mcp")["web_searches"] == 2
+    assert "latency" not in stats.get("", "hooks")
+    assert round(stats.spent_since(TODAY), 4) == 0.045 + 0.07
+
+
+def test_record_charges_each_topic_only_its_own_calls(tmp_path):
+    stats = PromptStats(str(tmp_path / "s.json"))
+    calls = [
+        {**_call("hooks"), "topic": "a"},
+        {**_call("hooks", 1), "topic": "b"},
+        {"stage": "search", "label": "batch", "prompts": {
+            "a--mcp": {"topic": "a", "id": "mcp", "web_searches": 2},
+            "b--mcp": {"topic": "b", "id": "mcp", "web_searches": 4},
+        }},
+    ]
+    prompts = [{"id": "hooks"}, {"id": "mcp"}]
+    results = [_result("hooks"), _result("mcp")]
+    stats.record("a", prompts, results, calls, "run-1", TODAY)
+    stats.record("b", prompts, results, calls, "run-1", TODAY)
+
+    assert stats.get("a", "hooks")["web_searches"] == 5
+    assert stats.get("b", "hooks")["web_searches"] == 1
+    assert stats.get("a", "mcp")["web_searches"] == 2
+    assert stats.get("b", "mcp")["web_searches"] == 4
+    assert round(stats.spent_since(TODAY), 4) == 0.045 * 2 + 0.12
+
+
+def test_create_scheduler(tmp_path):
+    assert create_scheduler({}, str(tmp_path / "s.json")) is None
+    assert create_scheduler({"enabled": False}, str(tmp_path / "s.json")) is None
+    scheduler = create_scheduler(
+        {"enabled": True, "weekly_budget_usd": 2,
+         "tiers": {"hoog": {"max_uses": 10}}},
+        str(tmp_path / "s.json"),
+    )
+    assert scheduler.weekly_budget == 2
+    assert scheduler.tiers["hoog"] == {"max_uses": 10, "max_tokens": 6144}
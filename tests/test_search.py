@@ -2,7 +2,16 @@
 
 from unittest.mock import MagicMock, patch
 
-from src.search import extract_sources, search_single_prompt, run_all_searches
+import anthropic
+
+from src.retry import RetryPolicy
+from src.search import (
+    extract_sources,
+    search_single_prompt,
+    run_all_searches,
+    run_batch_searches,
+    run_topic_batch_searches,
+)
 
 
 def _make_search_result(url="https://example.com", title="Example"):
@@ -140,35 +149,61 @@ def test_search_single_prompt_api_error():
     assert "FOUT" in result["raw_output"]
 
 
-@patch("src.search.time.sleep")
-def test_search_single_prompt_retries_on_429(mock_sleep):
+def _rate_limit_error(headers=None):
+    response = MagicMock(status_code=429, headers=headers or {})
+    return anthropic.RateLimitError("rate limited", response=response, body=None)
+
+
+def _no_jitter_policy(sleep, **kwargs):
+    """Retrybeleid zonder jitter: rng.uniform geeft altijd de ondergrens."""
+    rng = MagicMock()
+    rng.uniform.side_effect = lambda low, high: low
+    return RetryPolicy(rng=rng, sleep=sleep, **kwargs)
+
+
+def test_search_single_prompt_retries_on_429():
     mock_client = MagicMock()
     mock_client.messages.create.side_effect = [
-        RuntimeError("429 rate limit"),
+        _rate_limit_error(),
         _mock_response("Success after retry"),
     ]
+    sleep = MagicMock()
 
     result = search_single_prompt(
         mock_client, "m", "base", "fmt", _make_prompt(),
-        max_retries=3, initial_delay=2, backoff_multiplier=2,
+        retry=_no_jitter_policy(sleep, max_retries=3, base_delay=2),
     )
     assert result["raw_output"] == "Success after retry"
     assert mock_client.messages.create.call_count == 2
-    mock_sleep.assert_called_once_with(2)
+    sleep.assert_called_once_with(2)
 
 
-@patch("src.search.time.sleep")
-def test_search_single_prompt_gives_up_after_max_retries(mock_sleep):
+def test_search_single_prompt_gives_up_after_max_retries():
     mock_client = MagicMock()
-    mock_client.messages.create.side_effect = RuntimeError("429 rate limit")
+    mock_client.messages.create.side_effect = _rate_limit_error()
+    sleep = MagicMock()
 
     result = search_single_prompt(
         mock_client, "m", "base", "fmt", _make_prompt(),
-        max_retries=2, initial_delay=1, backoff_multiplier=2,
+        retry=_no_jitter_policy(sleep, max_retries=2, base_delay=1),
     )
     assert "FOUT" in result["raw_output"]
     assert mock_client.messages.create.call_count == 3
-    assert mock_sleep.call_count == 2
+    assert sleep.call_count == 2
+
+
+def test_search_single_prompt_does_not_retry_other_errors():
+    mock_client = MagicMock()
+    mock_client.messages.create.side_effect = RuntimeError("429 in de tekst")
+    sleep = MagicMock()
+
+    result = search_single_prompt(
+        mock_client, "m", "base", "fmt", _make_prompt(),
+        retry=_no_jitter_policy(sleep),
+    )
+    assert "FOUT" in result["raw_output"]
+    assert mock_client.messages.create.call_count == 1
+    sleep.assert_not_called()
 
 
 def test_search_joins_multiple_text_blocks():
@@ -214,3 +249,243 @@ def test_run_all_searches(mock_sleep):
     assert results[0]["id"] == "a"
     assert results[1]["id"] == "b"
     mock_sleep.assert_called_once_with(1)
+
+
+@patch("src.search.time.sleep")
+def test_run_all_searches_concurrent_keeps_order(mock_sleep):
+    import threading
+
+    last_started = threading.Event()
+
+    def create(**kwargs):
+        query = kwargs["messages"][0]["content"]
+        # Eerste prompt wacht tot de laatste loopt; volgorde moet toch kloppen
+        if query.endswith("q0"):
+            last_started.wait(timeout=5)
+        if query.endswith("q4"):
+            last_started.set()
+        return _mock_response(query[-2:])
+
+    mock_client = MagicMock()
+    mock_client.messages.create.side_effect = create
+
+    prompts = [_make_prompt(f"p{i}", f"P{i}", f"q{i}") for i in range(5)]
+    results = run_all_searches(
+        mock_client, "m", "base", "fmt", prompts, delay=1, max_workers=3
+    )
+    assert [r["id"] for r in results] == [f"p{i}" for i in range(5)]
+    assert [r["raw_output"] for r in results] == [f"q{i}" for i in range(5)]
+    mock_sleep.assert_not_called()
+
+
+def test_run_all_searches_concurrent_respects_max_workers():
+    import threading
+    import time as real_time
+
+    lock = threading.Lock()
+    state = {"active": 0, "peak": 0}
+
+    def create(**kwargs):
+        with lock:
+            state["active"] += 1
+            state["peak"] = max(state["peak"], state["active"])
+        real_time.sleep(0.02)
+        with lock:
+            state["active"] -= 1
+        return _mock_response("ok")
+
+    mock_client = MagicMock()
+    mock_client.messages.create.side_effect = create
+
+    prompts = [_make_prompt(f"p{i}") for i in range(8)]
+    run_all_searches(mock_client, "m", "base", "fmt", prompts, max_workers=2)
+    assert state["peak"] <= 2
+
+
+def test_run_all_searches_concurrent_isolates_errors():
+    def create(**kwargs):
+        if kwargs["messages"][0]["content"].endswith("bad"):
+            raise RuntimeError("API down")
+        return _mock_response("ok")
+
+    mock_client = MagicMock()
+    mock_client.messages.create.side_effect = create
+
+    prompts = [
+        _make_prompt("a", "A", "good"),
+        _make_prompt("b", "B", "bad"),
+        _make_prompt("c", "C", "good"),
+    ]
+    results = run_all_searches(
+        mock_client, "m", "base", "fmt", prompts, max_workers=3
+    )
+    assert results[0]["raw_output"] == "ok"
+    assert results[1]["raw_output"].startswith("FOUT:")
+    assert results[2]["raw_output"] == "ok"
+
+
+# --- run_batch_searches (tegen een lokale nep-batch endpoint) ---
+
+def _fake_client(server):
+    import anthropic
+    return anthropic.Anthropic(api_key="test", base_url=server.url, max_retries=0)
+
+
+def test_run_batch_searches_against_fake_endpoint():
+    from tests.fake_anthropic import FakeAnthropicServer, make_message
+
+    def responder(params):
+        query = params["messages"][0]["content"].split("\n")[-1]
+        return make_message(
+            f"Gevonden voor {query}",
+            sources={f"https://example.com/{query}": f"Artikel {query}"},
+        )
+
+    prompts = [_make_prompt("a", "A", "q1"), _make_prompt("b", "B", "q2")]
+    with FakeAnthropicServer(responder, polls_until_ended=2) as server:
+        with patch("src.search.time.sleep") as mock_sleep:
+            results = run_batch_searches(
+                _fake_client(server), "m", "base", "fmt", prompts,
+                poll_interval=3,
+            )
+
+    assert [r["id"] for r in results] == ["a", "b"]
+    assert results[0]["raw_output"].startswith("Gevonden voor q1")
+    assert "GEVERIFIEERDE BRONNEN:" in results[0]["raw_output"]
+    assert "https://example.com/q2" in results[1]["raw_output"]
+    assert mock_sleep.call_count == 2
+    posted = [r for r in server.requests if r[0] == "POST"]
+    assert len(posted) == 1
+    assert [r["custom_id"] for r in posted[0][2]["requests"]] == ["a", "b"]
+
+
+def test_run_topic_batch_searches_sends_one_batch_for_all_topics():
+    from tests.fake_anthropic import FakeAnthropicServer, make_message
+
+    def responder(params):
+        return make_message(params["messages"][0]["content"])
+
+    topics = {
+        name: {
+            "base_instruction": "base", "output_format": "fmt",
+            "prompts": [_make_prompt("a", "A", f"{name}-q1"),
+                        _make_prompt("b", "B", f"{name}-q2")],
+        }
+        for name in ("hooks", "mcp")
+    }
+    with FakeAnthropicServer(responder, polls_until_ended=1) as server:
+        with patch("src.search.time.sleep"):
+            results = run_topic_batch_searches(_fake_client(server), "m", topics)
+
+    assert {name: [r["raw_output"] for r in rs] for name, rs in results.items()} == {
+        "hooks": ["hooks-q1", "hooks-q2"],
+        "mcp": ["mcp-q1", "mcp-q2"],
+    }
+    posted = [r for r in server.requests if r[0] == "POST"]
+    assert [r["custom_id"] for r in posted[0][2]["requests"]] == [
+        "hooks--a", "hooks--b", "mcp--a", "mcp--b",
+    ]
+    assert len(posted) == 1
+
+
+def test_run_batch_searches_isolates_errored_results():
+    from tests.fake_anthropic import FakeAnthropicServer, make_message
+
+    def responder(params):
+        if params["messages"][0]["content"].endswith("bad"):
+            raise RuntimeError("kapot")
+        return make_message("ok")
+
+    prompts = [_make_prompt("a", "A", "good"), _make_prompt("b", "B", "bad")]
+    with FakeAnthropicServer(responder) as server:
+        with patch("src.search.time.sleep"):
+            results = run_batch_searches(
+                _fake_client(server), "m", "base", "fmt", prompts
+            )
+
+    assert results[0]["raw_output"] == "ok"
+    assert results[1]["raw_output"].startswith("FOUT:")
+    assert "kapot" in results[1]["raw_output"]
+
+
+def test_run_batch_searches_create_failure_marks_all_failed():
+    mock_client = MagicMock()
+    mock_client.messages.batches.create.side_effect = RuntimeError("API down")
+
+    prompts = [_make_prompt("a"), _make_prompt("b")]
+    results = run_batch_searches(mock_client, "m", "base", "fmt", prompts)
+    assert all(r["raw_output"].startswith("FOUT:") for r in results)
+
+
+def test_search_request_caches_shared_prefix():
+    from src.search import build_search_request
+
+    request = build_search_request("m", "Base", "Format", _make_prompt(query="q"))
+    assert request["system"][0]["text"] == "Base\n\nFormat"
+    assert request["system"][0]["cache_control"] == {"type": "ephemeral"}
+    assert request["messages"] == [{"role": "user", "content": "q"}]
+
+
+def test_run_all_searches_calls_on_result_per_prompt():
+    mock_client = MagicMock()
+    mock_client.messages.create.return_value = _mock_response("result")
+    seen = []
+
+    prompts = [_make_prompt("a"), _make_prompt("b"), _make_prompt("c")]
+    run_all_searches(
+        mock_client, "m", "base", "fmt", prompts, max_workers=2,
+        on_result=lambda r: seen.append(r["id"]),
+    )
+    assert sorted(seen) == ["a", "b", "c"]
+
+
+def test_search_single_prompt_records_retries_in_metrics():
+    from src.metrics import METRICS
+
+    METRICS.reset()
+    mock_client = MagicMock()
+    mock_client.messages.create.side_effect = [
+        _rate_limit_error(),
+        _mock_response("Na retry"),
+    ]
+
+    search_single_prompt(
+        mock_client, "m", "base", "fmt", _make_prompt(),
+        retry=_no_jitter_policy(MagicMock(), base_delay=2),
+    )
+    [call] = [c for c in METRICS.calls if c["stage"] == "search"]
+    assert call["retries"] == 1
+    assert call["backoff_time"] == 2
+    assert call["bytes_returned"] == len("Na retry".encode("utf-8"))
+
+
+def test_interleave_alternates_topics():
+    from src.search import interleave
+
+    jobs = interleave({"a": [{"id": 1}, {"id": 2}, {"id": 3}], "b": [{"id": 4}]})
+    assert [(topic, p["id"]) for topic, p in jobs] == [
+        ("a", 1), ("b", 4), ("a", 2), ("a", 3),
+    ]
+
+
+def test_run_topic_searches_groups_results_per_topic():
+    from src.search import run_topic_searches
+
+    mock_client = MagicMock()
+    mock_client.messages.create.side_effect = lambda **kw: _mock_response(
+        kw["messages"][0]["content"]
+    )
+    topics = {
+        "a": {"base_instruction": "b", "output_format": "f",
+              "prompts": [_make_prompt("a1"), _make_prompt("a2")]},
+        "b": {"base_instruction": "b", "output_format": "f",
+              "prompts": [_make_prompt("b1")]},
+    }
+    seen = []
+    results = run_topic_searches(
+        mock_client, "m", topics, max_workers=3,
+        on_result=lambda topic, result: seen.append((topic, result["id"])),
+    )
+    assert [r["id"] for r in results["a"]] == ["a1", "a2"]
+    assert [r["id"] for r in results["b"]] == ["b1"]
+    assert sorted(seen) == [("a", "a1"), ("a", "a2"), ("b", "b1")]
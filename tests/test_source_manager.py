@@ -99,7 +99,212 @@ def test_get_source_weights_text_sorted_by_weight():
     assert "low.com" in lines[2]
 
 
+def test_get_source_weights_text_leaves_out_unlearned_sources():
+    data = {
+        "sources": [
+            {"domain": "nieuw.com", "weight": 5.04, "notes": "Automatisch toegevoegd"},
+            {"domain": "vast.com", "weight": 5, "notes": "Automatisch toegevoegd",
+             "pinned": True},
+            {"domain": "geciteerd.com", "weight": 6.3,
+             "notes": "Automatisch toegevoegd"},
+            {"domain": "eigen.com", "weight": 5},
+        ],
+        "default_weight": 5,
+    }
+    lines = get_source_weights_text(data).split("\n")[1:]
+    assert lines == [
+        "- geciteerd.com: gewicht 6, 0x geïmplementeerd",
+        "- eigen.com: gewicht 5, 0x geïmplementeerd",
+        "- vast.com: gewicht 5, 0x geïmplementeerd",
+    ]
+    assert len(get_source_weights_text(data, limit=1).split("\n")) == 2
+
+
 def test_get_source_weights_text_empty_sources():
     text = get_source_weights_text({"sources": []})
     assert "Gewogen bronnen" in text
     assert text.strip().count("\n") == 0
+
+
+# --- SourceWeights ---
+
+def _weights():
+    from src.source_manager import SourceWeights
+
+    return SourceWeights.from_dict({
+        "sources": [
+            {"domain": "a.com", "weight": 8, "implemented_count": 0},
+            {"domain": "b.com", "weight": 3, "implemented_count": 1},
+        ],
+        "default_weight": 5,
+    })
+
+
+def test_source_weights_batch_lookup():
+    weights = _weights()
+    assert weights.get_weights(["a.com", "b.com", "new.com"]) == {
+        "a.com": 8, "b.com": 3, "new.com": 5,
+    }
+    assert "a.com" in weights
+    assert len(weights) == 2
+
+
+def test_source_weights_update_many():
+    weights = _weights()
+    weights.update_many([("a.com", True), ("new.com", False), ("b.com", False)])
+    assert weights.get("a.com")["weight"] == 9
+    assert weights.get("a.com")["implemented_count"] == 1
+    assert weights.get("new.com")["weight"] == 5
+    assert weights.get("b.com")["weight"] == 3
+    assert weights.dirty
+
+
+def test_source_weights_matches_dict_functions():
+    from src.source_manager import SourceWeights
+
+    data = {"sources": [{"domain": "a.com", "weight": 10, "implemented_count": 5}]}
+    weights = SourceWeights.from_dict(data)
+    weights.update("a.com", implemented=True)
+    expected = update_source_weight(data, "a.com", implemented=True)
+    assert weights.to_dict()["sources"] == expected["sources"]
+    assert weights.text() == get_source_weights_text(expected)
+
+
+def test_source_weights_yaml_roundtrip(tmp_path):
+    import shutil
+    from src.source_manager import SourceWeights, load_source_weights
+
+    path = tmp_path / "source_weights.yaml"
+    shutil.copy("reference/source_weights.yaml", path)
+    original = load_source_weights(str(path))
+
+    weights = SourceWeights.load(str(path))
+    weights.save(str(path))
+    assert load_source_weights(str(path)) == original
+    assert not list(tmp_path.glob("*.tmp"))
+
+
+def test_source_weights_decay_is_incremental():
+    from datetime import date
+
+    weights = _weights()
+    weights.get("a.com")["weight"] = 10
+    weights.get("b.com")["weight"] = 4
+    weights.get("b.com")["pinned"] = True
+    weights.update("new.com", implemented=True)
+    assert weights.decay(date(2026, 1, 1), half_life_days=90) == 0
+    assert weights.last_decay == "2026-01-01"
+
+    # Na één halfwaardetijd is het geleerde deel gehalveerd: a.com zakt naar
+    # zijn gewicht uit de bronnenlijst, new.com naar default_weight
+    assert weights.decay(date(2026, 4, 1), half_life_days=90) == 2
+    assert weights.get_weights(["a.com", "b.com", "new.com"]) == {
+        "a.com": 9, "b.com": 4, "new.com": 5.5,
+    }
+    weights.decay(date(2026, 6, 30), half_life_days=90)
+    assert weights.get_weight("a.com") == 8.5
+    assert weights.to_dict()["last_decay"] == "2026-06-30"
+
+
+def test_source_weights_learn_counts_and_cites_once_per_run():
+    from datetime import date
+
+    weights = _weights()
+    assert weights.learn(
+        ["a.com", "new.com"], ["new.com"], date(2026, 3, 6), run_id="run-1"
+    )
+    assert weights.get("a.com")["seen_count"] == 1
+    assert weights.get("a.com")["weight"] == 8
+    assert weights.get("new.com") == {
+        "domain": "new.com",
+        "weight": 5.5,
+        "implemented_count": 0,
+        "notes": "Automatisch toegevoegd",
+        "seen_count": 1,
+        "last_seen": "2026-03-06",
+        "cited_count": 1,
+    }
+    assert not weights.learn(["a.com"], [], date(2026, 3, 6), run_id="run-1")
+    assert weights.get("a.com")["seen_count"] == 1
+    assert weights.learn(["a.com"], [], date(2026, 3, 6), run_id="run-1/mcp")
+    assert not weights.learn(["a.com"], [], date(2026, 3, 6), run_id="run-1")
+    assert weights.get("a.com")["seen_count"] == 2
+    assert weights.to_dict()["learned_runs"] == ["run-1", "run-1/mcp"]
+
+
+def test_learned_weights_are_saved_apart_and_merged(tmp_path):
+    from datetime import date
+
+    from src.source_manager import SourceWeights
+
+    reference = tmp_path / "source_weights.yaml"
+    learned = tmp_path / "state" / "source_weights-learned.yaml"
+    weights = _weights()
+    weights.get("b.com")["pinned"] = True
+    weights.save(str(reference))
+    weights.learn(
+        ["a.com", "b.com"], ["b.com", "new.com"], date(2026, 3, 6), run_id="r1"
+    )
+    weights.save_learned(str(learned))
+
+    # De bronnenlijst zelf blijft zoals hij was
+    assert "seen_count" not in reference.read_text()
+    # Een handmatige wijziging in de bronnenlijst blijft behouden
+    reference.write_text(
+        reference.read_text().replace("a.com\n", "a.com\n  notes: x\n")
+    )
+
+    loaded = SourceWeights.load(str(reference), str(learned))
+    assert loaded.get("a.com")["notes"] == "x"
+    assert loaded.get("a.com")["seen_count"] == 1
+    assert loaded.get_weights(["b.com", "new.com"]) == {"b.com": 3, "new.com": 5.5}
+    assert loaded.learned_runs == ["r1"]
+    assert loaded.last_decay == "2026-03-06"
+    missing = SourceWeights.load(str(reference), str(tmp_path / "geen.yaml"))
+    assert missing.learned_runs == []
+
+
+def test_learned_bonus_follows_edits_to_the_reference_weights(tmp_path):
+    from datetime import date
+
+    from src.source_manager import SourceWeights, load_source_weights
+
+    reference = tmp_path / "source_weights.yaml"
+    learned = tmp_path / "source_weights-learned.yaml"
+    _weights().save(str(reference))
+    weights = SourceWeights.load(str(reference), str(learned))
+    weights.learn(["a.com"], ["a.com", "new.com"], date(2026, 3, 6))
+    weights.save_learned(str(learned))
+    saved = load_source_weights(str(learned))["sources"]
+    assert {"domain": "a.com", "bonus": 0.5, "seen_count": 1, "cited_count": 1,
+            "last_seen": "2026-03-06"} in saved
+
+    reference.write_text(reference.read_text().replace("weight: 8", "weight: 6"))
+    loaded = SourceWeights.load(str(reference), str(learned))
+    assert loaded.get_weights(["a.com", "new.com"]) == {"a.com": 6.5, "new.com": 5.5}
+
+    # Het oude formaat met absolute gewichten telt alleen voor nieuwe bronnen
+    learned.write_text(
+        "sources:\n- {domain: a.com, weight: 9}\n- {domain: new.com, weight: 7}\n"
+    )
+    loaded = SourceWeights.load(str(reference), str(learned))
+    assert loaded.get_weights(["a.com", "new.com"]) == {"a.com": 6, "new.com": 7}
+
+
+def test_learn_prunes_stale_sources_and_keeps_prompt_text_stable():
+    from datetime import date
+
+    weights = _weights()
+    weights.learn(["eenmalig.com", "geciteerd.com"], ["geciteerd.com"],
+                  date(2026, 1, 2), cite_step=1, half_life_days=90)
+    text = weights.text()
+    assert "eenmalig.com" not in text
+
+    weights.learn(["a.com"], [], date(2026, 1, 9), half_life_days=90)
+    assert weights.text() == text
+    assert "eenmalig.com" in weights
+
+    weights.learn(["a.com"], [], date(2026, 4, 9), half_life_days=90)
+    assert "eenmalig.com" not in weights
+    assert "geciteerd.com" in weights
+    assert "b.com" in weights
@@ -0,0 +1,79 @@
+"""Tests for src/transport.py — gedeelde pool tegen de nep-server."""
+
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import anthropic
+import pytest
+import resend
+
+from src import transport as transport_module
+from src.email_sender import build_message, send_messages
+from src.transport import ResendHTTPClient, Transport, create_transport
+from tests.fake_anthropic import FakeAnthropicServer
+
+
+@pytest.fixture
+def base_url(monkeypatch):
+    def point(server):
+        monkeypatch.setenv("ANTHROPIC_BASE_URL", server.url)
+        monkeypatch.setattr(resend, "api_url", server.url)
+    return point
+
+
+def _ask(client, text="hallo"):
+    return client.messages.create(
+        model="m", max_tokens=10, messages=[{"role": "user", "content": text}]
+    )
+
+
+def test_stages_and_resend_share_one_connection(base_url):
+    with FakeAnthropicServer() as server, Transport(api_key="k") as transport:
+        base_url(server)
+        transport.install_resend()
+        for stage in ("search", "analyze", "batch"):
+            assert _ask(transport.anthropic(stage)).content[0].text == "hallo"
+        send_messages("k", [build_message("a@b.nl", "c@d.nl", "[X]", "tekst")])
+        assert _ask(transport.anthropic("search")).content[0].text == "hallo"
+
+        assert len(server.emails) == 1
+        assert server.connections == 1
+
+
+def test_concurrent_calls_reuse_warm_connections(base_url):
+    with FakeAnthropicServer(latency=0.02) as server, Transport(api_key="k") as t:
+        base_url(server)
+        client = t.anthropic("search")
+        with ThreadPoolExecutor(max_workers=4) as pool:
+            list(pool.map(lambda i: _ask(client, f"vraag {i}"), range(20)))
+    assert server.message_count == 20
+    assert server.connections <= 4
+
+
+def test_hanging_call_times_out(base_url):
+    with FakeAnthropicServer(latency=3) as server:
+        base_url(server)
+        with Transport(api_key="k", timeouts={"search": 0.2}) as transport:
+            start = time.monotonic()
+            with pytest.raises(anthropic.APITimeoutError):
+                _ask(transport.anthropic("search"))
+    assert time.monotonic() - start < 2
+
+
+def test_resend_client_is_restored_on_close():
+    original = resend.default_http_client
+    transport = create_transport("k", {"timeouts": {"email": 5}, "http2": False})
+    transport.install_resend()
+    assert isinstance(resend.default_http_client, ResendHTTPClient)
+    transport.close()
+    assert resend.default_http_client is original
+    assert transport.timeout("email").read == 5
+    assert transport.timeout("search").connect == 10
+
+
+def test_missing_h2_is_a_warning(monkeypatch, caplog):
+    monkeypatch.setattr(transport_module, "HTTP2_AVAILABLE", False)
+    with Transport(api_key="k", http2=True) as transport:
+        assert transport.http2 is False
+    assert "pakket h2 ontbreekt" in caplog.records[-1].getMessage()
+    assert caplog.records[-1].levelname == "WARNING"
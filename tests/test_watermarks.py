@@ -0,0 +1,83 @@
+"""Tests for src/watermarks.py — date windows and high-water marks in tmp_path."""
+
+from datetime import date
+
+from src.watermarks import Watermarks, newest_date
+
+TODAY = date(2026, 3, 6)
+
+
+def _result(id, raw_output):
+    return {"id": id, "name": id, "raw_output": raw_output, "sources": {}}
+
+
+def _articles(*dates):
+    return "\n---\n".join(
+        f"TITEL: Artikel {i}\nURL: https://example.com/{i}\nDATUM: {d}"
+        for i, d in enumerate(dates)
+    ) + "\n---"
+
+
+def test_new_prompt_gets_default_window(tmp_path):
+    marks = Watermarks(str(tmp_path / "w.json"), default_days=7)
+    assert marks.window("hooks", TODAY) == (date(2026, 2, 27), TODAY)
+
+
+def test_window_starts_at_last_run_and_is_empty_on_same_day(tmp_path):
+    marks = Watermarks(str(tmp_path / "w.json"))
+    marks.prompts["hooks"] = {"last_run": "2026-02-20"}
+    assert marks.window("hooks", TODAY) == (date(2026, 2, 20), TODAY)
+
+    marks.prompts["hooks"] = {"last_run": "2026-03-06"}
+    assert marks.window("hooks", TODAY) is None
+
+
+def test_apply_injects_window_and_skips_empty(tmp_path):
+    marks = Watermarks(str(tmp_path / "w.json"))
+    marks.prompts["done"] = {"last_run": "2026-03-06"}
+    prompts = [
+        {"id": "hooks", "name": "Hooks", "query": "Search for hooks.\n"},
+        {"id": "done", "name": "Done", "query": "Search."},
+    ]
+
+    windowed, skipped = marks.apply(prompts, TODAY)
+    assert skipped == ["done"]
+    [hooks] = windowed
+    assert hooks["query"].startswith("Search for hooks.\n\nDate window:")
+    assert "between 2026-02-27 and 2026-03-06" in hooks["query"]
+    assert prompts[0]["query"] == "Search for hooks.\n"
+
+
+def test_newest_date_reads_iso_datum_fields():
+    raw = _articles("2026-03-01", "recent", "2026-03-04", "2027-01-01")
+    assert newest_date(raw, TODAY) == date(2026, 3, 4)
+    assert newest_date("GEEN RESULTATEN", TODAY) is None
+
+
+def test_advance_skips_failures_and_persists(tmp_path):
+    path = tmp_path / "state" / "w.json"
+    marks = Watermarks(str(path))
+    marks.advance([
+        _result("hooks", _articles("2026-03-02")),
+        _result("mcp", "FOUT: API down"),
+        _result("leeg", "GEEN RESULTATEN"),
+    ], TODAY)
+    marks.save()
+
+    reloaded = Watermarks(str(path))
+    assert reloaded.prompts["hooks"] == {
+        "last_run": "2026-03-06",
+        "newest_date": "2026-03-02",
+    }
+    assert reloaded.prompts["leeg"] == {"last_run": "2026-03-06"}
+    assert "mcp" not in reloaded.prompts
+
+
+def test_advance_never_moves_backwards(tmp_path):
+    marks = Watermarks(str(tmp_path / "w.json"))
+    marks.prompts["hooks"] = {"last_run": "2026-03-06", "newest_date": "2026-03-05"}
+    marks.advance([_result("hooks", _articles("2026-03-01"))], date(2026, 3, 1))
+    assert marks.prompts["hooks"] == {
+        "last_run": "2026-03-06",
+        "newest_date": "2026-03-05",
+    }